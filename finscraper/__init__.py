@@ -1,3 +1,5 @@
 
 from . import _version
 __version__ = _version.get_versions()['version']
+
+from finscraper.wrappers import run_many
@@ -0,0 +1,297 @@
+"""Module for filtering duplicate requests."""
+
+
+import hashlib
+import math
+import mmap
+import os
+import struct
+
+from array import array
+
+from scrapy.dupefilters import RFPDupeFilter
+from scrapy.utils.job import job_dir
+from w3lib.url import canonicalize_url
+
+
+class URLHashSet:
+    """Bounded set of hashes of canonical URLs.
+
+    Only 64-bit hashes of the canonicalized URLs are kept, in two fixed
+    arrays of open addressing that are at most half full. When the newer
+    one holds ``max_size // 2`` hashes, the older one is cleared and the
+    hashes in it are forgotten. Memory taken by the set does not grow with
+    the number of URLs added.
+
+    Args:
+        max_size (int, optional): Maximum number of hashes, zero keeps none.
+            Defaults to 1048576.
+    """
+    _mask = 2 ** 64 - 1
+
+    def __init__(self, max_size=1048576):
+        self.max_size = max_size
+        self._capacity = max(max_size // 2, 1)
+        self._n_slots = 1 << (2 * self._capacity - 1).bit_length()
+        self._hashes = self._old_hashes = None
+        self._count = self._old_count = 0
+        if max_size > 0:
+            self._hashes = self._new_table()
+            self._old_hashes = self._new_table()
+
+    def _new_table(self):
+        return array('Q', bytes(8 * self._n_slots))
+
+    def _hash(self, url):
+        return hash(canonicalize_url(url)) & self._mask or 1  # 0 is empty
+
+    @staticmethod
+    def _find(table, url_hash):
+        # Linear probing, tables always have empty slots
+        mask = len(table) - 1
+        i = url_hash & mask
+        while table[i] and table[i] != url_hash:
+            i = (i + 1) & mask
+        return i
+
+    def _contains(self, url_hash):
+        return any(table[self._find(table, url_hash)] == url_hash
+                   for table in (self._hashes, self._old_hashes))
+
+    def add(self, url):
+        """Add an URL into the set."""
+        if self.max_size <= 0:
+            return
+        url_hash = self._hash(url)
+        if self._contains(url_hash):
+            return
+        self._hashes[self._find(self._hashes, url_hash)] = url_hash
+        self._count += 1
+        if self._count >= self._capacity:
+            self._old_hashes, self._old_count = self._hashes, self._count
+            self._hashes, self._count = self._new_table(), 0
+
+    def __contains__(self, url):
+        return self.max_size > 0 and self._contains(self._hash(url))
+
+    def __len__(self):
+        return self._count + self._old_count
+
+
+class BloomFilter:
+    """Bloom filter whose bit array is memory-mapped.
+
+    Holds ``capacity`` keys with a false positive rate of ``error_rate``.
+    The number of keys and the parameters of the filter are saved into the
+    header of the file, so that an existing filter is opened as it is.
+
+    Args:
+        path (str or None): Path of the file, or None to keep the filter
+            in anonymous memory.
+        capacity (int): Number of keys the filter is sized for.
+        error_rate (float): False positive rate when full.
+    """
+    _magic = b'FSBLOOM1'
+    _header = struct.Struct('<8sQQQ')  # Magic, capacity, count, hashes
+    _count = struct.Struct('<Q')
+    _count_offset = 16
+    _offset = 64
+
+    def __init__(self, path, capacity, error_rate):
+        n_bits = -capacity * math.log(error_rate) / math.log(2) ** 2
+        n_bytes = max(math.ceil(n_bits / 8), 1)
+        self.path = path
+        if path is not None and os.path.exists(path):
+            with open(path, 'r+b') as f:
+                self._mmap = mmap.mmap(f.fileno(), 0)
+            magic, self.capacity, self.count, self.n_hashes = \
+                self._header.unpack_from(self._mmap)
+            if magic != self._magic:
+                self._mmap.close()
+                raise ValueError(f'File "{path}" is not a Bloom filter')
+        else:
+            size = self._offset + n_bytes
+            if path is None:
+                self._mmap = mmap.mmap(-1, size)
+            else:
+                with open(path, 'w+b') as f:
+                    f.truncate(size)
+                    self._mmap = mmap.mmap(f.fileno(), size)
+            self.capacity = capacity
+            self.count = 0
+            self.n_hashes = max(round(n_bits / capacity * math.log(2)), 1)
+            self._write_header()
+        self.n_bits = (len(self._mmap) - self._offset) * 8
+
+    def _write_header(self):
+        self._header.pack_into(self._mmap, 0, self._magic, self.capacity,
+                               self.count, self.n_hashes)
+
+    def _get_bits(self, key_hash):
+        # Enhanced double hashing of two 64-bit halves
+        h1 = int.from_bytes(key_hash[:8], 'little')
+        h2 = int.from_bytes(key_hash[8:], 'little')
+        offset, n_bits = self._offset, self.n_bits
+        for i in range(self.n_hashes):
+            bit = (h1 + i * h2 + (i ** 3 - i) // 6) % n_bits
+            yield offset + (bit >> 3), 1 << (bit & 7)
+
+    def contains(self, key_hash):
+        """Whether a key is in the filter, given its 16-byte hash."""
+        data = self._mmap
+        for i, mask in self._get_bits(key_hash):
+            if not data[i] & mask:
+                return False
+        return True
+
+    def add(self, key_hash):
+        """Add a key into the filter, given its 16-byte hash."""
+        data = self._mmap
+        for i, mask in self._get_bits(key_hash):
+            data[i] |= mask
+        self.count += 1
+        self._count.pack_into(data, self._count_offset, self.count)
+
+    def is_full(self):
+        return self.count >= self.capacity
+
+    def close(self):
+        if self.path is not None:
+            self._mmap.flush()
+        self._mmap.close()
+
+
+class ScalableBloomFilter:
+    """Bloom filter that grows by adding filters as they become full.
+
+    Each added filter holds twice as many keys as the previous one, with
+    half of its false positive rate, so that the total false positive rate
+    stays below ``error_rate``. Memory is only used by the filters that
+    have been needed. The filters are saved into files ``<path>.0``,
+    ``<path>.1`` and so on, and opened as they are when the same ``path``
+    is used again.
+
+    Args:
+        path (str or None, optional): Path prefix of the files, or None to
+            keep the filters in memory. Defaults to None.
+        capacity (int, optional): Number of keys of the first filter.
+            Defaults to 1000000.
+        error_rate (float, optional): False positive rate of the filters
+            together. Defaults to 0.001.
+    """
+
+    def __init__(self, path=None, capacity=1000000, error_rate=0.001):
+        if capacity <= 0:
+            raise ValueError('Capacity must be positive')
+        if not 0 < error_rate < 1:
+            raise ValueError('Error rate must be between 0 and 1')
+        self.path = path
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.filters = []
+        while path is not None and os.path.exists(self._get_path()):
+            self._add_filter()
+        if not self.filters:
+            self._add_filter()
+
+    def _get_path(self):
+        if self.path is None:
+            return None
+        return f'{self.path}.{len(self.filters)}'
+
+    def _add_filter(self):
+        i = len(self.filters)
+        self.filters.append(BloomFilter(
+            self._get_path(), self.capacity * 2 ** i,
+            self.error_rate / 2 ** (i + 1)))
+
+    @staticmethod
+    def _hash(key):
+        return hashlib.blake2b(key, digest_size=16).digest()
+
+    def add(self, key):
+        """Add a key into the filter.
+
+        Args:
+            key (bytes): Key to add, e.g. a request fingerprint.
+
+        Returns:
+            bool: Whether the key was already in the filter.
+        """
+        key_hash = self._hash(key)
+        if any(f.contains(key_hash) for f in self.filters):
+            return True
+        if self.filters[-1].is_full():
+            self._add_filter()
+        self.filters[-1].add(key_hash)
+        return False
+
+    def __contains__(self, key):
+        key_hash = self._hash(key)
+        return any(f.contains(key_hash) for f in self.filters)
+
+    def __len__(self):
+        return sum(f.count for f in self.filters)
+
+    def close(self):
+        for f in self.filters:
+            f.close()
+        self.filters = []
+
+
+class BloomDupeFilter(RFPDupeFilter):
+    """Duplicate filter that keeps fingerprints in a scalable Bloom filter.
+
+    Instead of a set of all fingerprints, uses a ``ScalableBloomFilter``
+    that takes a few bytes per request, and is memory-mapped into
+    ``requests.bloom.*`` files in ``JOBDIR``. Nothing else is kept per
+    request, so memory stays fixed, and resuming a job does not read the
+    fingerprints into memory. Fingerprints in ``requests.seen`` of an
+    existing job are added into the filter when it is created. A new
+    request is filtered as a duplicate with a probability of at most
+    ``DUPEFILTER_BLOOM_ERROR_RATE``, and the first filter is sized by
+    ``DUPEFILTER_BLOOM_CAPACITY``. Otherwise, works like ``RFPDupeFilter``.
+
+    Args:
+        path (str or None, optional): Directory to save the filter in.
+            Defaults to None.
+        debug (bool, optional): Whether to log all filtered requests.
+            Defaults to False.
+        fingerprinter (optional): Request fingerprinter.
+        capacity (int, optional): Number of requests of the first filter.
+            Defaults to 1000000.
+        error_rate (float, optional): False positive rate. Defaults to
+            0.001.
+    """
+
+    def __init__(self, path=None, debug=False, *, fingerprinter=None,
+                 capacity=1000000, error_rate=0.001):
+        # Fingerprints are not kept in the set or file of RFPDupeFilter
+        super(BloomDupeFilter, self).__init__(
+            None, debug, fingerprinter=fingerprinter)
+        bloom_path = None if not path else os.path.join(path, 'requests.bloom')
+        is_new = bloom_path is None or not os.path.exists(f'{bloom_path}.0')
+        self.bloom = ScalableBloomFilter(bloom_path, capacity, error_rate)
+        seen_path = None if not path else os.path.join(path, 'requests.seen')
+        if is_new and seen_path is not None and os.path.exists(seen_path):
+            with open(seen_path) as f:
+                for line in f:
+                    if line.strip():
+                        self.bloom.add(bytes.fromhex(line.strip()))
+
+    @classmethod
+    def from_settings(cls, settings, *, fingerprinter=None):
+        return cls(job_dir(settings),
+                   settings.getbool('DUPEFILTER_DEBUG'),
+                   fingerprinter=fingerprinter,
+                   capacity=settings.getint('DUPEFILTER_BLOOM_CAPACITY',
+                                            1000000),
+                   error_rate=settings.getfloat('DUPEFILTER_BLOOM_ERROR_RATE',
+                                                0.001))
+
+    def request_seen(self, request):
+        return self.bloom.add(self.fingerprinter.fingerprint(request))
+
+    def close(self, reason):
+        self.bloom.close()
+        super(BloomDupeFilter, self).close(reason)
@@ -0,0 +1,160 @@
+"""Module for Scrapy item exporters."""
+
+
+import json
+import logging
+
+from itemadapter import ItemAdapter
+from scrapy.exporters import BaseItemExporter
+from scrapy.utils.serialize import ScrapyJSONEncoder
+
+
+logger = logging.getLogger(__name__)
+
+JSON_COLUMNS_KEY = b'finscraper.json_columns'
+
+
+def fits_dtype(value, dtype):
+    """Whether a scraped value fits into a column of a field's ``dtype``.
+
+    Args:
+        value: Scraped value.
+        dtype (str): One of ``'int64'``, ``'string'`` and ``'list<string>'``.
+
+    Returns:
+        bool: True if the value is of the type, or None.
+    """
+    if value is None:
+        return True
+    if dtype == 'int64':
+        return type(value) is int
+    if dtype == 'string':
+        return isinstance(value, str)
+    if dtype == 'list<string>':
+        return isinstance(value, list) and all(
+            element is None or isinstance(element, str)
+            for element in value)
+    return False
+
+
+def import_pyarrow():
+    """Import pyarrow and pyarrow.parquet lazily.
+
+    Returns:
+        tuple: Modules (pyarrow, pyarrow.parquet).
+
+    Raises:
+        ImportError: If pyarrow is not installed.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(
+            'Parquet support requires pyarrow, install it with '
+            '`pip install finscraper[parquet]`') from e
+    return pa, pq
+
+
+class ParquetItemExporter(BaseItemExporter):
+    """Exporter that writes items into Parquet row groups.
+
+    Columns are derived from the fields of the item class, or the keys of
+    the first item. Fields declared with ``Field(optional=True)`` are
+    columns only when the first item has them. Fields that declare a
+    ``dtype`` of ``'int64'``, ``'string'`` or ``'list<string>'``, e.g.
+    ``Field(dtype='int64')``, are written into columns of that type. Values
+    that do not fit the type are written as nulls, with a warning. Other
+    fields, whose values may be nested or vary in type, are string columns
+    of JSON-encoded values. The names of JSON columns are saved in the
+    schema metadata, and the values are decoded when reading.
+
+    Row group size can be set through ``item_export_kwargs`` feed option
+    ``row_group_size``, which defaults to 1000 items.
+    """
+
+    def __init__(self, file, **kwargs):
+        self.row_group_size = kwargs.pop('row_group_size', 1000)
+        super(ParquetItemExporter, self).__init__(dont_fail=True, **kwargs)
+        self.pa, self.pq = import_pyarrow()
+        self.file = file
+        self.encoder = ScrapyJSONEncoder(ensure_ascii=False)
+        self._columns = None
+        self._dtypes = None
+        self._schema = None
+        self._writer = None
+        self._rows = []
+
+    def export_item(self, item):
+        adapter = ItemAdapter(item)
+        if self._columns is None:
+            self._columns = list(self.fields_to_export or adapter.keys())
+            self._columns.extend(
+                field for field in adapter.field_names()
+                if field not in self._columns and
+                not adapter.get_field_meta(field).get('optional'))
+            self._dtypes = {column: self._get_dtype(adapter, column)
+                            for column in self._columns}
+        self._rows.append({column: adapter.get(column)
+                           for column in self._columns})
+        if len(self._rows) >= self.row_group_size:
+            self._write_row_group()
+
+    def finish_exporting(self):
+        if len(self._rows) > 0:
+            self._write_row_group()
+        if self._writer is not None:
+            self._writer.close()
+
+    def _get_dtype(self, adapter, column):
+        if column not in adapter.field_names():
+            return None
+        dtype = adapter.get_field_meta(column).get('dtype')
+        return dtype if dtype in self._arrow_types else None
+
+    @property
+    def _arrow_types(self):
+        pa = self.pa
+        return {'int64': pa.int64(), 'string': pa.string(),
+                'list<string>': pa.list_(pa.string())}
+
+    def _encode(self, value):
+        return None if value is None else self.encoder.encode(value)
+
+    def _init_schema(self):
+        pa = self.pa
+        arrow_types = self._arrow_types
+        json_columns = [column for column in self._columns
+                        if self._dtypes[column] is None]
+        metadata = {JSON_COLUMNS_KEY: json.dumps(json_columns)}
+        self._schema = pa.schema(
+            [pa.field(column, arrow_types.get(self._dtypes[column],
+                                              pa.string()))
+             for column in self._columns],
+            metadata=metadata)
+        self._writer = self.pq.ParquetWriter(self.file, self._schema)
+
+    def _get_values(self, column):
+        values = [row[column] for row in self._rows]
+        dtype = self._dtypes[column]
+        if dtype is None:
+            return [self._encode(value) for value in values]
+        n_dropped = sum(not fits_dtype(value, dtype) for value in values)
+        if n_dropped > 0:
+            logger.warning(f'Wrote {n_dropped} values of "{column}" as null, '
+                           f'since they are not of type {dtype}')
+            values = [value if fits_dtype(value, dtype) else None
+                      for value in values]
+        return values
+
+    def _write_row_group(self):
+        if self._schema is None:
+            self._init_schema()
+        arrays = [
+            self.pa.array(self._get_values(column),
+                          type=self._schema.field(column).type)
+            for column in self._columns
+        ]
+        table = self.pa.Table.from_arrays(arrays, schema=self._schema)
+        self._writer.write_table(table)
+        self._rows = []
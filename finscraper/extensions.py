@@ -10,6 +10,7 @@ from scrapy.exceptions import NotConfigured
 
 from tqdm.auto import tqdm
 
+from finscraper.seen import SeenItemIndex
 from finscraper.utils import TqdmLogger
 
 
@@ -81,3 +82,40 @@ class ProgressBar:
     def on_item_scraped(self, item, spider):
         self.counter['itemcount'] += 1
         self.progress_bar.update()
+
+
+class IncrementalCrawl:
+    """Scrapy extension that skips items scraped in earlier runs.
+
+    Enabled via ``SEEN_INDEX_PATH`` Scrapy setting, which is the path of
+    a ``SeenItemIndex`` database. Scraped items are added into the index,
+    and spiders skip requests of items found in it. Items are scraped again
+    after ``SEEN_INDEX_EXPIRY`` seconds, if set.
+    """
+    def __init__(self, crawler):
+        if not crawler.settings.get('SEEN_INDEX_PATH'):
+            raise NotConfigured
+        self.index = SeenItemIndex.from_settings(crawler.settings)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        ext = cls(crawler)
+        crawler.signals.connect(ext.spider_opened, signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signals.spider_closed)
+        crawler.signals.connect(ext.on_item_scraped,
+                                signal=signals.item_scraped)
+        return ext
+
+    def spider_opened(self, spider):
+        spider.seen_index = self.index
+
+    def spider_closed(self, spider):
+        spider.seen_index = None
+        self.index.close()
+
+    def on_item_scraped(self, item, response, spider):
+        # Item pages are requested with the URL before redirects
+        urls = [response.url]
+        if response.request is not None:
+            urls.append(response.request.url)
+        self.index.add(*urls)
@@ -0,0 +1,317 @@
+"""Module for a crawl frontier shared between processes and hosts."""
+
+
+import os
+import pickle
+import sqlite3
+import time
+import uuid
+
+from weakref import WeakKeyDictionary
+
+from scrapy import signals
+from scrapy.core.scheduler import Scheduler
+from scrapy.dupefilters import RFPDupeFilter
+from scrapy.exceptions import CloseSpider, DontCloseSpider, NotConfigured
+from scrapy.utils.job import job_dir
+from scrapy.utils.misc import load_object
+from scrapy.utils.request import request_from_dict
+
+
+def get_frontier_path(settings):
+    """Get path of the frontier database from settings.
+
+    Args:
+        settings (scrapy.settings.Settings): Crawler settings.
+
+    Returns:
+        str: ``FRONTIER_SQLITE_PATH`` if set, otherwise ``frontier.sqlite``
+        in ``JOBDIR``.
+
+    Raises:
+        ValueError: If neither of the settings has been set.
+    """
+    path = settings.get('FRONTIER_SQLITE_PATH')
+    if path:
+        return str(path)
+    jobdir = job_dir(settings)
+    if jobdir:
+        return os.path.join(jobdir, 'frontier.sqlite')
+    raise ValueError('Frontier requires FRONTIER_SQLITE_PATH or JOBDIR')
+
+
+def connect(path, timeout=60):
+    """Connect into a frontier database and create its tables.
+
+    Transactions are handled explicitly by the caller, so that competing
+    processes can claim requests atomically. A request is available when
+    it has no owner.
+
+    Args:
+        path (str): Path of the SQLite database.
+        timeout (float, optional): Seconds to wait for other processes to
+            release their locks. Defaults to 60.
+
+    Returns:
+        sqlite3.Connection
+    """
+    conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+    conn.execute('CREATE TABLE IF NOT EXISTS requests ('
+                 'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                 'priority INTEGER NOT NULL, '
+                 'data BLOB NOT NULL, '
+                 'owner TEXT, '
+                 'claimed_at REAL)')
+    conn.execute('CREATE INDEX IF NOT EXISTS requests_order '
+                 'ON requests (priority DESC, id) WHERE owner IS NULL')
+    conn.execute('CREATE TABLE IF NOT EXISTS fingerprints ('
+                 'fingerprint TEXT PRIMARY KEY) WITHOUT ROWID')
+    return conn
+
+
+class SQLiteRequestQueue:
+    """Priority queue of requests stored in a SQLite database.
+
+    Every request is claimed by exactly one of the processes sharing the
+    database, and removed once its response has been processed. Requests
+    claimed but not processed are released when the queue is closed, or
+    after ``lease_timeout`` seconds if their process died.
+
+    Requests are stored pickled, so the database must be trusted: anyone
+    who can write into it can run code in the processes that read it. The
+    row of a claimed request is kept in its meta under ``meta_key`` while
+    it is downloaded, so that retries and redirects replace the row.
+
+    Args:
+        conn (sqlite3.Connection): Frontier database connection.
+        spider (scrapy.Spider): Spider that owns the callbacks of requests.
+        lease_timeout (float, optional): Seconds after which claims of
+            other processes are considered abandoned. Defaults to 600.
+    """
+    meta_key = 'frontier_id'
+
+    def __init__(self, conn, spider, lease_timeout=600):
+        self.conn = conn
+        self.spider = spider
+        self.lease_timeout = lease_timeout
+        self.owner = uuid.uuid4().hex
+        self.conn.execute(
+            'UPDATE requests SET owner = NULL, claimed_at = NULL '
+            'WHERE claimed_at < ?', (time.time() - lease_timeout,))
+
+    def push(self, request):
+        try:
+            data = pickle.dumps(request.to_dict(spider=self.spider),
+                                protocol=4)
+        except Exception as e:
+            raise ValueError(str(e)) from e  # Scheduler keeps it in memory
+        self.conn.execute(
+            'INSERT INTO requests (priority, data) VALUES (?, ?)',
+            (request.priority, data))
+        # Retried and redirected requests replace their earlier rows
+        self.done(request.meta.get(self.meta_key))
+
+    def pop(self):
+        conn = self.conn
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT id, data FROM requests WHERE owner IS NULL '
+                'ORDER BY priority DESC, id LIMIT 1').fetchone()
+            if row is not None:
+                conn.execute(
+                    'UPDATE requests SET owner = ?, claimed_at = ? '
+                    'WHERE id = ?', (self.owner, time.time(), row[0]))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        if row is None:
+            return None
+        request = request_from_dict(pickle.loads(row[1]), spider=self.spider)
+        request.meta[self.meta_key] = row[0]
+        return request
+
+    def done(self, request_id):
+        """Remove a claimed request by the row id given in its meta."""
+        if request_id is not None:
+            self.conn.execute('DELETE FROM requests WHERE id = ?',
+                              (request_id,))
+
+    def claimed_by_others(self):
+        """Number of requests that other processes are downloading."""
+        return self.conn.execute(
+            'SELECT COUNT(*) FROM requests WHERE owner != ? AND '
+            'claimed_at >= ?',
+            (self.owner, time.time() - self.lease_timeout)).fetchone()[0]
+
+    def close(self):
+        self.conn.execute(
+            'UPDATE requests SET owner = NULL, claimed_at = NULL '
+            'WHERE owner = ?', (self.owner,))
+        self.conn.close()
+        return []
+
+    def __len__(self):
+        return self.conn.execute(
+            'SELECT COUNT(*) FROM requests WHERE owner IS NULL').fetchone()[0]
+
+
+class SQLiteScheduler(Scheduler):
+    """Scheduler that shares its request queue through a SQLite database.
+
+    Processes on one or many hosts that point ``FRONTIER_SQLITE_PATH`` into
+    the same database, e.g. on a shared file system, pull disjoint requests
+    from it. Use it together with ``SQLiteDupeFilter`` so that no page is
+    fetched twice. Requests that cannot be serialized, such as requests with
+    Selenium callbacks, stay in the memory of the process that created them.
+    Requests are pickled into the database, so only share it with processes
+    and hosts that are trusted.
+
+    A process stops when the shared queue is empty and no other process is
+    downloading requests of it, unless other processes add requests into it
+    within ``FRONTIER_IDLE_WAIT`` seconds. Requests
+    claimed by a process that died are released after
+    ``FRONTIER_LEASE_TIMEOUT`` seconds.
+    """
+    shared = True
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        scheduler = super(SQLiteScheduler, cls).from_crawler(crawler)
+        scheduler.frontier_path = get_frontier_path(crawler.settings)
+        scheduler.frontier_timeout = crawler.settings.getfloat(
+            'FRONTIER_SQLITE_TIMEOUT', 60)
+        scheduler.idle_wait = crawler.settings.getfloat(
+            'FRONTIER_IDLE_WAIT', 0)
+        scheduler.lease_timeout = crawler.settings.getfloat(
+            'FRONTIER_LEASE_TIMEOUT', 600)
+        scheduler.idle_since = None
+        crawler.signals.connect(scheduler.spider_idle, signals.spider_idle)
+        return scheduler
+
+    def _dqdir(self, jobdir):
+        return None  # Requests are not stored in JOBDIR
+
+    def open(self, spider):
+        result = super(SQLiteScheduler, self).open(spider)
+        conn = connect(self.frontier_path, timeout=self.frontier_timeout)
+        self.dqs = SQLiteRequestQueue(conn, spider,
+                                      lease_timeout=self.lease_timeout)
+        return result
+
+    def close(self, reason):
+        if self.dqs is not None:
+            self.dqs.close()
+            self.dqs = None
+        return self.df.close(reason)
+
+    def next_request(self):
+        request = super(SQLiteScheduler, self).next_request()
+        if request is not None:
+            self.idle_since = None
+        return request
+
+    def done(self, request_id):
+        """Remove a request from the shared queue by its row id."""
+        if self.dqs is not None:
+            self.dqs.done(request_id)
+
+    def spider_idle(self, spider):
+        if self.dqs is not None and self.dqs.claimed_by_others():
+            self.idle_since = None  # Their responses may add requests
+            self._poll()
+        now = time.monotonic()
+        if self.idle_since is None:
+            self.idle_since = now
+        if now - self.idle_since < self.idle_wait:
+            self._poll()
+
+    def _poll(self):
+        # Check the shared queue sooner than the heartbeat of the engine
+        slot = self.crawler.engine.slot
+        if slot is not None:
+            slot.nextcall.schedule(1)
+        raise DontCloseSpider
+
+
+class FrontierMiddleware:
+    """Spider middleware that removes processed requests from the frontier.
+
+    A request is removed from the queue of ``SQLiteScheduler`` once the
+    spider has processed its response. Responses that are discarded, e.g.
+    when the spider closes after ``CLOSESPIDER_ITEMCOUNT`` items, are
+    released for other processes instead. Not configured with other
+    schedulers.
+
+    The row id is taken out of the meta of the response before the spider
+    sees it, so that requests which copy the meta of their response do not
+    refer to the row of their parent.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self._request_ids = WeakKeyDictionary()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        scheduler_cls = load_object(crawler.settings['SCHEDULER'])
+        if not issubclass(scheduler_cls, SQLiteScheduler):
+            raise NotConfigured
+        return cls(crawler)
+
+    def _done(self, response):
+        request_id = self._request_ids.pop(response, None)
+        if request_id is not None:
+            self.crawler.engine.slot.scheduler.done(request_id)
+
+    def process_spider_input(self, response, spider):
+        request_id = response.meta.pop(SQLiteRequestQueue.meta_key, None)
+        if request_id is not None:
+            self._request_ids[response] = request_id
+
+    def process_spider_output(self, response, result, spider):
+        yield from result
+        self._done(response)
+
+    def process_spider_exception(self, response, exception, spider):
+        if not isinstance(exception, CloseSpider):
+            self._done(response)
+
+
+class SQLiteDupeFilter(RFPDupeFilter):
+    """Duplicate filter that shares seen fingerprints through SQLite.
+
+    Uses the same database as ``SQLiteScheduler``. A fingerprint is
+    inserted atomically, so that only one of the processes sharing the
+    database sees a request as new.
+
+    Args:
+        path (str): Path of the SQLite database.
+        debug (bool, optional): Whether to log all filtered requests.
+            Defaults to False.
+        fingerprinter (optional): Request fingerprinter.
+        timeout (float, optional): Seconds to wait for other processes to
+            release their locks. Defaults to 60.
+    """
+
+    def __init__(self, path, debug=False, *, fingerprinter=None, timeout=60):
+        super(SQLiteDupeFilter, self).__init__(
+            None, debug, fingerprinter=fingerprinter)
+        self.conn = connect(path, timeout=timeout)
+
+    @classmethod
+    def from_settings(cls, settings, *, fingerprinter=None):
+        return cls(get_frontier_path(settings),
+                   settings.getbool('DUPEFILTER_DEBUG'),
+                   fingerprinter=fingerprinter,
+                   timeout=settings.getfloat('FRONTIER_SQLITE_TIMEOUT', 60))
+
+    def request_seen(self, request):
+        cursor = self.conn.execute(
+            'INSERT OR IGNORE INTO fingerprints (fingerprint) VALUES (?)',
+            (self.request_fingerprint(request),))
+        return cursor.rowcount == 0
+
+    def close(self, reason):
+        self.conn.close()
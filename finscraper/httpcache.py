@@ -0,0 +1,123 @@
+"""Module for caching HTTP responses between runs."""
+
+
+import gzip
+import logging
+import os
+import shutil
+
+from collections import OrderedDict
+
+from scrapy.extensions.httpcache import FilesystemCacheStorage, \
+    RFC2616Policy
+from scrapy.utils.job import job_dir
+from scrapy.utils.project import data_path
+
+
+logger = logging.getLogger(__name__)
+
+
+class ConditionalPolicy(RFC2616Policy):
+    """Cache policy that revalidates cached responses with the server.
+
+    Only responses with an ``ETag`` or ``Last-Modified`` header are cached.
+    Unless the server has given them an explicit lifetime, cached responses
+    are validated on every request with ``If-None-Match`` and
+    ``If-Modified-Since`` headers, and used when the server responds with
+    304 Not Modified. Pages that change often, such as front pages, are
+    thus up to date, but downloaded only when they have changed.
+    """
+
+    def should_cache_response(self, response, request):
+        if (b'ETag' not in response.headers and
+                b'Last-Modified' not in response.headers):
+            return False
+        return super(ConditionalPolicy, self).should_cache_response(
+            response, request)
+
+    def is_cached_response_fresh(self, cachedresponse, request):
+        # Freshness is not guessed from Last-Modified, unlike in RFC2616Policy
+        cc = self._parse_cachecontrol(cachedresponse)
+        if b'max-age' in cc or b'Expires' in cachedresponse.headers:
+            return super(ConditionalPolicy, self).is_cached_response_fresh(
+                cachedresponse, request)
+        self._set_conditional_validators(request, cachedresponse)
+        return False
+
+
+class LRUCacheStorage(FilesystemCacheStorage):
+    """Filesystem cache storage with compression and a maximum size.
+
+    Responses are always stored with gzip compression. When the cache grows
+    over ``HTTPCACHE_MAX_SIZE`` bytes, the least recently used responses are
+    removed. A relative ``HTTPCACHE_DIR`` is placed into ``JOBDIR``, if set,
+    so that the cache is saved with the spider.
+    """
+
+    def __init__(self, settings):
+        super(LRUCacheStorage, self).__init__(settings)
+        cachedir = settings['HTTPCACHE_DIR']
+        jobdir = job_dir(settings)
+        if jobdir and not os.path.isabs(cachedir):
+            self.cachedir = os.path.join(jobdir, cachedir)
+        else:
+            self.cachedir = data_path(cachedir)
+        self.use_gzip = True
+        self.max_size = settings.getint('HTTPCACHE_MAX_SIZE', 0)
+        self._open = gzip.open
+        self._entries = OrderedDict()  # Path -> size, least recent first
+        self._size = 0
+
+    def open_spider(self, spider):
+        super(LRUCacheStorage, self).open_spider(spider)
+        entries = []
+        spider_dir = os.path.join(self.cachedir, spider.name)
+        for prefix in _scandirs(spider_dir):
+            for entry in _scandirs(prefix.path):
+                entries.append((entry.stat().st_mtime, entry.path,
+                                _get_size(entry.path)))
+        self._entries = OrderedDict(
+            (path, size) for _, path, size in sorted(entries))
+        self._size = sum(self._entries.values())
+        logger.debug(f'HTTP cache has {len(self._entries)} responses, '
+                     f'{self._size} bytes')
+
+    def retrieve_response(self, spider, request):
+        response = super(LRUCacheStorage, self).retrieve_response(
+            spider, request)
+        if response is not None:
+            rpath = self._get_request_path(spider, request)
+            os.utime(rpath)
+            if rpath in self._entries:
+                self._entries.move_to_end(rpath)
+        return response
+
+    def store_response(self, spider, request, response):
+        super(LRUCacheStorage, self).store_response(spider, request, response)
+        rpath = self._get_request_path(spider, request)
+        os.utime(rpath)
+        self._size -= self._entries.pop(rpath, 0)
+        self._entries[rpath] = _get_size(rpath)
+        self._size += self._entries[rpath]
+        self._evict(spider)
+
+    def _evict(self, spider):
+        if self.max_size <= 0:
+            return
+        while self._size > self.max_size and len(self._entries) > 1:
+            rpath, size = self._entries.popitem(last=False)
+            shutil.rmtree(rpath, ignore_errors=True)
+            self._size -= size
+            spider.crawler.stats.inc_value('httpcache/evict', spider=spider)
+
+
+def _scandirs(path):
+    try:
+        return [entry for entry in os.scandir(path) if entry.is_dir()]
+    except FileNotFoundError:
+        return []
+
+
+def _get_size(path):
+    return sum(entry.stat().st_size for entry in os.scandir(path)
+               if entry.is_file())
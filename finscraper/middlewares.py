@@ -1,17 +1,33 @@
 """Module for Scrapy middlewares."""
 
 
-from scrapy import signals
-from scrapy.exceptions import NotConfigured
+import hashlib
+import pickle
+import queue
+
+from scrapy import Request, signals
+from scrapy.exceptions import DontCloseSpider, NotConfigured
 from scrapy.http import HtmlResponse
+from scrapy.utils.request import request_from_dict
+
+from twisted.internet import reactor, task, threads
+from twisted.python.threadpool import ThreadPool
+from w3lib.url import canonicalize_url
 
 from finscraper.request import SeleniumCallbackRequest
-from finscraper.utils import get_chromedriver
+from finscraper.utils import ChromeDriverPool
 
 
 class SeleniumCallbackMiddleware:
     """Middleware that processes request with given callback.
 
+    Requests are processed with a pool of Chrome drivers, whose maximum
+    size is set via ``SELENIUM_POOL_SIZE`` Scrapy setting (default 1).
+    Drivers are started when needed, and each request gets a driver that
+    no other request is using. Requests are processed in a thread pool of
+    the same size, so that the reactor keeps downloading and parsing other
+    requests meanwhile.
+
     Headless mode can be disabled via ``DISABLE_HEADLESS`` Scrapy setting.
     In non-headless mode, window can be minimized via ``MINIMIZE_WINDOW``
     Scrapy setting.
@@ -30,27 +46,222 @@ class SeleniumCallbackMiddleware:
         return middleware
 
     def spider_opened(self, spider):
-        try:
-            self.driver = get_chromedriver(settings=self.settings)
-        except Exception:
-            raise NotConfigured('Could not get chromedriver')
+        # Drivers are started only when Selenium requests are processed
+        pool_size = self.settings.getint('SELENIUM_POOL_SIZE', 1)
+        self.pool = ChromeDriverPool(pool_size, settings=self.settings)
+        self.threadpool = ThreadPool(minthreads=0, maxthreads=pool_size,
+                                     name='SeleniumCallbackMiddleware')
+        self.threadpool.start()
 
     def spider_closed(self, spider):
-        if hasattr(self, 'driver'):
-            self.driver.close()
+        # Waits for the requests in progress, so not in the reactor thread
+        return threads.deferToThread(self._close)
+
+    def _close(self):
+        if hasattr(self, 'threadpool'):
+            self.threadpool.stop()
+        if hasattr(self, 'pool'):
+            self.pool.close()
 
     def process_request(self, request, spider):
         if not isinstance(request, SeleniumCallbackRequest):
             return None
 
+        return threads.deferToThreadPool(
+            reactor, self.threadpool, self._process_in_thread, request,
+            spider)
+
+    def _process_in_thread(self, request, spider):
+        with self.pool.driver() as driver:
+            return self._process_request(request, spider, driver)
+
+    def _process_request(self, request, spider, driver):
         selenium_callback = request.meta.get('selenium_callback')
         if selenium_callback is None:
-            self.driver.get(request.url)
+            driver.get(request.url)
             return HtmlResponse(
-                self.driver.current_url,
-                body=self.driver.page_source.encode('utf-8'),
+                driver.current_url,
+                body=driver.page_source.encode('utf-8'),
                 encoding='utf-8',
                 request=request
             )
         else:
-            return selenium_callback(request, spider, self.driver)
+            return selenium_callback(request, spider, driver)
+
+
+def get_shard(url, count):
+    """Get shard of an URL based on a stable hash of its canonical form.
+
+    Args:
+        url (str): URL of the request.
+        count (int): Number of shards.
+
+    Returns:
+        int: Shard index in [0, count).
+    """
+    digest = hashlib.md5(canonicalize_url(url).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count
+
+
+class ShardContext:
+    """State shared between the processes of a sharded crawl.
+
+    Args:
+        index (int): Shard of this process.
+        count (int): Number of shards.
+        inboxes (list of multiprocessing.Queue): Request queue per shard.
+        lock (multiprocessing.Lock): Lock for the shared values below.
+        pending (multiprocessing.RawValue): Number of requests sent but not
+            yet received.
+        states (multiprocessing.RawArray): State of each shard, one of
+            ``BUSY``, ``IDLE`` or ``CLOSED``.
+        itemcount (multiprocessing.RawValue): Number of items scraped in all
+            shards.
+        max_itemcount (int): Number of items to scrape in all shards. Zero
+            corresponds to no limit.
+    """
+    BUSY = 0
+    IDLE = 1
+    CLOSED = 2
+
+    def __init__(self, index, count, inboxes, lock, pending, states,
+                 itemcount, max_itemcount):
+        self.index = index
+        self.count = count
+        self.inboxes = inboxes
+        self.lock = lock
+        self.pending = pending
+        self.states = states
+        self.itemcount = itemcount
+        self.max_itemcount = max_itemcount
+
+
+class ShardMiddleware:
+    """Middleware that partitions requests between processes.
+
+    Each request belongs to the shard given by ``get_shard``. Requests of
+    other shards are sent to the processes of those shards, and the number
+    of scraped items is shared between all processes. Requests that cannot
+    be serialized, e.g. with Selenium callbacks, stay in the shard that
+    created them. Requests received by a shard that stops after the given
+    number of items are kept in its ``JOBDIR`` queue for the next crawl.
+
+    Enabled when ``context`` has been set in the crawling process.
+    """
+    context = None
+
+    def __init__(self, crawler, context):
+        self.crawler = crawler
+        self.context = context
+        self._receive_loop = None
+        self._closing = False
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if cls.context is None:
+            raise NotConfigured
+        middleware = cls(crawler, cls.context)
+        crawler.signals.connect(middleware.spider_opened,
+                                signals.spider_opened)
+        crawler.signals.connect(middleware.spider_closed,
+                                signals.spider_closed)
+        crawler.signals.connect(middleware.spider_idle, signals.spider_idle)
+        crawler.signals.connect(middleware.item_scraped,
+                                signals.item_scraped)
+        return middleware
+
+    def spider_opened(self, spider):
+        self._receive_loop = task.LoopingCall(self._receive, spider)
+        self._receive_loop.start(0.1, now=False)
+
+    def spider_closed(self, spider):
+        if self._receive_loop is not None and self._receive_loop.running:
+            self._receive_loop.stop()
+
+        # Discard requests that will not be crawled anymore
+        context = self.context
+        with context.lock:
+            context.states[context.index] = context.CLOSED
+        for _ in self._get_inbox():
+            pass
+
+    def spider_idle(self, spider):
+        context = self.context
+        with context.lock:
+            context.states[context.index] = context.IDLE
+            done = (context.pending.value <= 0 and
+                    all(state != context.BUSY for state in context.states))
+        if not done:  # Other shards may still send requests
+            raise DontCloseSpider
+
+    def item_scraped(self, item, spider):
+        context = self.context
+        with context.lock:
+            context.itemcount.value += 1
+        self._check_itemcount(spider)
+
+    def process_start_requests(self, start_requests, spider):
+        # All shards create the same start requests
+        for request in start_requests:
+            if get_shard(request.url, self.context.count) == \
+                    self.context.index:
+                yield request
+
+    def process_spider_output(self, response, result, spider):
+        for element in result:
+            if isinstance(element, Request) and self._send(element, spider):
+                continue
+            yield element
+
+    def _check_itemcount(self, spider):
+        context = self.context
+        if (not self._closing and context.max_itemcount and
+                context.itemcount.value >= context.max_itemcount):
+            self._closing = True
+
+            # Requests sent to this shard are saved into its JOBDIR queue,
+            # so that they are crawled when scraping continues
+            with context.lock:
+                context.states[context.index] = context.CLOSED
+            for data in self._get_inbox():
+                self.crawler.engine.crawl(
+                    request_from_dict(pickle.loads(data), spider=spider))
+            self.crawler.engine.close_spider(spider, 'closespider_itemcount')
+        return self._closing
+
+    def _send(self, request, spider):
+        context = self.context
+        shard = get_shard(request.url, context.count)
+        if shard == context.index:
+            return False
+        try:
+            data = pickle.dumps(request.to_dict(spider=spider), protocol=4)
+        except Exception:
+            return False
+        with context.lock:
+            if context.states[shard] == context.CLOSED:
+                return False
+            context.pending.value += 1
+        context.inboxes[shard].put(data)
+        return True
+
+    def _receive(self, spider):
+        if self._check_itemcount(spider):
+            return
+        context = self.context
+        for data in self._get_inbox(state=context.BUSY):
+            request = request_from_dict(pickle.loads(data), spider=spider)
+            self.crawler.engine.crawl(request)
+
+    def _get_inbox(self, state=None):
+        context = self.context
+        while True:
+            try:
+                data = context.inboxes[context.index].get_nowait()
+            except queue.Empty:
+                break
+            with context.lock:
+                if state is not None:
+                    context.states[context.index] = state
+                context.pending.value -= 1
+            yield data
@@ -0,0 +1,198 @@
+"""Module for finding near-duplicate texts with MinHash."""
+
+
+import hashlib
+import re
+import sqlite3
+import zlib
+
+import numpy as np
+
+from w3lib.url import canonicalize_url
+
+
+_WORD_RE = re.compile(r'\w+')
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_permutations = {}
+
+
+def _get_permutations(num_perm):
+    # Same random permutations in every process and run
+    if num_perm not in _permutations:
+        rng = np.random.RandomState(1)
+        _permutations[num_perm] = (
+            rng.randint(1, 1 << 31, num_perm).astype(np.uint64),
+            rng.randint(0, 1 << 31, num_perm).astype(np.uint64))
+    return _permutations[num_perm]
+
+
+def minhash(text, num_perm=128, shingle_size=3):
+    """Compute MinHash signature of a text.
+
+    The share of equal values in the signatures of two texts estimates the
+    Jaccard similarity of their shingles, i.e. sequences of consecutive
+    lowercase words.
+
+    Args:
+        text (str): Text to hash.
+        num_perm (int, optional): Length of the signature. Defaults to 128.
+        shingle_size (int, optional): Number of words per shingle. Defaults
+            to 3.
+
+    Returns:
+        numpy.ndarray or None: Signature of ``uint32`` values, or None if
+        the text has no words.
+    """
+    words = _WORD_RE.findall(text.lower())
+    if len(words) == 0:
+        return None
+    n = max(1, len(words) - shingle_size + 1)
+    hashes = np.fromiter(
+        (zlib.crc32(' '.join(words[i:i + shingle_size]).encode('utf-8'))
+         for i in range(n)), dtype=np.uint64, count=n)
+    a, b = _get_permutations(num_perm)
+    permuted = (np.outer(hashes, a) + b) % _MERSENNE_PRIME & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def jaccard(signature, other):
+    """Estimate Jaccard similarity of two texts from their signatures."""
+    return float(np.mean(signature == other))
+
+
+class MinHashIndex:
+    """Index of MinHash signatures for finding near-duplicates.
+
+    Signatures are stored in a SQLite database. Each signature is split
+    into bands of ``rows`` values, and only signatures that share a whole
+    band with the query are compared with it. Texts with a similarity of
+    0.5 share a band with a probability of 87% with the defaults, and
+    dissimilar texts almost never do, so lookups stay fast with millions of
+    signatures. URLs are stored in their canonical form, and a text is
+    never a near-duplicate of another text with the same URL.
+
+    Args:
+        path (str): Path of the SQLite database.
+        num_perm (int, optional): Length of signatures. Defaults to 128.
+        rows (int, optional): Values per band. Defaults to 4.
+        threshold (float, optional): Minimum estimated Jaccard similarity
+            of near-duplicates. Defaults to 0.5.
+        timeout (float, optional): Seconds to wait for other processes to
+            release their locks. Defaults to 60.
+
+    Raises:
+        ValueError: If the database has been created with another
+            ``num_perm`` or ``rows``.
+    """
+
+    def __init__(self, path, num_perm=128, rows=4, threshold=0.5,
+                 timeout=60):
+        self.path = path
+        self.num_perm = num_perm
+        self.rows = rows
+        self.threshold = threshold
+        self.conn = sqlite3.connect(path, timeout=timeout,
+                                    isolation_level=None)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS meta ('
+                          'key TEXT PRIMARY KEY, value) WITHOUT ROWID')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS signatures ('
+                          'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                          'signature BLOB NOT NULL, '
+                          'url TEXT)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS signatures_url '
+                          'ON signatures (url)')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS bands ('
+                          'band INTEGER NOT NULL, '
+                          'signature_id INTEGER NOT NULL, '
+                          'PRIMARY KEY (band, signature_id)) WITHOUT ROWID')
+        for key, value in (('num_perm', num_perm), ('rows', rows)):
+            self.conn.execute('INSERT OR IGNORE INTO meta (key, value) '
+                              'VALUES (?, ?)', (key, value))
+            stored_value = self.conn.execute(
+                'SELECT value FROM meta WHERE key = ?', (key,)).fetchone()[0]
+            if stored_value != value:
+                raise ValueError(f'Index in {path} has been created with '
+                                 f'{key} {stored_value}, not {value}')
+
+    def _get_bands(self, signature):
+        data = signature.astype('<u4').tobytes()
+        size = self.rows * 4
+        return [
+            int.from_bytes(hashlib.blake2b(
+                data[start:start + size], digest_size=8,
+                person=start.to_bytes(4, 'little')).digest(),
+                'little', signed=True)
+            for start in range(0, self.num_perm // self.rows * size, size)
+        ]
+
+    def query(self, signature, url=None):
+        """Find the most similar near-duplicate of a signature.
+
+        Args:
+            signature (numpy.ndarray): MinHash signature.
+            url (str, optional): URL of the text, whose own signatures are
+                not near-duplicates. Defaults to None.
+
+        Returns:
+            tuple or None: ID, URL and estimated similarity of the most
+            similar signature over ``threshold``, or None if there is none.
+        """
+        bands = self._get_bands(signature)
+        rows = self.conn.execute(
+            'SELECT id, signature, url FROM signatures WHERE id IN ('
+            'SELECT signature_id FROM bands WHERE band IN '
+            f'({", ".join("?" * len(bands))}))', bands)
+        url = None if url is None else canonicalize_url(url)
+        nearest = None
+        for signature_id, data, other_url in rows:
+            if url is not None and other_url == url:
+                continue  # Same text scraped again
+            other = np.frombuffer(data, dtype='<u4')
+            similarity = jaccard(signature, other)
+            if similarity >= self.threshold and (
+                    nearest is None or similarity > nearest[2]):
+                nearest = (signature_id, other_url, similarity)
+        return nearest
+
+    def add(self, signature, url=None):
+        """Add a signature into the index.
+
+        A text whose URL is in the index already is not added again.
+
+        Args:
+            signature (numpy.ndarray): MinHash signature.
+            url (str, optional): URL of the text. Defaults to None.
+
+        Returns:
+            int: ID of the signature, or of the earlier signature of the URL.
+        """
+        url = None if url is None else canonicalize_url(url)
+        conn = self.conn
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = None if url is None else conn.execute(
+                'SELECT MIN(id) FROM signatures WHERE url = ?',
+                (url,)).fetchone()
+            if row is not None and row[0] is not None:
+                conn.execute('COMMIT')
+                return row[0]
+            signature_id = conn.execute(
+                'INSERT INTO signatures (signature, url) VALUES (?, ?)',
+                (signature.astype('<u4').tobytes(), url)).lastrowid
+            conn.executemany(
+                'INSERT OR IGNORE INTO bands (band, signature_id) '
+                'VALUES (?, ?)',
+                [(band, signature_id) for band in self._get_bands(signature)])
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return signature_id
+
+    def __len__(self):
+        return self.conn.execute(
+            'SELECT COUNT(*) FROM signatures').fetchone()[0]
+
+    def close(self):
+        self.conn.close()
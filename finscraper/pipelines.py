@@ -1,10 +1,118 @@
 """Module for Scrapy pipelines."""
 
 
+import logging
+import os
+
+from itemadapter import ItemAdapter
+from scrapy.exceptions import DropItem, NotConfigured
+from scrapy.utils.job import job_dir
+
+from finscraper.minhash import MinHashIndex, minhash
+
+
+logger = logging.getLogger(__name__)
+
+
 class DefaultValueNonePipeline:
-    """Pipeline that sets default values of all item fields to None."""
+    """Pipeline that sets default values of all item fields to None.
+
+    Fields declared with ``Field(optional=True)``, e.g. ``cluster_id`` that
+    is only set by ``NearDuplicatePipeline``, are left out instead.
+    """
 
     def process_item(self, item, spider):
-        for field in item.fields:
-            item.setdefault(field, None)
+        for field, meta in item.fields.items():
+            if not meta.get('optional'):
+                item.setdefault(field, None)
+        return item
+
+
+class NearDuplicatePipeline:
+    """Pipeline that finds near-duplicate texts, e.g. syndicated news.
+
+    Enabled via ``NEAR_DUPLICATE_ENABLED`` Scrapy setting. MinHash of field
+    ``NEAR_DUPLICATE_FIELD`` is looked up from a ``MinHashIndex`` stored in
+    ``NEAR_DUPLICATE_PATH``, which defaults to ``near_duplicates.sqlite`` in
+    ``JOBDIR``. Point many spiders into the same path to find duplicates
+    between them. Items are near-duplicates when the estimated Jaccard
+    similarity of their word shingles is at least
+    ``NEAR_DUPLICATE_THRESHOLD``.
+
+    With ``NEAR_DUPLICATE_ACTION = 'tag'``, items get the ID of their
+    cluster into field ``NEAR_DUPLICATE_CLUSTER_FIELD``, if their item class
+    declares it. The ID is that of the first item of the cluster. With
+    ``'drop'``, near-duplicates of earlier items are dropped. Items scraped
+    again from the same URL are not near-duplicates of themselves.
+    """
+    actions = ('tag', 'drop')
+
+    def __init__(self, path, field='content', action='tag',
+                 cluster_field='cluster_id', threshold=0.5, timeout=60):
+        if action not in self.actions:
+            raise ValueError(f'Near-duplicate action should be one of '
+                             f'{self.actions}, not "{action}"')
+        self.path = path
+        self.field = field
+        self.action = action
+        self.cluster_field = cluster_field
+        self.threshold = threshold
+        self.timeout = timeout
+        self.index = None
+        self._undeclared = set()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('NEAR_DUPLICATE_ENABLED'):
+            raise NotConfigured
+        path = settings.get('NEAR_DUPLICATE_PATH')
+        if not path:
+            jobdir = job_dir(settings)
+            if not jobdir:
+                raise NotConfigured('Near-duplicate detection requires '
+                                    'NEAR_DUPLICATE_PATH or JOBDIR')
+            path = os.path.join(jobdir, 'near_duplicates.sqlite')
+        pipeline = cls(
+            str(path),
+            field=settings.get('NEAR_DUPLICATE_FIELD', 'content'),
+            action=settings.get('NEAR_DUPLICATE_ACTION', 'tag'),
+            cluster_field=settings.get('NEAR_DUPLICATE_CLUSTER_FIELD',
+                                       'cluster_id'),
+            threshold=settings.getfloat('NEAR_DUPLICATE_THRESHOLD', 0.5),
+            timeout=settings.getfloat('NEAR_DUPLICATE_TIMEOUT', 60))
+        pipeline.stats = crawler.stats
+        return pipeline
+
+    def open_spider(self, spider):
+        self.index = MinHashIndex(self.path, threshold=self.threshold,
+                                  timeout=self.timeout)
+
+    def close_spider(self, spider):
+        self.index.close()
+
+    def process_item(self, item, spider):
+        adapter = ItemAdapter(item)
+        text = adapter.get(self.field)
+        signature = minhash(text) if isinstance(text, str) else None
+        cluster_id = None
+        if signature is not None:
+            match = self.index.query(signature, adapter.get('url'))
+            if match is None:
+                cluster_id = self.index.add(signature, adapter.get('url'))
+            else:
+                cluster_id, original_url, _ = match
+                self.stats.inc_value('near_duplicate/count', spider=spider)
+                if self.action == 'drop':
+                    raise DropItem(f'Near-duplicate of {original_url}')
+
+        if self.action == 'tag':
+            try:
+                adapter[self.cluster_field] = cluster_id
+            except KeyError:  # Field is not declared in the item class
+                if type(item) not in self._undeclared:
+                    self._undeclared.add(type(item))
+                    logger.warning(f'Field "{self.cluster_field}" is not '
+                                   f'declared in {type(item).__name__}, '
+                                   'items are not tagged')
         return item
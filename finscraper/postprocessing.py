@@ -0,0 +1,131 @@
+"""Module for processing feeds before they are saved."""
+
+
+import os
+import tempfile
+
+
+def import_zstandard():
+    """Import zstandard lazily.
+
+    Returns:
+        module: Module zstandard.
+
+    Raises:
+        ImportError: If zstandard is not installed.
+    """
+    try:
+        import zstandard as zstd
+    except ImportError as e:
+        raise ImportError(
+            'Zstandard support requires zstandard, install it with '
+            '`pip install finscraper[zstd]`') from e
+    return zstd
+
+
+def load_zstd_dict(path):
+    """Load a Zstandard dictionary saved by ``ZstdPlugin``.
+
+    Args:
+        path (str or pathlib.Path): Path of the dictionary.
+
+    Returns:
+        zstandard.ZstdCompressionDict or None: Dictionary, or None if it does
+        not exist.
+    """
+    zstd = import_zstandard()
+    try:
+        with open(path, 'rb') as f:
+            return zstd.ZstdCompressionDict(f.read())
+    except FileNotFoundError:
+        return None
+
+
+class ZstdPlugin:
+    """Feed postprocessing plugin that compresses data with Zstandard.
+
+    Data is compressed as a stream, and every run appends a new frame into
+    the file. Optionally, the first ``zstd_dict_items`` items are used for
+    training a dictionary, which is saved into ``zstd_dict_path`` and
+    reused by later runs. Items of a spider share most of their keys and
+    boilerplate, so a dictionary improves compression of short items.
+
+    Accepted ``feed_options`` parameters:
+
+    - ``zstd_level``: Compression level. Defaults to 3.
+    - ``zstd_dict_items``: Number of items to train the dictionary on.
+      Defaults to 0, which disables the dictionary. If a run scrapes fewer
+      items, or training fails, they are compressed without one.
+    - ``zstd_dict_size``: Maximum size of the dictionary in bytes. Defaults
+      to 112640.
+    - ``zstd_dict_path``: Path of the dictionary. Defaults to the path of the
+      feed with suffix ``.dict``.
+    """
+
+    def __init__(self, file, feed_options):
+        self.zstd = import_zstandard()
+        self.file = file
+        self.feed_options = feed_options
+        self.level = feed_options.get('zstd_level', 3)
+        self.dict_items = feed_options.get('zstd_dict_items', 0)
+        self.dict_size = feed_options.get('zstd_dict_size', 112640)
+        self.dict_path = feed_options.get('zstd_dict_path')
+        if self.dict_path is None and hasattr(file, 'name'):
+            self.dict_path = f'{file.name}.dict'
+
+        self._samples = []
+        self._writer = None
+        if self.dict_items > 0 and self.dict_path is not None:
+            dict_data = load_zstd_dict(self.dict_path)
+            if dict_data is not None:
+                self._open_writer(dict_data)
+        else:
+            self._open_writer()
+
+    def _open_writer(self, dict_data=None):
+        cctx = self.zstd.ZstdCompressor(level=self.level, dict_data=dict_data)
+        self._writer = cctx.stream_writer(self.file, closefd=False)
+
+    def _train_dict(self):
+        # Another process may have trained the dictionary in the meanwhile,
+        # e.g. when scraping with many workers
+        dict_data = load_zstd_dict(self.dict_path)
+        if dict_data is not None:
+            return dict_data
+        try:
+            dict_data = self.zstd.train_dictionary(
+                self.dict_size, self._samples)
+        except self.zstd.ZstdError:  # E.g. too little data
+            return None
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(self.dict_path)))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(dict_data.as_bytes())
+            os.link(tmp_path, self.dict_path)  # Fails if it already exists
+        except FileExistsError:
+            return load_zstd_dict(self.dict_path)
+        finally:
+            os.remove(tmp_path)
+        return dict_data
+
+    def _write_samples(self):
+        for sample in self._samples:
+            self._writer.write(sample)
+        self._samples = []
+
+    def write(self, data):
+        if self._writer is not None:
+            return self._writer.write(data)
+        self._samples.append(bytes(data))
+        if len(self._samples) == self.dict_items:
+            self._open_writer(self._train_dict())
+            self._write_samples()
+        return len(data)
+
+    def close(self):
+        if self._writer is None:  # Too few items for training
+            self._open_writer()
+            self._write_samples()
+        self._writer.close()
+        self.file.close()
@@ -0,0 +1,350 @@
+"""Module for reading scraped items from the job directory."""
+
+
+import gzip
+import io
+import json
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from finscraper.exporters import JSON_COLUMNS_KEY, import_pyarrow
+from finscraper.postprocessing import import_zstandard, load_zstd_dict
+
+
+def is_compressed(path):
+    """Whether a JSON lines file is compressed, based on its suffix."""
+    return Path(path).suffix in ('.gz', '.zst')
+
+
+def open_jsonlines(path):
+    """Open a JSON lines file for reading in binary mode.
+
+    Files with suffix ``.gz`` and ``.zst`` are decompressed as a stream.
+    Zstandard files are decompressed with the dictionary at the path of the
+    file with suffix ``.dict``, if it exists.
+
+    Args:
+        path (str or pathlib.Path): Path to the JSON lines file.
+
+    Returns:
+        io.BufferedIOBase: File object.
+    """
+    suffix = Path(path).suffix
+    if suffix == '.gz':
+        return gzip.open(path, 'rb')
+    elif suffix == '.zst':
+        zstd = import_zstandard()
+        dctx = zstd.ZstdDecompressor(
+            dict_data=load_zstd_dict(f'{path}.dict'))
+        return io.BufferedReader(dctx.stream_reader(
+            open(path, 'rb'), read_across_frames=True))
+    return open(path, 'rb')
+
+
+def iter_jsonlines(path, columns=None):
+    """Iterate items of a JSON lines file one by one.
+
+    Compressed files are decompressed while iterating.
+
+    Args:
+        path (str or pathlib.Path): Path to the JSON lines file.
+        columns (list of str or None, optional): Fields to keep in the items.
+            Missing fields are set to None. Defaults to None, which keeps all
+            fields.
+
+    Yields:
+        dict: Item.
+    """
+    with open_jsonlines(path) as f:
+        for line in f:
+            item = json.loads(line)
+            if columns is not None:
+                item = {column: item.get(column) for column in columns}
+            yield item
+
+
+def _get_byte_ranges(path, n):
+    size = os.path.getsize(path)
+    bounds = [size * i // n for i in range(n + 1)]
+    return [(start, end) for start, end in zip(bounds[:-1], bounds[1:])
+            if end > start]
+
+
+def _append_records(data, records, n, keys):
+    for key in keys:
+        if key not in data:  # Key not seen before, fill earlier values
+            data[key] = [None] * n
+        data[key].extend([record.get(key) for record in records])
+    n += len(records)
+    for values in data.values():  # Keys missing from these records
+        if len(values) < n:
+            values.extend([None] * (n - len(values)))
+    return n
+
+
+def _decode_byte_range(path, start, end, fields=None, columns=None,
+                       chunksize=10000, optional_fields=None):
+    # Decode lines that start within [start, end) into one list per column
+    data = {} if columns is None else {column: [] for column in columns}
+    optional_fields = optional_fields or []
+    field_set = set(fields or []) | set(optional_fields)
+    n = 0
+
+    def decode(lines):
+        records = json.loads(b'[' + b','.join(lines) + b']')
+        keys = columns
+        if keys is None:
+            if (fields is not None and
+                    all(record.keys() <= field_set for record in records)):
+                keys = fields + [field for field in optional_fields
+                                 if any(field in record
+                                        for record in records)]
+            else:
+                keys = dict.fromkeys(key for record in records
+                                     for key in record)
+        return _append_records(data, records, n, keys)
+
+    with open_jsonlines(path) as f:
+        if start > 0:  # Skip the line that started in the previous range
+            f.seek(start - 1)
+            f.readline()
+        pos = f.tell() if start > 0 else 0
+        lines = []
+        for line in f:
+            if end is not None and pos >= end:
+                break
+            pos += len(line)
+            if line.strip():
+                lines.append(line)
+            if len(lines) == chunksize:
+                n = decode(lines)
+                lines = []
+        if len(lines) > 0:
+            n = decode(lines)
+    return data, n
+
+
+def _first_keys(path):
+    with open_jsonlines(path) as f:
+        for line in f:
+            if line.strip():
+                return list(json.loads(line))
+    return []
+
+
+def _to_column(values, dtype=None):
+    # Values are checked, since NumPy would cast e.g. floats and strings
+    if dtype == 'int64' and all(type(value) is int for value in values):
+        return np.array(values, dtype=np.int64)
+    return values  # Type is inferred by pandas
+
+
+def read_jsonlines(path, fields=None, columns=None, n_jobs=1,
+                   chunksize=10000):
+    """Read JSON lines file into a DataFrame column by column.
+
+    Lines are decoded in bulk, ``chunksize`` lines per ``json.loads`` call,
+    directly into one list per column. The DataFrame is then built from the
+    columns instead of a list of dicts. Optionally, byte ranges of the file
+    are decoded in parallel processes.
+
+    Columns of fields that declare ``Field(dtype='int64')`` are created as
+    NumPy arrays of that type, when all of their values are integers. Types
+    of other columns, and of columns with missing or other values, are
+    inferred by pandas as with a list of dicts.
+
+    Args:
+        path (str or pathlib.Path): Path to the JSON lines file.
+        fields (list of str, dict or None, optional): Known fields of the
+            items, e.g. ``fields`` of the item class. Used for creating the
+            columns without collecting keys of every item. Fields declared
+            with ``Field(optional=True)`` are columns only when some item
+            has them. Defaults to None.
+        columns (list of str or None, optional): Columns to keep. Missing
+            columns are filled with None. Defaults to None, which keeps all
+            columns.
+        n_jobs (int, optional): Number of processes to decode the file
+            with. Defaults to 1.
+        chunksize (int, optional): Number of lines to decode at once.
+            Defaults to 10000.
+
+    Returns:
+        pandas.DataFrame: Items with the columns in the order of the first
+        item, similarly to creating the DataFrame from a list of dicts.
+    """
+    dtypes, optional_fields = {}, []
+    if isinstance(fields, dict):
+        dtypes = {name: field['dtype'] for name, field in fields.items()
+                  if field.get('dtype') is not None}
+        optional_fields = [name for name, field in fields.items()
+                           if field.get('optional')]
+    if fields is not None:
+        fields = [name for name in fields if name not in optional_fields]
+    if is_compressed(path):  # Cannot seek into the middle of the stream
+        ranges = [(0, None)]
+    else:
+        ranges = _get_byte_ranges(path, max(n_jobs, 1))
+    args = [(path, start, end, fields, columns, chunksize, optional_fields)
+            for start, end in ranges]
+    if len(args) > 1:
+        with ProcessPoolExecutor(len(args)) as executor:
+            results = list(executor.map(_decode_byte_range, *zip(*args)))
+    else:
+        results = [_decode_byte_range(*arg) for arg in args]
+
+    data = {} if columns is None else {column: [] for column in columns}
+    n = 0
+    for range_data, range_n in results:
+        for key, values in range_data.items():
+            if key not in data:
+                data[key] = [None] * n
+            data[key].extend(values)
+        n += range_n
+        for values in data.values():
+            if len(values) < n:
+                values.extend([None] * (n - len(values)))
+
+    if columns is None:
+        order = _first_keys(path)
+        columns = order + [key for key in data if key not in order]
+    data = {key: _to_column(values, dtypes.get(key))
+            for key, values in data.items()}
+    return pd.DataFrame(data, columns=columns)
+
+
+def iter_chunks(items, chunksize):
+    """Group items into lists of given size.
+
+    Args:
+        items (iterable): Items to group.
+        chunksize (int): Maximum number of items in one chunk.
+
+    Yields:
+        list: Chunk of items. The last chunk may be smaller than
+        ``chunksize``.
+    """
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == chunksize:
+            yield chunk
+            chunk = []
+    if len(chunk) > 0:
+        yield chunk
+
+
+def _iter_parquet_files(path):
+    for file_path in sorted(Path(path).glob('*.parquet')):
+        if file_path.stat().st_size > 0:  # Empty when nothing was scraped
+            yield file_path
+
+
+def _open_parquet(file_path, columns=None):
+    pa, pq = import_pyarrow()
+    parquet_file = pq.ParquetFile(file_path, memory_map=True)
+    schema = parquet_file.schema_arrow
+    json_columns = json.loads((schema.metadata or {}).get(
+        JSON_COLUMNS_KEY, b'[]'))
+    list_columns = [field.name for field in schema
+                    if pa.types.is_list(field.type)]
+    read_columns = columns
+    if columns is not None:  # Only columns that exist in this file
+        read_columns = [column for column in columns if column in schema.names]
+    return parquet_file, json_columns, list_columns, read_columns
+
+
+def _decode_df(df, json_columns, list_columns, columns=None):
+    for column in json_columns:
+        if column in df:
+            df[column] = df[column].map(
+                lambda value: None if value is None else json.loads(value))
+    for column in list_columns:  # Lists instead of arrays, as in JSON lines
+        if column in df:
+            df[column] = df[column].map(
+                lambda value: None if value is None else value.tolist())
+    if columns is not None:
+        for column in columns:
+            if column not in df:
+                df[column] = None
+        df = df[columns]
+    return df
+
+
+def iter_parquet(path, columns=None, chunksize=65536):
+    """Iterate items of Parquet files in a directory as DataFrames.
+
+    Files are memory-mapped, and only the requested columns are read.
+
+    Args:
+        path (str or pathlib.Path): Directory of the Parquet files.
+        columns (list of str or None, optional): Columns to read. Missing
+            columns are filled with None. Defaults to None, which reads all
+            columns.
+        chunksize (int, optional): Maximum number of items in one
+            DataFrame. Defaults to 65536.
+
+    Yields:
+        pandas.DataFrame: Chunk of items.
+    """
+    for file_path in _iter_parquet_files(path):
+        parquet_file, json_columns, list_columns, read_columns = \
+            _open_parquet(file_path, columns)
+        for batch in parquet_file.iter_batches(batch_size=chunksize,
+                                               columns=read_columns):
+            yield _decode_df(batch.to_pandas(), json_columns, list_columns,
+                             columns)
+
+
+def iter_parquet_items(path, columns=None):
+    """Iterate items of Parquet files in a directory one by one.
+
+    Args:
+        path (str or pathlib.Path): Directory of the Parquet files.
+        columns (list of str or None, optional): Columns to read. Missing
+            columns are set to None. Defaults to None, which reads all
+            columns.
+
+    Yields:
+        dict: Item.
+    """
+    for file_path in _iter_parquet_files(path):
+        parquet_file, json_columns, list_columns, read_columns = \
+            _open_parquet(file_path, columns)
+        for batch in parquet_file.iter_batches(columns=read_columns):
+            for item in batch.to_pylist():
+                for column in json_columns:
+                    if item.get(column) is not None:
+                        item[column] = json.loads(item[column])
+                if columns is not None:
+                    item = {column: item.get(column) for column in columns}
+                yield item
+
+
+def read_parquet(path, columns=None):
+    """Read items of Parquet files in a directory into a DataFrame.
+
+    Files are memory-mapped, and only the requested columns are read.
+
+    Args:
+        path (str or pathlib.Path): Directory of the Parquet files.
+        columns (list of str or None, optional): Columns to read. Missing
+            columns are filled with None. Defaults to None, which reads all
+            columns.
+
+    Returns:
+        pandas.DataFrame: Items.
+    """
+    dfs = []
+    for file_path in _iter_parquet_files(path):
+        parquet_file, json_columns, list_columns, read_columns = \
+            _open_parquet(file_path, columns)
+        df = parquet_file.read(columns=read_columns).to_pandas()
+        dfs.append(_decode_df(df, json_columns, list_columns, columns))
+    if len(dfs) == 0:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(dfs, ignore_index=True)
@@ -3,14 +3,15 @@
 
 import time
 
-from scrapy import Item, Field, Selector
+from scrapy import Item, Field
 from scrapy.crawler import Spider
 from scrapy.linkextractors import LinkExtractor
-from scrapy.loader import ItemLoader
-from itemloaders.processors import TakeFirst, Identity, MapCompose
+from itemloaders.processors import TakeFirst, Identity
 
 from finscraper.scrapy_spiders.mixins import FollowAndParseItemMixin
 from finscraper.text_utils import strip_join, paragraph_join
+from finscraper.xpaths import ItemLoader, compile_xpaths, \
+    extract_metadata, extract_texts
 
 
 class _ILArticleSpider(FollowAndParseItemMixin, Spider):
@@ -31,6 +32,19 @@ class _ILArticleSpider(FollowAndParseItemMixin, Spider):
         canonicalize=True
     )
     custom_settings = {}
+    xpaths = compile_xpaths(
+        title='//article//h1[contains(@class, "article-headline")]//text()',
+        ingress='//article//div[contains(@class, "article-description")]'
+                '//text()',
+        paragraphs='//article//div[contains(@class, "article-body")]//p',
+        published='//time//text()',
+        author='//article//div[contains(@class, "author-name")]//text()',
+        images='//article//div[contains(@class, "article-image")]',
+        image_src='.//img//@src',
+        image_alt='.//img//@alt',
+        image_caption='.//div[contains(@class, "media-caption")]'
+                      '//text()'
+    )
 
     def __init__(self, *args, **kwargs):
         """Fetch Iltalehti news articles.
@@ -39,39 +53,22 @@ class _ILArticleSpider(FollowAndParseItemMixin, Spider):
         """
         super(_ILArticleSpider, self).__init__(*args, **kwargs)
 
-    @staticmethod
-    def _get_image_metadata(text):
-        sel = Selector(text=text)
-        return {
-            'src': sel.xpath('//img//@src').get(),
-            'alt': sel.xpath('//img//@alt').get(),
-            'caption': sel.xpath(
-                '//div[contains(@class, "media-caption")]//text()').getall()
-        }
-
     def _parse_item(self, resp):
         il = ItemLoader(item=_ILArticleItem(), response=resp)
         il.add_value('url', resp.url)
         il.add_value('time', int(time.time()))
-        il.add_xpath(
-            'title',
-            '//article//h1[contains(@class, "article-headline")]//text()')
-        il.add_xpath(
-            'ingress',
-            '//article//div[contains(@class, "article-description")]//text()')
+        il.add_xpath('title', self.xpaths.title)
+        il.add_xpath('ingress', self.xpaths.ingress)
 
-        pgraphs_xpath = '//article//div[contains(@class, "article-body")]//p'
-        content = [''.join(Selector(text=pgraph).xpath('//text()').getall())
-                   for pgraph in resp.xpath(pgraphs_xpath).getall()]
-        il.add_value('content', content)
+        il.add_value('content', extract_texts(self.xpaths.paragraphs, resp))
 
-        il.add_xpath('published', '//time//text()')
-        il.add_xpath(
-            'author',
-            '//article//div[contains(@class, "author-name")]//text()')
-        il.add_xpath(
-            'images',
-            '//article//div[contains(@class, "article-image")]')
+        il.add_xpath('published', self.xpaths.published)
+        il.add_xpath('author', self.xpaths.author)
+        il.add_value('images', extract_metadata(
+            self.xpaths.images, resp,
+            src=self.xpaths.image_src.get,
+            alt=self.xpaths.image_alt.get,
+            caption=self.xpaths.image_caption.getall))
         return il.load_item()
 
 
@@ -86,36 +83,51 @@ class _ILArticleItem(Item):
         * published (str): Publish time of the article.
         * author (str): Author of the article.
         * images (list of dict): Images of the article.
+        * cluster_id (int): ID of the near-duplicate cluster of the article,
+            if ``NEAR_DUPLICATE_ENABLED``.
     """
     url = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     time = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='int64'
     )
     title = Field(
         input_processor=strip_join,
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     ingress = Field(
         input_processor=strip_join,
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     content = Field(
         input_processor=paragraph_join,
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     published = Field(
         input_processor=strip_join,
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     author = Field(
         input_processor=strip_join,
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     images = Field(
-        input_processor=MapCompose(_ILArticleSpider._get_image_metadata),
+        input_processor=Identity(),
         output_processor=Identity()
     )
+    cluster_id = Field(
+        input_processor=Identity(),
+        output_processor=TakeFirst(),
+        dtype='int64',
+        optional=True
+    )
@@ -3,14 +3,16 @@
 
 import time
 
-from scrapy import Item, Field, Selector
+from scrapy import Item, Field
 from scrapy.crawler import Spider
 from scrapy.linkextractors import LinkExtractor
-from scrapy.loader import ItemLoader
-from itemloaders.processors import TakeFirst, Identity, MapCompose
+from itemloaders.processors import TakeFirst, Identity
 
-from finscraper.scrapy_spiders.mixins import FollowAndParseItemMixin
+from finscraper.scrapy_spiders.mixins import FollowAndParseItemMixin, \
+    URLIDScorer
 from finscraper.text_utils import strip_join, paragraph_join
+from finscraper.xpaths import ItemLoader, compile_xpaths, \
+    extract_metadata, extract_texts
 
 
 class _ISArticleSpider(FollowAndParseItemMixin, Spider):
@@ -32,6 +34,20 @@ class _ISArticleSpider(FollowAndParseItemMixin, Spider):
         deny_domains=('ravit.is.fi'),
         canonicalize=True
     )
+    # Article IDs increase over time
+    url_scorer = URLIDScorer(r'/art-([0-9]+)\.html')
+    xpaths = compile_xpaths(
+        title='//article//h1//text()',
+        ingress='//section//article//p[contains(@class, "ingress")]//text()',
+        paragraphs='//article//p[contains(@class, "body")]',
+        published='//article//div[contains(@class, "timestamp")]//text()',
+        author='//article//div[contains(@itemprop, "author")]//text()',
+        images='//section//article'
+               '//div[contains(@class, "clearing-container")]',
+        image_src='.//img//@src',
+        image_alt='.//img//@alt',
+        image_caption='.//p//text()'
+    )
 
     def __init__(self, *args, **kwargs):
         """Fetch IltaSanomat news articles.
@@ -40,38 +56,23 @@ class _ISArticleSpider(FollowAndParseItemMixin, Spider):
         """
         super(_ISArticleSpider, self).__init__(*args, **kwargs)
 
-    @staticmethod
-    def _get_image_metadata(text):
-        sel = Selector(text=text)
-        return {
-            'src': sel.xpath('//img//@src').get(),
-            'alt': sel.xpath('//img//@alt').get(),
-            'caption': strip_join(sel.xpath('//p//text()').getall())
-        }
-
     def _parse_item(self, resp):
         il = ItemLoader(item=_ISArticleItem(), response=resp)
         il.add_value('url', resp.url)
         il.add_value('time', int(time.time()))
-        il.add_xpath('title', '//article//h1//text()')
-        il.add_xpath(
-            'ingress',
-            '//section//article//p[contains(@class, "ingress")]//text()')
+        il.add_xpath('title', self.xpaths.title)
+        il.add_xpath('ingress', self.xpaths.ingress)
 
-        pgraphs_xpath = '//article//p[contains(@class, "body")]'
-        content = [''.join(Selector(text=pgraph).xpath('//text()').getall())
-                   for pgraph in resp.xpath(pgraphs_xpath).getall()]
-        il.add_value('content', content)
+        il.add_value('content', extract_texts(self.xpaths.paragraphs, resp))
 
-        il.add_xpath(
-            'published',
-            '//article//div[contains(@class, "timestamp")]//text()')
-        il.add_xpath(
-            'author',
-            '//article//div[contains(@itemprop, "author")]//text()')
-        il.add_xpath(
-            'images',
-            '//section//article//div[contains(@class, "clearing-container")]')
+        il.add_xpath('published', self.xpaths.published)
+        il.add_xpath('author', self.xpaths.author)
+        il.add_value('images', extract_metadata(
+            self.xpaths.images, resp,
+            src=self.xpaths.image_src.get,
+            alt=self.xpaths.image_alt.get,
+            caption=lambda image: strip_join(
+                self.xpaths.image_caption.getall(image))))
         return il.load_item()
 
 
@@ -86,36 +87,51 @@ class _ISArticleItem(Item):
         * published (str): Publish time of the article.
         * author (str): Author of the article.
         * images (list of dict): Images of the article.
+        * cluster_id (int): ID of the near-duplicate cluster of the article,
+            if ``NEAR_DUPLICATE_ENABLED``.
     """
     url = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     time = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='int64'
     )
     title = Field(
         input_processor=strip_join,
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     ingress = Field(
         input_processor=strip_join,
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     content = Field(
         input_processor=paragraph_join,
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     published = Field(
         input_processor=strip_join,
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     author = Field(
         input_processor=strip_join,
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     images = Field(
-        input_processor=MapCompose(_ISArticleSpider._get_image_metadata),
+        input_processor=Identity(),
         output_processor=Identity()
     )
+    cluster_id = Field(
+        input_processor=Identity(),
+        output_processor=TakeFirst(),
+        dtype='int64',
+        optional=True
+    )
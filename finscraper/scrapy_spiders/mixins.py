@@ -1,13 +1,165 @@
 """Module for Scrapy spider mixins."""
 
 
-from scrapy import Request
-from scrapy.exceptions import CloseSpider
+import heapq
+import re
 
+from scrapy import Request, signals
+from scrapy.exceptions import CloseSpider, DontCloseSpider
+from scrapy.utils.misc import load_object
+
+from finscraper.dupefilters import URLHashSet
 from finscraper.request import SeleniumCallbackRequest
+from finscraper.seen import is_seen
+
+
+class URLIDScorer:
+    """Score URLs by a numeric ID in them.
+
+    Useful for sites with increasing article IDs, where newer items get
+    higher scores. Called with an URL, returns the ID as int, or None if the
+    URL has no ID.
+
+    Args:
+        pattern (str): Regular expression with a group that captures the ID,
+            e.g. ``r'/art-([0-9]+)'``.
+    """
+
+    def __init__(self, pattern):
+        self.pattern = re.compile(pattern)
+
+    def __call__(self, url):
+        match = self.pattern.search(url)
+        return None if match is None else int(match.group(1))
+
+
+class ItemBudgetMixin:
+    """Request only as many item pages as there are items left to scrape.
+
+    Item requests that have not been parsed yet are counted against the
+    remaining ``CLOSESPIDER_ITEMCOUNT``. Once enough of them are in
+    progress, further item and follow requests are deferred instead of
+    scheduled, so that small scrapes end after close to the given number of
+    item downloads. Deferred requests are scheduled when the spider would
+    otherwise finish before enough items have been scraped, e.g. because
+    some item pages failed, highest priority first. At most
+    ``deferred_factor`` times ``CLOSESPIDER_ITEMCOUNT`` item requests, and
+    as many follow requests, are kept deferred, and the ones with the
+    lowest priority are dropped beyond that. With ``JOBDIR``, URLs of
+    deferred requests are saved into the spider state and requested when
+    scraping continues. Nothing is deferred when the ``SCHEDULER`` shares
+    its queue with other processes, e.g. ``SQLiteScheduler``, so that they
+    can download the requests that this process does not need.
+
+    The following needs to be defined when inheriting:
+        1) ``_get_request`` -function: Creates a request for an item page \
+            (``to_parse=True``) or for a page to follow links from.
+    """
+    deferred_factor = 4
+    itemcount = 0
+    _pending_itemcount = 0
+    _deferred = None
+    _deferred_count = 0
+    _shared_scheduler = False
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super(ItemBudgetMixin, cls).from_crawler(
+            crawler, *args, **kwargs)
+        crawler.signals.connect(spider._release_deferred,
+                                signals.spider_idle)
+        scheduler_cls = load_object(crawler.settings['SCHEDULER'])
+        spider._shared_scheduler = getattr(scheduler_cls, 'shared', False)
+        return spider
+
+    def _get_request(self, url, to_parse=False):
+        raise NotImplementedError('Function `_get_request` not implemented!')
+
+    def _get_item_budget(self):
+        max_itemcount = self.settings.getint('CLOSESPIDER_ITEMCOUNT', 0)
+        if max_itemcount <= 0 or self._shared_scheduler:
+            return None
+        return max_itemcount - self.itemcount - self._pending_itemcount
 
+    def _schedule(self, request, persist=True):
+        """Yield request, or defer it if enough items are in progress."""
+        to_parse = request.cb_kwargs.get('to_parse', False)
+        budget = self._get_item_budget()
+        if budget is None or budget > 0:
+            if to_parse:
+                self._pending_itemcount += 1
+                if request.errback is None:
+                    request = request.replace(errback=self._item_failed)
+            yield request
+        else:
+            self._defer(request, persist=persist)
 
-class FollowAndParseItemMixin:
+    def _defer(self, request, persist=True):
+        """Schedule request only if more items are needed when idle."""
+        to_parse = request.cb_kwargs.get('to_parse', False)
+        if self._deferred is None:  # Item pages are released first
+            self._deferred = (({}, []), ({}, []))
+        requests, heap = self._deferred[0 if to_parse else 1]
+        if request.url in requests:
+            return
+        state = getattr(self, 'state', None)
+        if persist and state is not None:
+            state.setdefault('deferred_urls', {})[request.url] = to_parse
+
+        # Lowest priority is dropped first, and the newest of equal ones
+        self._deferred_count += 1
+        requests[request.url] = request
+        heapq.heappush(heap, (request.priority, -self._deferred_count,
+                              request.url))
+        max_size = self.deferred_factor * self.settings.getint(
+            'CLOSESPIDER_ITEMCOUNT', 0)
+        while len(heap) > max(max_size, 1):
+            _, _, url = heapq.heappop(heap)
+            del requests[url]
+            if state is not None:
+                state.get('deferred_urls', {}).pop(url, None)
+
+    def _restore_deferred(self):
+        """Yield requests that were deferred when scraping last time."""
+        state = getattr(self, 'state', None)
+        urls = state.pop('deferred_urls', {}) if state is not None else {}
+        for url, to_parse in urls.items():
+            yield from self._schedule(self._get_request(url, to_parse))
+
+    def _item_received(self):
+        self._pending_itemcount = max(self._pending_itemcount - 1, 0)
+
+    def _item_failed(self, failure):
+        self._item_received()
+        return failure  # Handled and logged as without an errback
+
+    def _release_deferred(self, spider):
+        self._pending_itemcount = 0  # Nothing is in progress when idle
+        budget = self._get_item_budget()
+        if self._deferred is None or budget is None or budget <= 0:
+            return
+        (items, item_heap), (follows, follow_heap) = self._deferred
+        if items:
+            deferred, heap, n = items, item_heap, budget
+        elif follows:  # Follow a few pages at a time to find more items
+            deferred, heap = follows, follow_heap
+            n = min(budget, self.settings.getint('CONCURRENT_REQUESTS', 16))
+        else:
+            return
+
+        state = getattr(self, 'state', None)
+        released = [url for _, _, url in heapq.nlargest(n, heap)]
+        heap[:] = [entry for entry in heap if entry[2] not in released]
+        heapq.heapify(heap)
+        for url in released:
+            if state is not None:
+                state.get('deferred_urls', {}).pop(url, None)
+            for request in self._schedule(deferred.pop(url)):
+                self.crawler.engine.crawl(request)
+        raise DontCloseSpider
+
+
+class FollowAndParseItemMixin(ItemBudgetMixin):
     """Parse items and follow links based on defined link extractors.
 
     The following needs to be defined when inheriting:
@@ -17,6 +169,13 @@ class FollowAndParseItemMixin:
             the links to follow and find item pages from.
         3) ``parse_item`` -function: Parses the item from response.
 
+    Optionally, ``url_scorer`` -attribute can be set to a callable that
+    scores item URLs by their freshness, such as ``URLIDScorer``. Items
+    whose scores are closest to the highest score seen so far get the
+    highest priority, and the items of a page are requested in the order of
+    their scores. Priority is raised by at most ``url_score_levels``, and
+    halving the difference to the highest score raises it by one.
+
     Args:
         follow_meta (dict or None, optional): Dictionary to pass within \
             link follow requests. Defaults to None.
@@ -36,7 +195,9 @@ class FollowAndParseItemMixin:
     Raises:
         AttributeError, if required attributes not defined when inheriting.
     """
-    itemcount = 0
+    url_scorer = None
+    url_score_levels = 16
+    _max_url_score = None
 
     def __init__(self, follow_meta=None, items_meta=None,
                  follow_selenium_callback=False,
@@ -53,12 +214,75 @@ class FollowAndParseItemMixin:
             if not hasattr(self, attr):
                 raise AttributeError(f'Attribute `{attr}` must be defined')
 
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super(FollowAndParseItemMixin, cls).from_crawler(
+            crawler, *args, **kwargs)
+        spider.url_hashes = URLHashSet(crawler.settings.getint(
+            'DUPEFILTER_URL_HASHES_MAX_SIZE', 1048576))
+        return spider
+
     def _parse_item(self, resp):
         raise NotImplementedError('Function `_parse_item` not implemented!')
 
+    def _is_requested(self, url):
+        """Whether a request has been scheduled for a link before.
+
+        Skips links before creating requests for them. Only a pre-check,
+        the duplicate filter of Scrapy still filters the requests.
+        """
+        url_hashes = getattr(self, 'url_hashes', None)
+        if url_hashes is None or url not in url_hashes:
+            return False
+        self.crawler.stats.inc_value('dupefilter/url_hashes_skipped')
+        return True
+
+    def _schedule(self, request, persist=True):
+        # Links are remembered only once requested, not when deferred
+        url_hashes = getattr(self, 'url_hashes', None)
+        for request in super(FollowAndParseItemMixin, self)._schedule(
+                request, persist=persist):
+            if url_hashes is not None:
+                url_hashes.add(request.url)
+            yield request
+
     def start_requests(self):
         for url in self.start_urls:
             yield Request(url, callback=self.parse, meta=self.follow_meta)
+        yield from self._restore_deferred()
+
+    def _score_url(self, url):
+        score = None if self.url_scorer is None else self.url_scorer(url)
+        if score is not None and (self._max_url_score is None or
+                                  score > self._max_url_score):
+            self._max_url_score = score
+        return score
+
+    def _get_item_priority(self, score):
+        if score is None:
+            return 20
+        # Few distinct priorities, since Scrapy keeps a queue for each
+        distance = int(self._max_url_score - score)
+        return 20 + max(self.url_score_levels - distance.bit_length(), 0)
+
+    def _get_request(self, url, to_parse=False, priority=None):
+        if to_parse:
+            meta = self.items_meta
+            if priority is None:
+                priority = self._get_item_priority(self._score_url(url))
+            selenium = self._items_selenium
+            selenium_callback = self.items_selenium_callback
+        else:
+            meta, priority = self.follow_meta, 10
+            selenium = self._follow_selenium
+            selenium_callback = self.follow_selenium_callback
+        if selenium:
+            return SeleniumCallbackRequest(
+                url, callback=self.parse, meta=meta,
+                selenium_callback=selenium_callback, priority=priority,
+                cb_kwargs={'to_parse': to_parse})
+        return Request(url, callback=self.parse, meta=meta, priority=priority,
+                       cb_kwargs={'to_parse': to_parse})
 
     def parse(self, resp, to_parse=False):
         """Parse items and follow links based on defined link extractors."""
@@ -67,31 +291,26 @@ class FollowAndParseItemMixin:
             raise CloseSpider('itemcount')
 
         if to_parse:
+            self._item_received()
             yield self._parse_item(resp)
             self.itemcount += 1
 
         # Parse items and further on extract links from those pages
         item_links = self.item_link_extractor.extract_links(resp)
-        for link in item_links:
-            if self._items_selenium:
-                yield SeleniumCallbackRequest(
-                    link.url, callback=self.parse, meta=self.items_meta,
-                    selenium_callback=self.items_selenium_callback,
-                    priority=20, cb_kwargs={'to_parse': True})
-            else:
-                yield Request(
-                    link.url, callback=self.parse, meta=self.items_meta,
-                    priority=20, cb_kwargs={'to_parse': True})
+        urls = [link.url for link in item_links
+                if not self._is_requested(link.url) and
+                not is_seen(self, link.url)]
+        # Priorities are relative to the freshest item
+        scores = [self._score_url(url) for url in urls]
+        requests = [
+            self._get_request(url, True, self._get_item_priority(score))
+            for url, score in zip(urls, scores)]
+        requests.sort(key=lambda request: request.priority, reverse=True)
+        for request in requests:
+            yield from self._schedule(request)
 
         # Extract all links from this page
         follow_links = self.follow_link_extractor.extract_links(resp)
         for link in follow_links:
-            if self._follow_selenium:
-                yield SeleniumCallbackRequest(
-                    link.url, callback=self.parse, meta=self.follow_meta,
-                    selenium_callback=self.follow_selenium_callback,
-                    priority=10, cb_kwargs={'to_parse': False})
-            else:
-                yield Request(
-                    link.url, callback=self.parse, meta=self.follow_meta,
-                    priority=10, cb_kwargs={'to_parse': False})
+            if not self._is_requested(link.url):
+                yield from self._schedule(self._get_request(link.url))
@@ -5,12 +5,12 @@ import time
 from scrapy import Item, Field, Selector
 from scrapy.crawler import Spider
 from scrapy.linkextractors import LinkExtractor
-from scrapy.loader import ItemLoader
 
 from finscraper.scrapy_spiders.mixins import FollowAndParseItemMixin
 from itemloaders.processors import TakeFirst, Identity, Compose
 from finscraper.text_utils import strip_join, strip_elements, \
     drop_empty_elements
+from finscraper.xpaths import ItemLoader, compile_xpaths
 
 
 class _MNetPageSpider(FollowAndParseItemMixin, Spider):
@@ -31,6 +31,16 @@ class _MNetPageSpider(FollowAndParseItemMixin, Spider):
         canonicalize=True
     )
     custom_settings = {}
+    xpaths = compile_xpaths(
+        title='//b[contains(@class, "linkcolor")]//text()',
+        page_number='(//b[@class="selected_page"])[1]//text()',
+        message_authors='//a[@class="keskustelu_nick"]//text()',
+        message_timestamps='//font[@class="light"]//text()',
+        messages='//font[@class="msg"]',
+        # Relative to a message
+        message_quotes='.//i[@class="quote"]//text()',
+        message_content='text()'
+    )
 
     def __init__(self, *args, **kwargs):
         """Fetch threads from muusikoiden.net discussions.
@@ -53,8 +63,8 @@ class _MNetPageSpider(FollowAndParseItemMixin, Spider):
         il = ItemLoader(item=_MNetMessageItem(), selector=message)
         il.add_value('author', author)
         il.add_value('time_posted', time_posted)
-        il.add_xpath('quotes', '//i[@class="quote"]//text()')
-        il.add_xpath('content', '//font[@class="msg"]/text()[not(self::i)]')
+        il.add_xpath('quotes', self.xpaths.message_quotes)
+        il.add_xpath('content', self.xpaths.message_content)
 
         return il.load_item()
 
@@ -70,20 +80,20 @@ class _MNetPageSpider(FollowAndParseItemMixin, Spider):
         il = ItemLoader(item=_MNetPageItem(), response=resp)
         il.add_value('url', resp.url)
         il.add_value('time', int(time.time()))
-        il.add_xpath('title', '//b[contains(@class, "linkcolor")]//text()')
-        il.add_xpath('page_number', '(//b[@class="selected_page"])[1]//text()')
+        il.add_xpath('title', self.xpaths.title)
+        il.add_xpath('page_number', self.xpaths.page_number)
 
         messages = []
-        message_authors = resp.xpath('//a[@class="keskustelu_nick"]//text()')
-        message_timestamps = resp.xpath('//font[@class="light"]//text()')
+        message_authors = self.xpaths.message_authors.getall(resp)
+        message_timestamps = self.xpaths.message_timestamps.getall(resp)
 
         # parse messages in thread
-        for i, message in enumerate(resp.xpath('//font[@class="msg"]')):
+        for i, message in enumerate(self.xpaths.messages.select(resp)):
             messages.append(
                 self._parse_message(
-                    message=Selector(text=message.get()),
-                    author=message_authors[i].get(),
-                    time_posted=message_timestamps[i].get(),
+                    message=message,
+                    author=message_authors[i],
+                    time_posted=message_timestamps[i],
                 )
             )
 
@@ -134,19 +144,23 @@ class _MNetPageItem(Item):
     """ + _MNetMessageItem.__doc__
     url = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     time = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='int64'
     )
     title = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     page_number = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='int64'
     )
     messages = Field(
         input_processor=Identity(),
@@ -1,15 +1,17 @@
 """Module for OikotieApartment spider."""
 
 
+import json
 import logging
 import time
 
+from urllib.parse import urlencode
+
 from scrapy import Item, Field, Request
 from scrapy.crawler import Spider
 from scrapy.exceptions import CloseSpider
 from scrapy.http import HtmlResponse
 from scrapy.linkextractors import LinkExtractor
-from scrapy.loader import ItemLoader
 from itemloaders.processors import TakeFirst, Identity, Compose
 
 from selenium.common.exceptions import TimeoutException
@@ -18,17 +20,23 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.wait import WebDriverWait
 
 from finscraper.request import SeleniumCallbackRequest
+from finscraper.scrapy_spiders.mixins import ItemBudgetMixin
+from finscraper.seen import is_seen
 from finscraper.text_utils import strip_join, drop_empty_elements, \
     paragraph_join
 from finscraper.utils import get_chromedriver
+from finscraper.xpaths import ItemLoader, compile_xpaths
 
 
 logger = logging.getLogger(__name__)
 
 
-class _OikotieApartmentSpider(Spider):
+class _OikotieApartmentSpider(ItemBudgetMixin, Spider):
     name = 'oikotieapartment'
     base_url = 'https://asunnot.oikotie.fi/myytavat-asunnot'
+    api_path = '/api/cards'
+    api_params = {'cardType': 100, 'sortBy': 'published_sort_desc'}
+    api_token_metas = ('api-token', 'loaded', 'cuid')
     item_link_extractor = LinkExtractor(
         allow_domains=('asunnot.oikotie.fi'),
         allow=(r'.*\/myytavat-asunnot\/.*\/[0-9]{3,}'),
@@ -40,6 +48,9 @@ class _OikotieApartmentSpider(Spider):
         # Custom
         'DISABLE_HEADLESS': True,
         'MINIMIZE_WINDOW': True,
+        'SELENIUM_POOL_SIZE': 4,
+        'SELENIUM_LEAN_RENDERING': True,
+        'SELENIUM_PAGE_LOAD_STRATEGY': 'eager',
         # Scrapy
         'AUTOTHROTTLE_ENABLED': True,
         'AUTOTHROTTLE_TARGET_CONCURRENCY': 0.9,
@@ -49,7 +60,24 @@ class _OikotieApartmentSpider(Spider):
             'finscraper.middlewares.SeleniumCallbackMiddleware': 800
         }
     }
-    itemcount = 0
+    xpaths = compile_xpaths(
+        title='//title//text()',
+        overview='//div[contains(@class, "listing-overview")]//text()',
+        table_titles='//dt',
+        table_title_text='text()',
+        table_values='following-sibling::dd[1]//text()',
+        contact_person_name='//div[contains(@class, '
+                            '"listing-person__details-item--big")]//text()',
+        contact_person_job_title='//div[contains(@class, '
+                                 '"listing-person__details-item--waisted")]'
+                                 '//text()',
+        contact_person_phone_number='(//div[contains(@class, '
+                                    '"listing-person__details-item'
+                                    '--sm-top-margin")]/span)[2]//text()',
+        contact_person_company='//div[@class="listing-company__name"]'
+                               '/a/span//text()',
+        contact_person_email='(//p)[1]//text()'
+    )
     listings_per_page = 24
     title2field = {
         # Perustiedot
@@ -132,6 +160,11 @@ class _OikotieApartmentSpider(Spider):
     def __init__(self, *args, area=None, **kwargs):
         """Fetch oikotie.fi apartments.
 
+        Listings are found through the same listing API that the search page
+        uses, without a browser. Selenium is used instead if the API is not
+        available, if ``area`` is given, or if ``OIKOTIE_API_ENABLED`` Scrapy
+        setting is False.
+
         Args:
             area (str, optional): Scrape listings based on area, e.g.
                 "helsinki" or "hausjärvi". The final URL will be formed as:
@@ -142,8 +175,96 @@ class _OikotieApartmentSpider(Spider):
         self.area = area
 
         self._last_page = None
+        self._unknown_titles = set()
 
     def start_requests(self):
+        # Find listings from the data the front end loads, if possible
+        base_url = self.settings.get('OIKOTIE_BASE_URL')
+        if base_url:
+            self.base_url = f'{base_url.rstrip("/")}/myytavat-asunnot'
+        if (self.area is None and
+                self.settings.getbool('OIKOTIE_API_ENABLED', True)):
+            yield Request(self.base_url, callback=self._parse_api_tokens,
+                          errback=self._fallback_to_selenium,
+                          dont_filter=True)
+        else:
+            yield from self._selenium_start_requests()
+        yield from self._restore_deferred()
+
+    def _get_request(self, url, to_parse=False):
+        priority = 20 if to_parse else 10
+        return Request(url, callback=self.parse, priority=priority,
+                       cb_kwargs={'to_parse': to_parse})
+
+    def _fallback_to_selenium(self, failure_or_response=None):
+        logger.warning(f'Listing API not available ({failure_or_response}), '
+                       'using Selenium instead')
+        self.crawler.stats.inc_value('oikotie/api_fallback')
+        yield from self._selenium_start_requests()
+
+    def _get_api_request(self, tokens, offset):
+        api_base_url = self.base_url.rsplit('/', 1)[0] + self.api_path
+        params = dict(self.api_params, limit=self.listings_per_page,
+                      offset=offset)
+        return Request(
+            f'{api_base_url}?{urlencode(params)}',
+            headers={
+                'Accept': 'application/json',
+                'OTA-token': tokens['api-token'],
+                'OTA-loaded': tokens['loaded'],
+                'OTA-cuid': tokens['cuid']
+            },
+            callback=self._parse_api_cards,
+            errback=self._fallback_to_selenium if offset == 0 else None,
+            priority=10,
+            meta={'tokens': tokens, 'offset': offset},
+            dont_filter=True
+        )
+
+    def _parse_api_tokens(self, resp):
+        tokens = {
+            name: resp.xpath(f'//meta[@name="{name}"]/@content').get()
+            for name in self.api_token_metas
+        }
+        if not all(tokens.values()):
+            yield from self._fallback_to_selenium(resp)
+            return
+        yield self._get_api_request(tokens, offset=0)
+
+    def _parse_api_cards(self, resp):
+        offset = resp.meta['offset']
+        try:
+            data = json.loads(resp.text)
+            cards = data['cards']
+            found = int(data['found'])
+        except (ValueError, KeyError, TypeError):
+            if offset == 0:
+                yield from self._fallback_to_selenium(resp)
+            else:
+                logger.warning(f'Could not parse listings from {resp.url}')
+            return
+
+        for card in cards:
+            url = card.get('url') if isinstance(card, dict) else None
+            if url and not is_seen(self, resp.urljoin(url)):
+                yield from self._schedule(
+                    self._get_request(resp.urljoin(url), to_parse=True))
+
+        # Other pages are requested after the first one, as many as needed
+        # for the remaining items. Tokens expire, so they are not saved.
+        if offset == 0:
+            budget = self._get_item_budget()
+            for next_offset in range(self.listings_per_page, found,
+                                     self.listings_per_page):
+                request = self._get_api_request(resp.meta['tokens'],
+                                                next_offset)
+                if (budget is None or
+                        next_offset - self.listings_per_page < budget):
+                    yield request
+                else:
+                    self._defer(request, persist=False)
+
+    def _selenium_start_requests(self):
         # Render start page with headed Chrome
         driver = get_chromedriver(settings=self.settings)
 
@@ -164,11 +285,11 @@ class _OikotieApartmentSpider(Spider):
         # Iterate pagination pages one-by-one and extract links + items
         for page in range(1, self._last_page + 1):
             url = f'{base_url_with_area}?pagination={page}'
-            yield SeleniumCallbackRequest(
+            yield from self._schedule(SeleniumCallbackRequest(
                 url,
                 priority=10,
                 meta={'page': page},
-                selenium_callback=self._handle_pagination_page)
+                selenium_callback=self._handle_pagination_page), persist=False)
 
     def _get_last_page(self, driver):
         logger.debug('Getting last page...')
@@ -239,14 +360,38 @@ class _OikotieApartmentSpider(Spider):
             raise CloseSpider
 
         if to_parse:  # Parse listing item
+            self._item_received()
             yield self._parse_item(resp)
             self.itemcount += 1
 
         # Extract listing links and parse them
         item_links = self.item_link_extractor.extract_links(resp)
         for link in item_links:
-            yield Request(link.url, callback=self.parse, priority=20,
-                          cb_kwargs={'to_parse': True})
+            if is_seen(self, link.url):
+                continue
+            yield from self._schedule(
+                self._get_request(link.url, to_parse=True))
+
+    def _parse_tables(self, resp):
+        # Walk all title-value pairs once, instead of a query per field
+        for dt in self.xpaths.table_titles.select(resp):
+            titles = self.xpaths.table_title_text.getall(dt)
+            fields = [self.title2field[title] for title in titles
+                      if title in self.title2field]
+            if not fields:
+                self._report_unknown_title(' '.join(titles).strip())
+                continue
+            values = self.xpaths.table_values.getall(dt)
+            for field in fields:
+                yield field, values
+
+    def _report_unknown_title(self, title):
+        if not title:
+            return
+        self.crawler.stats.inc_value('oikotie/unknown_title_count')
+        if title not in self._unknown_titles:
+            self._unknown_titles.add(title)
+            logger.info(f'Unknown title "{title}" in listing tables')
 
     def _parse_item(self, resp):
         il = ItemLoader(item=_OikotieApartmentItem(), response=resp)
@@ -254,37 +399,18 @@ class _OikotieApartmentSpider(Spider):
         il.add_value('time', int(time.time()))
 
         # Apartment info
-        il.add_xpath('title', '//title//text()')
-        il.add_xpath(
-            'overview',
-            '//div[contains(@class, "listing-overview")]//text()')
+        il.add_xpath('title', self.xpaths.title)
+        il.add_xpath('overview', self.xpaths.overview)
 
         # From tables
-        table_xpath = '//dt[text()="{title}"]/following-sibling::dd[1]//text()'
-        for title, field in self.title2field.items():
-            il.add_xpath(field, table_xpath.format(title=title))
+        for field, values in self._parse_tables(resp):
+            il.add_value(field, values)
 
         # Contact information
-        il.add_xpath(
-            'contact_person_name',
-            '//div[contains(@class, "listing-person__details-item--big")]'
-            '//text()'
-        )
-        il.add_xpath(
-            'contact_person_job_title',
-            '//div[contains(@class, "listing-person__details-item--waisted")]'
-            '//text()'
-        )
-        il.add_xpath(
-            'contact_person_phone_number',
-            '(//div[contains(@class, "listing-person__details-item'
-            '--sm-top-margin")]/span)[2]//text()'
-        )
-        il.add_xpath(
-            'contact_person_company',
-            '//div[@class="listing-company__name"]/a/span//text()'
-        )
-        il.add_xpath('contact_person_email', '(//p)[1]//text()')
+        for field in ('contact_person_name', 'contact_person_job_title',
+                      'contact_person_phone_number', 'contact_person_company',
+                      'contact_person_email'):
+            il.add_xpath(field, getattr(self.xpaths, field))
         return il.load_item()
 
 
@@ -308,327 +434,407 @@ class _OikotieApartmentItem(Item):
     )
     url = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     time = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='int64'
     )
     # Apartment info
     title = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     overview = Field(
         input_processor=Compose(drop_empty_elements, paragraph_join),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     # Basic information
     location = Field(
         input_processor=strip_join,
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     city = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     house_number = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     district = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     oikotie_id = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     floor = Field(
         input_processor=lambda x: x[-1:],
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     total_floors = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     life_sq = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     property_sq = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     total_sq = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     room_info = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     number_of_rooms = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     condition = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     condition_details = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     availability = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     kitchen_appliances = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     bathroom_appliances = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     window_direction = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     has_balcony = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     balcony_details = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     storage_space = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     view = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     future_renovations = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     completed_renovations = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     has_sauna = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     sauna_details = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     housing_type = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     services = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     additional_info = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     property_id = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     apartment_is = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     telecommunication_services = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     # Price and cost information
     price_no_tax = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     sales_price = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     shared_loan_payment = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     price_per_sq = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     share_of_liabilities = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     mortgages = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     financial_charge = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     condominium_payment = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     maintenance_charge = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     water_charge = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     water_charge_details = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     heating_charge = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     heating_charge_details = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     other_costs = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     # House and property
     is_brand_new = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     housing_company_name = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     building_type = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     build_year = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     build_year_details = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     number_of_apartments = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     building_has_elevator = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     building_has_sauna = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     building_material = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     roof_type = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     energy_class = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     has_energy_certificate = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     antenna_system = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     property_size = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     property_size_unit = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     property_owner = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     maintenance = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     real_estate_management = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     plan_info = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     plan = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     traffic_communication = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     heating = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     # Spaces and material
     parking_space_description = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     common_spaces = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     wallcovering = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     # Contacts
     contact_person_name = Field(
         input_processor=strip_join,
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     contact_person_company = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     contact_person_job_title = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     contact_person_email = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     contact_person_phone_number = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
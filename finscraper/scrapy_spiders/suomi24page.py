@@ -4,15 +4,15 @@
 import time
 
 
-from scrapy import Item, Field, Selector
+from scrapy import Item, Field
 from scrapy.crawler import Spider
 from scrapy.linkextractors import LinkExtractor
-from scrapy.loader import ItemLoader
 from itemloaders.processors import TakeFirst, Identity, MapCompose, Compose
 
 from finscraper.scrapy_spiders.mixins import FollowAndParseItemMixin
 from finscraper.text_utils import strip_join, safe_cast_int, strip_elements, \
     drop_empty_elements, paragraph_join
+from finscraper.xpaths import ItemLoader, compile_xpaths
 
 
 class _Suomi24PageSpider(FollowAndParseItemMixin, Spider):
@@ -33,6 +33,27 @@ class _Suomi24PageSpider(FollowAndParseItemMixin, Spider):
         canonicalize=True
     )
     custom_settings = {}
+    xpaths = compile_xpaths(
+        title='//*[contains(@*, "thread-title")]//text()',
+        published='(//*[contains(@class, "Timestamp")])[1]//text()',
+        author='(//*[contains(@class, "Username")])[1]//text()',
+        content='(//*[contains(@*, "thread-body-text")])[1]//text()',
+        n_comments='(//*[contains(@*, "stats-comments")])[1]//text()',
+        views='(//*[contains(@*, "stats-views")])[1]//text()',
+        comments='//li[contains(@class, "CommentItem")]',
+        # Relative to a comment
+        comment_author='(.//*[contains(@class, "Username")])[1]//text()',
+        comment_date='(.//*[contains(@class, "Timestamp")])[1]//text()',
+        comment_quotes='(.//article)[1]//blockquote//text()',
+        comment_content='(.//article)[1]'
+                        '//p[contains(@class, "ListItem__Text")]//text()',
+        responses='.//li[contains(@class, "CommentResponsesItem")]',
+        # Relative to a comment response
+        response_author='.//*[contains(@class, "Username")]//text()',
+        response_date='.//*[contains(@class, "Timestamp")]//text()',
+        response_quotes='.//blockquote//text()',
+        response_content='.//p[contains(@class, "ListItem__Text")]//text()'
+    )
 
     def __init__(self, *args, **kwargs):
         """Fetch comments from suomi24.fi.
@@ -43,38 +64,22 @@ class _Suomi24PageSpider(FollowAndParseItemMixin, Spider):
 
     def _parse_comment_response(self, response):
         il = ItemLoader(item=_Suomi24CommentResponseItem(), selector=response)
-        il.add_xpath(
-            'author',
-            '//*[contains(@class, "Username")]//text()')
-        il.add_xpath(
-            'date',
-            '//*[contains(@class, "Timestamp")]//text()')
-        il.add_xpath('quotes', '//blockquote//text()', strip_join)
-        il.add_xpath(
-            'content',
-            '//p[contains(@class, "ListItem__Text")]//text()')
+        il.add_xpath('author', self.xpaths.response_author)
+        il.add_xpath('date', self.xpaths.response_date)
+        il.add_xpath('quotes', self.xpaths.response_quotes, strip_join)
+        il.add_xpath('content', self.xpaths.response_content)
         return il.load_item()
 
     def _parse_comment(self, comment):
         il = ItemLoader(item=_Suomi24CommentItem(), selector=comment)
-        il.add_xpath(
-            'author',
-            '(//*[contains(@class, "Username")])[1]//text()')
-        il.add_xpath(
-            'date',
-            '(//*[contains(@class, "Timestamp")])[1]//text()')
-        il.add_xpath(
-            'quotes',
-            '(//article)[1]//blockquote//text()')
-        il.add_xpath(
-            'content',
-            '(//article)[1]//p[contains(@class, "ListItem__Text")]//text()')
+        il.add_xpath('author', self.xpaths.comment_author)
+        il.add_xpath('date', self.xpaths.comment_date)
+        il.add_xpath('quotes', self.xpaths.comment_quotes)
+        il.add_xpath('content', self.xpaths.comment_content)
 
         responses = []
-        responses_xpath = '//li[contains(@class, "CommentResponsesItem")]'
-        for response in comment.xpath(responses_xpath):
-            responses.append(
-                self._parse_comment_response(Selector(text=response.get())))
+        for response in self.xpaths.responses.select(comment):
+            responses.append(self._parse_comment_response(response))
         il.add_value('responses', responses)
         return il.load_item()
 
@@ -82,27 +87,16 @@ class _Suomi24PageSpider(FollowAndParseItemMixin, Spider):
         il = ItemLoader(item=_Suomi24PageItem(), response=resp)
         il.add_value('url', resp.url)
         il.add_value('time', int(time.time()))
-        il.add_xpath('title', '//*[contains(@*, "thread-title")]//text()')
-        il.add_xpath(
-            'published',
-            '(//*[contains(@class, "Timestamp")])[1]//text()')
-        il.add_xpath(
-            'author',
-            '(//*[contains(@class, "Username")])[1]//text()')
-        il.add_xpath(
-            'content',
-            '(//*[contains(@*, "thread-body-text")])[1]//text()')
-        il.add_xpath(
-            'n_comments',
-            '(//*[contains(@*, "stats-comments")])[1]//text()')
-        il.add_xpath(
-            'views',
-            '(//*[contains(@*, "stats-views")])[1]//text()')
+        il.add_xpath('title', self.xpaths.title)
+        il.add_xpath('published', self.xpaths.published)
+        il.add_xpath('author', self.xpaths.author)
+        il.add_xpath('content', self.xpaths.content)
+        il.add_xpath('n_comments', self.xpaths.n_comments)
+        il.add_xpath('views', self.xpaths.views)
 
         comments = []
-        comment_xpath = '//li[contains(@class, "CommentItem")]'
-        for comment in resp.xpath(comment_xpath):
-            comments.append(self._parse_comment(Selector(text=comment.get())))
+        for comment in self.xpaths.comments.select(resp):
+            comments.append(self._parse_comment(comment))
         il.add_value('comments', comments)
         return il.load_item()
 
@@ -179,19 +173,23 @@ class _Suomi24PageItem(Item):
     """ + _Suomi24CommentItem.__doc__ + _Suomi24CommentResponseItem.__doc__
     url = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     time = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='int64'
     )
     title = Field(
         input_processor=strip_join,
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     content = Field(
         input_processor=paragraph_join,
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     comments = Field(
         input_processor=Identity(),
@@ -199,17 +197,21 @@ class _Suomi24PageItem(Item):
     )
     published = Field(
         input_processor=strip_join,
-        output_processor=Compose(strip_elements, TakeFirst())
+        output_processor=Compose(strip_elements, TakeFirst()),
+        dtype='string'
     )
     author = Field(
         input_processor=strip_join,
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     n_comments = Field(
         input_processor=MapCompose(safe_cast_int),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='int64'
     )
     views = Field(
         input_processor=strip_join,
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
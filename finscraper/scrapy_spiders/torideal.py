@@ -3,15 +3,16 @@
 
 import time
 
-from scrapy import Item, Field, Selector
+from scrapy import Item, Field
 from scrapy.crawler import Spider
 from scrapy.linkextractors import LinkExtractor
-from scrapy.loader import ItemLoader
-from itemloaders.processors import TakeFirst, Identity, MapCompose, Compose
+from itemloaders.processors import TakeFirst, Identity, Compose
 
 from finscraper.scrapy_spiders.mixins import FollowAndParseItemMixin
 from finscraper.text_utils import strip_join, drop_empty_elements, \
     paragraph_join
+from finscraper.xpaths import ItemLoader, compile_xpaths, \
+    extract_metadata
 
 
 class _ToriDealSpider(FollowAndParseItemMixin, Spider):
@@ -36,6 +37,20 @@ class _ToriDealSpider(FollowAndParseItemMixin, Spider):
     custom_settings = {
         'ROBOTSTXT_OBEY': False
     }
+    xpaths = compile_xpaths(
+        seller='//div[contains(@id, "seller_info")]//text()',
+        name='//div[@class="topic"]//*[contains(@itemprop, "name")]//text()',
+        description='//*[contains(@itemprop, "description")]//text()',
+        price='//*[contains(@itemprop, "price")]//text()',
+        type='//td[contains(text(), "Ilmoitustyyppi")]'
+             '/following-sibling::td[1]//text()',
+        published='//td[contains(text(), "Ilmoitus jätetty")]'
+                  '/following-sibling::td[1]//text()',
+        images='//div[@class="media_container"]//img',
+        image_src='.//@src',
+        image_alt='.//@alt',
+        image_title='.//@title'
+    )
 
     def __init__(self, *args, **kwargs):
         """Fetch deals from tori.fi.
@@ -44,40 +59,21 @@ class _ToriDealSpider(FollowAndParseItemMixin, Spider):
         """
         super(_ToriDealSpider, self).__init__(*args, **kwargs)
 
-    @staticmethod
-    def _get_image_metadata(text):
-        sel = Selector(text=text)
-        return {
-            'src': sel.xpath('//@src').get(),
-            'alt': sel.xpath('//@alt').get(),
-            'title': sel.xpath('//@title').get()
-        }
-
     def _parse_item(self, resp):
         il = ItemLoader(item=_ToriDealItem(), response=resp)
         il.add_value('url', resp.url)
         il.add_value('time', int(time.time()))
-        il.add_xpath(
-            'seller',
-            '//div[contains(@id, "seller_info")]//text()')
-        il.add_xpath(
-            'name',
-            '//div[@class="topic"]//*[contains(@itemprop, "name")]//text()')
-        il.add_xpath(
-            'description',
-            '//*[contains(@itemprop, "description")]//text()')
-        il.add_xpath(
-            'price',
-            '//*[contains(@itemprop, "price")]//text()')
-        il.add_xpath(
-            'type',
-            '//td[contains(text(), "Ilmoitustyyppi")]'
-            '/following-sibling::td[1]//text()')
-        il.add_xpath(
-            'published',
-            '//td[contains(text(), "Ilmoitus jätetty")]'
-            '/following-sibling::td[1]//text()')
-        il.add_xpath('images', '//div[@class="media_container"]//img')
+        il.add_xpath('seller', self.xpaths.seller)
+        il.add_xpath('name', self.xpaths.name)
+        il.add_xpath('description', self.xpaths.description)
+        il.add_xpath('price', self.xpaths.price)
+        il.add_xpath('type', self.xpaths.type)
+        il.add_xpath('published', self.xpaths.published)
+        il.add_value('images', extract_metadata(
+            self.xpaths.images, resp,
+            src=self.xpaths.image_src.get,
+            alt=self.xpaths.image_alt.get,
+            title=self.xpaths.image_title.get))
         return il.load_item()
 
 
@@ -96,37 +92,45 @@ class _ToriDealItem(Item):
     """
     url = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     time = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='int64'
     )
     seller = Field(
         input_processor=Compose(drop_empty_elements, paragraph_join),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     name = Field(
         input_processor=strip_join,
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     description = Field(
         input_processor=Compose(drop_empty_elements, paragraph_join),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     price = Field(
         input_processor=strip_join,
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     type = Field(
         input_processor=strip_join,
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     published = Field(
         input_processor=strip_join,
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     images = Field(
-        input_processor=MapCompose(_ToriDealSpider._get_image_metadata),
+        input_processor=Identity(),
         output_processor=Identity()
     )
@@ -4,15 +4,15 @@
 import time
 
 
-from scrapy import Item, Field, Selector
+from scrapy import Item, Field
 from scrapy.crawler import Spider
 from scrapy.linkextractors import LinkExtractor
-from scrapy.loader import ItemLoader
 from itemloaders.processors import TakeFirst, Identity, MapCompose, Compose
 
 from finscraper.scrapy_spiders.mixins import FollowAndParseItemMixin
 from finscraper.text_utils import strip_join, safe_cast_int, strip_elements, \
     drop_empty_elements
+from finscraper.xpaths import ItemLoader, compile_xpaths
 
 
 class _VauvaPageSpider(FollowAndParseItemMixin, Spider):
@@ -33,6 +33,23 @@ class _VauvaPageSpider(FollowAndParseItemMixin, Spider):
         canonicalize=True
     )
     custom_settings = {}
+    xpaths = compile_xpaths(
+        title='//article//div[contains(@property, "title")]//text()',
+        page='//article//li[contains(@class, "pager-current")]//text()',
+        pages='//article//li[contains(@class, "pager-last")]//text()',
+        published='(//article//div[contains(@class, "post-date")])[1]'
+                  '//text()',
+        author='(//article//*[contains(@property, "name")])[1]//text()',
+        comments='//article//article[contains(@class, "comment")]',
+        # Relative to a comment
+        comment_author='.//*[contains(@property, "name")]//text()',
+        comment_date='.//div[contains(@class, "post-date")]//text()',
+        comment_quotes='.//blockquote//text()',
+        comment_content='.//p//text()',
+        comment_votes='.//span[contains(@class, "voting-count")]',
+        comment_upvotes='.//li[@class="first"]//text()',
+        comment_downvotes='.//li[@class="last"]//text()'
+    )
 
     def __init__(self, *args, **kwargs):
         """Fetch comments from vauva.fi.
@@ -43,44 +60,31 @@ class _VauvaPageSpider(FollowAndParseItemMixin, Spider):
 
     def _parse_comment(self, comment):
         il = ItemLoader(item=_VauvaCommentItem(), selector=comment)
-        il.add_xpath('author', '//*[contains(@property, "name")]//text()')
-        il.add_xpath('date', '//div[contains(@class, "post-date")]//text()')
-        il.add_xpath('quotes', '//blockquote//text()')
-        il.add_xpath('content', '//p//text()')
-        votes = il.nested_xpath('//span[contains(@class, "voting-count")]')
-        votes.add_xpath('upvotes', '//li[@class="first"]//text()')
-        votes.add_xpath('downvotes', '//li[@class="last"]//text()')
+        il.add_xpath('author', self.xpaths.comment_author)
+        il.add_xpath('date', self.xpaths.comment_date)
+        il.add_xpath('quotes', self.xpaths.comment_quotes)
+        il.add_xpath('content', self.xpaths.comment_content)
+        votes = il.nested_xpath(self.xpaths.comment_votes)
+        votes.add_xpath('upvotes', self.xpaths.comment_upvotes)
+        votes.add_xpath('downvotes', self.xpaths.comment_downvotes)
         return il.load_item()
 
     def _parse_item(self, resp):
         il = ItemLoader(item=_VauvaPageItem(), response=resp)
         il.add_value('url', resp.url)
         il.add_value('time', int(time.time()))
-        il.add_xpath(
-            'title',
-            '//article//div[contains(@property, "title")]//text()')
-        il.add_xpath(
-            'page',
-            '//article//li[contains(@class, "pager-current")]//text()')
+        il.add_xpath('title', self.xpaths.title)
+        il.add_xpath('page', self.xpaths.page)
         il.add_value('page', ['1'])
-        il.add_xpath(
-            'pages',
-            '//article//li[contains(@class, "pager-last")]//text()')
-        il.add_xpath(
-            'pages',
-            '//article//li[contains(@class, "pager-current")]//text()')
+        il.add_xpath('pages', self.xpaths.pages)
+        il.add_xpath('pages', self.xpaths.page)
         il.add_value('pages', ['1'])
-        il.add_xpath(
-            'published',
-            '(//article//div[contains(@class, "post-date")])[1]//text()')
-        il.add_xpath(
-            'author',
-            '(//article//*[contains(@property, "name")])[1]//text()')
+        il.add_xpath('published', self.xpaths.published)
+        il.add_xpath('author', self.xpaths.author)
 
         comments = []
-        comment_xpath = '//article//article[contains(@class, "comment")]'
-        for comment in resp.xpath(comment_xpath):
-            comments.append(self._parse_comment(Selector(text=comment.get())))
+        for comment in self.xpaths.comments.select(resp):
+            comments.append(self._parse_comment(comment))
         il.add_value('comments', comments)
         return il.load_item()
 
@@ -135,23 +139,28 @@ class _VauvaPageItem(Item):
     """ + _VauvaCommentItem.__doc__
     url = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     time = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='int64'
     )
     title = Field(
         input_processor=strip_join,
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     page = Field(
         input_processor=MapCompose(safe_cast_int),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='int64'
     )
     pages = Field(
         input_processor=MapCompose(safe_cast_int),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='int64'
     )
     comments = Field(
         input_processor=Identity(),
@@ -159,9 +168,11 @@ class _VauvaPageItem(Item):
     )
     published = Field(
         input_processor=strip_join,
-        output_processor=Compose(strip_elements, TakeFirst())
+        output_processor=Compose(strip_elements, TakeFirst()),
+        dtype='string'
     )
     author = Field(
         input_processor=strip_join,
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
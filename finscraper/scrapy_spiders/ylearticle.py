@@ -5,14 +5,16 @@ import time
 
 from functools import partial
 
-from scrapy import Item, Field, Selector
+from scrapy import Item, Field
 from scrapy.crawler import Spider
 from scrapy.linkextractors import LinkExtractor
-from scrapy.loader import ItemLoader
-from itemloaders.processors import TakeFirst, Identity, MapCompose
+from itemloaders.processors import TakeFirst, Identity
 
-from finscraper.scrapy_spiders.mixins import FollowAndParseItemMixin
+from finscraper.scrapy_spiders.mixins import FollowAndParseItemMixin, \
+    URLIDScorer
 from finscraper.text_utils import strip_join, paragraph_join
+from finscraper.xpaths import ItemLoader, compile_xpaths, \
+    extract_metadata, extract_texts
 
 
 class _YLEArticleSpider(FollowAndParseItemMixin, Spider):
@@ -32,7 +34,40 @@ class _YLEArticleSpider(FollowAndParseItemMixin, Spider):
         deny_domains=(),
         canonicalize=True
     )
+    # Article IDs increase over time
+    url_scorer = URLIDScorer(r'/(?:uutiset|urheilu|a)/[0-9]+-([0-9]+)')
     custom_settings = {}
+    xpaths = compile_xpaths(
+        # Tradition style
+        title='//article'
+              '//header[contains(@class, "article__header")]'
+              '//h1[contains(@class, "article__heading")]//text()',
+        ingress='//article'
+                '//header[contains(@class, "article__header")]'
+                '//p[contains(@class, "article__paragraph")]//text()',
+        paragraphs='//article//section[contains(@class, "article__content")]'
+                   '//p[contains(@class, "article__paragraph")]',
+        # Header div based on position: 1=domain, 2=author, 3=published
+        published='//article'
+                  '//header[contains(@class, "article__header")]'
+                  '//div[contains(@class, "article__date")]//text()',
+        author='//article'
+               '//header[contains(@class, "article__header")]'
+               '//div[contains(@class, "aw-")][2]'
+               '//span[contains(@class, "aw-")]'
+               '//text()',
+        images='//article//figure[contains(@class, "article__figure")]',
+        image_src='.//img//@src',
+        image_alt='.//img//@alt',
+        image_caption='.//figcaption//text()',
+        # "Modern" style news
+        feature_title='//article'
+                      '//h1[contains(@class, "article__feature__heading")]'
+                      '//text()',
+        feature_content='//article'
+                        '//p[contains(@class, "article__feature__paragraph")]'
+                        '//text()'
+    )
 
     def __init__(self, *args, **kwargs):
         """Fetch YLE news articles.
@@ -41,67 +76,28 @@ class _YLEArticleSpider(FollowAndParseItemMixin, Spider):
         """
         super(_YLEArticleSpider, self).__init__(*args, **kwargs)
 
-    @staticmethod
-    def _get_image_metadata(text):
-        sel = Selector(text=text)
-        return {
-            'src': sel.xpath('//img//@src').get(),
-            'alt': sel.xpath('//img//@alt').get(),
-            'caption': sel.xpath(
-                '//figcaption//text()').getall()
-        }
-
     def _parse_item(self, resp):
         il = ItemLoader(item=_YLEArticleItem(), response=resp)
         il.add_value('url', resp.url)
         il.add_value('time', int(time.time()))
 
         # Tradition style
-        il.add_xpath(
-            'title',
-            '//article'
-            '//header[contains(@class, "article__header")]'
-            '//h1[contains(@class, "article__heading")]//text()')
-        il.add_xpath(
-            'ingress',
-            '//article'
-            '//header[contains(@class, "article__header")]'
-            '//p[contains(@class, "article__paragraph")]//text()')
-
-        pgraphs_xpath = (
-            '//article//section[contains(@class, "article__content")]'
-            '//p[contains(@class, "article__paragraph")]'
-        )
-        content = [''.join(Selector(text=pgraph).xpath('//text()').getall())
-                   for pgraph in resp.xpath(pgraphs_xpath).getall()]
-        il.add_value('content', content)
+        il.add_xpath('title', self.xpaths.title)
+        il.add_xpath('ingress', self.xpaths.ingress)
 
-        # Header div based on position: 1=domain, 2=author, 3=published
-        il.add_xpath(
-            'published',
-            '//article'
-            '//header[contains(@class, "article__header")]'
-            '//div[contains(@class, "article__date")]//text()')
-        il.add_xpath(
-            'author',
-            '//article'
-            '//header[contains(@class, "article__header")]'
-            '//div[contains(@class, "aw-")][2]'
-            '//span[contains(@class, "aw-")]'
-            '//text()')
-        il.add_xpath(
-            'images',
-            '//article//figure[contains(@class, "article__figure")]')
+        il.add_value('content', extract_texts(self.xpaths.paragraphs, resp))
+
+        il.add_xpath('published', self.xpaths.published)
+        il.add_xpath('author', self.xpaths.author)
+        il.add_value('images', extract_metadata(
+            self.xpaths.images, resp,
+            src=self.xpaths.image_src.get,
+            alt=self.xpaths.image_alt.get,
+            caption=self.xpaths.image_caption.getall))
 
         # "Modern" style news
-        il.add_xpath(
-            'title',
-            '//article'
-            '//h1[contains(@class, "article__feature__heading")]//text()')
-        il.add_xpath(
-            'content',
-            '//article'
-            '//p[contains(@class, "article__feature__paragraph")]//text()')
+        il.add_xpath('title', self.xpaths.feature_title)
+        il.add_xpath('content', self.xpaths.feature_content)
         return il.load_item()
 
 
@@ -116,36 +112,51 @@ class _YLEArticleItem(Item):
         * published (str): Publish time of the article.
         * author (str): Author of the article.
         * images (list of dict): Images of the article.
+        * cluster_id (int): ID of the near-duplicate cluster of the article,
+            if ``NEAR_DUPLICATE_ENABLED``.
     """
     url = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     time = Field(
         input_processor=Identity(),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='int64'
     )
     title = Field(
         input_processor=strip_join,
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     ingress = Field(
         input_processor=strip_join,
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     content = Field(
         input_processor=paragraph_join,
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     published = Field(
         input_processor=partial(strip_join, join_with=', '),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     author = Field(
         input_processor=partial(strip_join, join_with=', '),
-        output_processor=TakeFirst()
+        output_processor=TakeFirst(),
+        dtype='string'
     )
     images = Field(
-        input_processor=MapCompose(_YLEArticleSpider._get_image_metadata),
+        input_processor=Identity(),
         output_processor=Identity()
     )
+    cluster_id = Field(
+        input_processor=Identity(),
+        output_processor=TakeFirst(),
+        dtype='int64',
+        optional=True
+    )
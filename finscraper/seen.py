@@ -0,0 +1,85 @@
+"""Module for an index of items scraped in earlier runs."""
+
+
+import sqlite3
+import time
+
+from w3lib.url import canonicalize_url
+
+
+def is_seen(spider, url):
+    """Whether the item in an URL has been scraped in an earlier run.
+
+    Spiders call this before requesting item pages. Always False, unless
+    the index has been enabled via ``SEEN_INDEX_PATH`` Scrapy setting.
+
+    Args:
+        spider (scrapy.Spider): Spider that requests the item.
+        url (str): URL of the item page.
+
+    Returns:
+        bool
+    """
+    index = getattr(spider, 'seen_index', None)
+    if index is None or url not in index:
+        return False
+    spider.crawler.stats.inc_value('seen_index/skipped')
+    return True
+
+
+class SeenItemIndex:
+    """Index of scraped items, stored in a SQLite database.
+
+    Items are identified by the canonical URL of their page. An item is
+    seen until ``expiry`` seconds have passed from its latest scrape, after
+    which it may be scraped again, e.g. to get updated listings.
+
+    Args:
+        path (str): Path of the SQLite database.
+        expiry (float, optional): Seconds after which items are no longer
+            seen. Defaults to 0, i.e. items are seen forever.
+        timeout (float, optional): Seconds to wait for other processes to
+            release their locks. Defaults to 60.
+    """
+
+    def __init__(self, path, expiry=0, timeout=60):
+        self.path = path
+        self.expiry = expiry
+        self.conn = sqlite3.connect(path, timeout=timeout,
+                                    isolation_level=None)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS items ('
+                          'url TEXT PRIMARY KEY, '
+                          'scraped_at REAL NOT NULL) WITHOUT ROWID')
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(str(settings.get('SEEN_INDEX_PATH')),
+                   expiry=settings.getfloat('SEEN_INDEX_EXPIRY', 0),
+                   timeout=settings.getfloat('SEEN_INDEX_TIMEOUT', 60))
+
+    def add(self, *urls, scraped_at=None):
+        """Add items into the index, or renew them if already there.
+
+        Args:
+            *urls (str): URLs of the item pages.
+            scraped_at (float, optional): UNIX timestamp of the scrape.
+                Defaults to None, i.e. current time.
+        """
+        scraped_at = time.time() if scraped_at is None else scraped_at
+        urls = {canonicalize_url(url) for url in urls}
+        self.conn.executemany(
+            'INSERT OR REPLACE INTO items (url, scraped_at) VALUES (?, ?)',
+            [(url, scraped_at) for url in urls])
+
+    def __contains__(self, url):
+        scraped_after = time.time() - self.expiry if self.expiry else 0
+        row = self.conn.execute(
+            'SELECT 1 FROM items WHERE url = ? AND scraped_at >= ?',
+            (canonicalize_url(url), scraped_after)).fetchone()
+        return row is not None
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM items').fetchone()[0]
+
+    def close(self):
+        self.conn.close()
@@ -46,9 +46,10 @@ ROBOTSTXT_OBEY = True
 
 # Enable or disable spider middlewares
 # See https://docs.scrapy.org/en/latest/topics/spider-middleware.html
-# SPIDER_MIDDLEWARES = {
-#     'finscraper.middlewares.${ProjectName}SpiderMiddleware': 543,
-# }
+SPIDER_MIDDLEWARES = {
+    'finscraper.frontier.FrontierMiddleware': 40,
+    'finscraper.middlewares.ShardMiddleware': 100,
+}
 
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
@@ -56,19 +57,64 @@ ROBOTSTXT_OBEY = True
 #     'finscraper.middlewares.${ProjectName}DownloaderMiddleware': 543,
 # }
 
+# Configure Selenium rendering in SeleniumCallbackMiddleware
+# Maximum number of Chrome drivers rendering concurrently
+# SELENIUM_POOL_SIZE = 1
+# Use a local chromedriver instead of installing one automatically
+# CHROMEDRIVER_PATH = '/usr/local/bin/chromedriver'
+# Directory of the cache of installed chromedrivers per Chrome version
+# CHROMEDRIVER_CACHE_DIR = '/tmp/finscraper'
+# Block resources and domains not needed for extracting data
+# SELENIUM_LEAN_RENDERING = False
+# SELENIUM_BLOCKED_RESOURCES = ['image', 'font', 'stylesheet', 'media']
+# SELENIUM_BLOCKED_DOMAINS = ['doubleclick.net', 'google-analytics.com']
+# Page load strategy of Chrome, "normal", "eager" or "none"
+# SELENIUM_PAGE_LOAD_STRATEGY = 'normal'
+
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
 EXTENSIONS = {
     'scrapy.extensions.closespider.CloseSpider': 200,
+    'finscraper.extensions.IncrementalCrawl': 300,
     'finscraper.extensions.ProgressBar': 500
 }
 
+# Skip items scraped in earlier runs (disabled by default)
+# SEEN_INDEX_PATH = 'seen.sqlite'
+# Seconds after which items are scraped again, 0 means never
+# SEEN_INDEX_EXPIRY = 0
+# Seconds to wait for database locks held by other processes
+# SEEN_INDEX_TIMEOUT = 60
+
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 ITEM_PIPELINES = {
     'finscraper.pipelines.DefaultValueNonePipeline': 300,
+    'finscraper.pipelines.NearDuplicatePipeline': 400,
 }
 
+# Find near-duplicate items by MinHash of a text field (disabled by default)
+# NEAR_DUPLICATE_ENABLED = False
+# NEAR_DUPLICATE_FIELD = 'content'
+# Either "tag" items with a cluster ID, or "drop" near-duplicates
+# NEAR_DUPLICATE_ACTION = 'tag'
+# NEAR_DUPLICATE_CLUSTER_FIELD = 'cluster_id'
+# Minimum estimated Jaccard similarity of word shingles of near-duplicates
+# NEAR_DUPLICATE_THRESHOLD = 0.5
+# Path of the index, defaults to near_duplicates.sqlite in JOBDIR
+# NEAR_DUPLICATE_PATH = '/shared/news-near-duplicates.sqlite'
+
+# Configure item exporters
+# See https://docs.scrapy.org/en/latest/topics/feed-exports.html
+FEED_EXPORTERS = {
+    'parquet': 'finscraper.exporters.ParquetItemExporter',
+}
+# Compression level of items_format "jsonlines.zst"
+# FEED_ZSTD_LEVEL = 3
+# Train a Zstandard dictionary on the first items of the spider (disabled by
+# default), which improves compression when runs scrape only a few items
+# FEED_ZSTD_DICT_ITEMS = 1000
+
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/autothrottle.html
 # AUTOTHROTTLE_ENABLED = True
@@ -82,12 +128,39 @@ ITEM_PIPELINES = {
 # Enable showing throttling stats for every response received:
 # AUTOTHROTTLE_DEBUG = False
 
+# Share the crawl frontier between processes or hosts (disabled by default)
+# SCHEDULER = 'finscraper.frontier.SQLiteScheduler'
+# DUPEFILTER_CLASS = 'finscraper.frontier.SQLiteDupeFilter'
+# Path of the shared database, defaults to frontier.sqlite in JOBDIR
+# FRONTIER_SQLITE_PATH = '/shared/frontier.sqlite'
+# Seconds to wait for database locks held by other processes
+# FRONTIER_SQLITE_TIMEOUT = 60
+# Seconds to wait for new requests from other processes before closing
+# FRONTIER_IDLE_WAIT = 0
+# Seconds after which requests claimed by dead processes are released
+# FRONTIER_LEASE_TIMEOUT = 600
+
 # Enable and configure HTTP caching (disabled by default)
+# Cached responses are revalidated with ETag and Last-Modified headers
 # HTTPCACHE_ENABLED = True
 # HTTPCACHE_EXPIRATION_SECS = 0
+# Directory of the cache, relative to JOBDIR if set
 # HTTPCACHE_DIR = 'httpcache'
 # HTTPCACHE_IGNORE_HTTP_CODES = []
-# HTTPCACHE_STORAGE = 'scrapy.extensions.httpcache.FilesystemCacheStorage'
+HTTPCACHE_POLICY = 'finscraper.httpcache.ConditionalPolicy'
+HTTPCACHE_STORAGE = 'finscraper.httpcache.LRUCacheStorage'
+# Maximum size of the cache in bytes, 0 means unlimited
+HTTPCACHE_MAX_SIZE = 256 * 1024 * 1024
+
+# Skip extracted links that have already been requested before creating
+# requests for them. Maximum number of URLs to remember, 0 disables the
+# skipping. Requests are still filtered by DUPEFILTER_CLASS.
+# DUPEFILTER_URL_HASHES_MAX_SIZE = 1048576
+# Keep seen requests of long crawls in a Bloom filter of fixed size in JOBDIR
+# DUPEFILTER_CLASS = 'finscraper.dupefilters.BloomDupeFilter'
+# Number of requests until the filter grows, and its false positive rate
+# DUPEFILTER_BLOOM_CAPACITY = 1000000
+# DUPEFILTER_BLOOM_ERROR_RATE = 0.001
 
 # https://docs.scrapy.org/en/latest/topics/request-response.html#request-fingerprinter-implementation
 REQUEST_FINGERPRINTER_IMPLEMENTATION = '2.7'
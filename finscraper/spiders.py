@@ -34,6 +34,10 @@ log_level (str or None, optional): Logging level to display. Should be in
     .. note::
         This parameter can be overridden through Scrapy ``settings``
         (LOG_LEVEL, LOG_ENABLED) within the ``scrape`` -method.
+items_format (str, optional): Format to save the scraped items in. Should be
+    in ['jsonlines', 'jsonlines.gz', 'jsonlines.zst', 'parquet']. Parquet
+    requires ``pyarrow`` and Zstandard ``zstandard`` to be installed.
+    Defaults to 'jsonlines'.
 """
 
 
@@ -48,65 +52,80 @@ def _get_docstring(spider_cls, item_cls):
 class ISArticle(_SpiderWrapper):
     __doc__ = _get_docstring(_ISArticleSpider, _ISArticleItem)
 
-    def __init__(self, jobdir=None, progress_bar=True, log_level=None):
+    def __init__(self, jobdir=None, progress_bar=True, log_level=None,
+                 items_format='jsonlines'):
         super(ISArticle, self).__init__(
             spider_cls=_ISArticleSpider,
             spider_params=dict(),
+            item_cls=_ISArticleItem,
             jobdir=jobdir,
             progress_bar=progress_bar,
             log_level=log_level,
+            items_format=items_format,
         )
 
 
 class ILArticle(_SpiderWrapper):
     __doc__ = _get_docstring(_ILArticleSpider, _ILArticleItem)
 
-    def __init__(self, jobdir=None, progress_bar=True, log_level=None):
+    def __init__(self, jobdir=None, progress_bar=True, log_level=None,
+                 items_format='jsonlines'):
         super(ILArticle, self).__init__(
             spider_cls=_ILArticleSpider,
             spider_params=dict(),
+            item_cls=_ILArticleItem,
             jobdir=jobdir,
             progress_bar=progress_bar,
             log_level=log_level,
+            items_format=items_format,
         )
 
 
 class YLEArticle(_SpiderWrapper):
     __doc__ = _get_docstring(_YLEArticleSpider, _YLEArticleItem)
 
-    def __init__(self, jobdir=None, progress_bar=True, log_level=None):
+    def __init__(self, jobdir=None, progress_bar=True, log_level=None,
+                 items_format='jsonlines'):
         super(YLEArticle, self).__init__(
             spider_cls=_YLEArticleSpider,
             spider_params=dict(),
+            item_cls=_YLEArticleItem,
             jobdir=jobdir,
             progress_bar=progress_bar,
             log_level=log_level,
+            items_format=items_format,
         )
 
 
 class Suomi24Page(_SpiderWrapper):
     __doc__ = _get_docstring(_Suomi24PageSpider, _Suomi24PageItem)
 
-    def __init__(self, jobdir=None, progress_bar=True, log_level=None):
+    def __init__(self, jobdir=None, progress_bar=True, log_level=None,
+                 items_format='jsonlines'):
         super(Suomi24Page, self).__init__(
             spider_cls=_Suomi24PageSpider,
             spider_params=dict(),
+            item_cls=_Suomi24PageItem,
             jobdir=jobdir,
             progress_bar=progress_bar,
             log_level=log_level,
+            items_format=items_format,
         )
 
 
 class VauvaPage(_SpiderWrapper):
     __doc__ = _get_docstring(_VauvaPageSpider, _VauvaPageItem)
 
-    def __init__(self, jobdir=None, progress_bar=True, log_level=None):
+    def __init__(self, jobdir=None, progress_bar=True, log_level=None,
+                 items_format='jsonlines'):
         super(VauvaPage, self).__init__(
             spider_cls=_VauvaPageSpider,
             spider_params=dict(),
+            item_cls=_VauvaPageItem,
             jobdir=jobdir,
             progress_bar=progress_bar,
             log_level=log_level,
+            items_format=items_format,
         )
 
 
@@ -114,37 +133,45 @@ class OikotieApartment(_SpiderWrapper):
     __doc__ = _get_docstring(_OikotieApartmentSpider, _OikotieApartmentItem)
 
     def __init__(self, area=None, jobdir=None, progress_bar=True,
-                 log_level=None):
+                 log_level=None, items_format='jsonlines'):
         super(OikotieApartment, self).__init__(
             spider_cls=_OikotieApartmentSpider,
             spider_params=dict(area=area),
+            item_cls=_OikotieApartmentItem,
             jobdir=jobdir,
             progress_bar=progress_bar,
             log_level=log_level,
+            items_format=items_format,
         )
 
 
 class ToriDeal(_SpiderWrapper):
     __doc__ = _get_docstring(_ToriDealSpider, _ToriDealItem)
 
-    def __init__(self, jobdir=None, progress_bar=True, log_level=None):
+    def __init__(self, jobdir=None, progress_bar=True, log_level=None,
+                 items_format='jsonlines'):
         super(ToriDeal, self).__init__(
             spider_cls=_ToriDealSpider,
             spider_params=dict(),
+            item_cls=_ToriDealItem,
             jobdir=jobdir,
             progress_bar=progress_bar,
             log_level=log_level,
+            items_format=items_format,
         )
 
 
 class MNetPage(_SpiderWrapper):
     __doc__ = _get_docstring(_MNetPageSpider, _MNetPageItem)
 
-    def __init__(self, jobdir=None, progress_bar=True, log_level=None):
+    def __init__(self, jobdir=None, progress_bar=True, log_level=None,
+                 items_format='jsonlines'):
         super(MNetPage, self).__init__(
             spider_cls=_MNetPageSpider,
             spider_params=dict(),
+            item_cls=_MNetPageItem,
             jobdir=jobdir,
             progress_bar=progress_bar,
             log_level=log_level,
+            items_format=items_format,
         )
@@ -2,11 +2,27 @@
 
 
 import io
+import json
 import logging
+import os
 import pickle
+import queue
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    import msvcrt
+    fcntl = None
+
+from contextlib import contextmanager
+from pathlib import Path
 
 from selenium import webdriver
-from selenium.common.exceptions import WebDriverException
+from selenium.common.exceptions import SessionNotCreatedException, \
+    WebDriverException
 from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
@@ -87,9 +103,188 @@ class QueueHandler(logging.Handler):
             self.handleError(record)
 
 
+LEAN_RENDERING_URL_PATTERNS = {
+    'image': ['*.png*', '*.jpg*', '*.jpeg*', '*.gif*', '*.webp*', '*.avif*',
+              '*.svg*', '*.ico*'],
+    'font': ['*.woff*', '*.ttf*', '*.otf*', '*.eot*'],
+    'stylesheet': ['*.css*'],
+    'media': ['*.mp4*', '*.webm*', '*.m3u8*', '*.mp3*', '*.ogg*']
+}
+LEAN_RENDERING_BLOCKED_DOMAINS = [
+    'doubleclick.net', 'googlesyndication.com', 'googletagservices.com',
+    'googletagmanager.com', 'google-analytics.com', 'adservice.google.com',
+    'facebook.net', 'scorecardresearch.com', 'adform.net', 'criteo.com',
+    'criteo.net', 'adnxs.com', 'rubiconproject.com', 'pubmatic.com',
+    'casalemedia.com', 'hotjar.com', 'newrelic.com', 'nr-data.net',
+    'gemius.pl', 'cxense.com', 'chartbeat.com'
+]
+
+_chrome_version = None
+_chromedriver_paths = {}
+_chromedriver_paths_lock = threading.Lock()
+
+
+def _try_lock(fd):
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:  # Held by another process or file object
+        return False
+    return True
+
+
+@contextmanager
+def file_lock(path, timeout=3600, poll_interval=0.1):
+    """Context manager for a lock file shared between processes.
+
+    The file is locked with ``fcntl.flock``, or ``msvcrt.locking`` on
+    Windows, so that the lock is released by the operating system if its
+    owner dies. The file is never removed, since another process may be
+    waiting for the lock of the same file. It holds the PID of the latest
+    owner for debugging.
+
+    Args:
+        path (str or pathlib.Path): Path of the lock file.
+        timeout (float or None, optional): Seconds to wait for the lock.
+            None waits forever. Defaults to 3600.
+        poll_interval (float, optional): Seconds between attempts to acquire
+            the lock. Defaults to 0.1.
+
+    Raises:
+        TimeoutError: If the lock was not acquired within ``timeout``.
+    """
+    fd = os.open(str(path), os.O_CREAT | os.O_RDWR)
+    try:
+        start = time.monotonic()
+        while not _try_lock(fd):
+            if timeout is not None and time.monotonic() - start > timeout:
+                raise TimeoutError(f'Lock {path} was not acquired in time')
+            time.sleep(poll_interval)
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        yield
+    finally:
+        os.close(fd)  # Releases the lock
+
+
+def get_chrome_version():
+    """Get version of the installed Chrome.
+
+    Returns:
+        str or None: Chrome version, or None if it could not be found.
+    """
+    try:
+        from webdriver_manager.core.os_manager import OperationSystemManager
+        return OperationSystemManager().get_browser_version_from_os(
+            'google-chrome')
+    except Exception:
+        return None
+
+
+def get_chromedriver_path(settings=None, refresh=False):
+    """Get path of the chromedriver matching the installed Chrome.
+
+    The driver is installed with ``webdriver_manager`` only once per Chrome
+    version. The Chrome version is looked up once per process. Resolved
+    paths are cached in memory and in a file shared by all processes, which
+    is placed into ``CHROMEDRIVER_CACHE_DIR`` Scrapy setting or the
+    temporary directory. A local driver can be pinned via
+    ``CHROMEDRIVER_PATH`` Scrapy setting.
+
+    Args:
+        settings (scrapy.settings.Settings, optional): Scrapy settings.
+            Defaults to None.
+        refresh (bool, optional): Whether to look up the Chrome version and
+            install the driver again, e.g. when the cached driver does not
+            work anymore. Defaults to False.
+
+    Returns:
+        str: Path of the chromedriver executable.
+    """
+    settings = settings or {}
+    if settings.get('CHROMEDRIVER_PATH'):
+        return str(settings.get('CHROMEDRIVER_PATH'))
+
+    global _chrome_version
+    with _chromedriver_paths_lock:
+        # Looking up the version starts a subprocess
+        if _chrome_version is None or refresh:
+            _chrome_version = get_chrome_version() or 'unknown'
+        version = _chrome_version
+        path = _chromedriver_paths.get(version)
+        if path is not None and not refresh and os.path.exists(path):
+            return path
+
+        cache_dir = Path(settings.get('CHROMEDRIVER_CACHE_DIR') or
+                         Path(tempfile.gettempdir()) / 'finscraper')
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        cache_path = cache_dir / 'chromedriver.json'
+        with file_lock(cache_dir / 'chromedriver.lock'):
+            try:
+                with open(cache_path, 'r') as f:
+                    paths = json.load(f)
+            except (OSError, ValueError):
+                paths = {}
+            path = paths.get(version)
+            if path is None or refresh or not os.path.exists(path):
+                path = ChromeDriverManager().install()
+                paths[version] = path
+                tmp_path = cache_path.with_suffix('.tmp')
+                with open(tmp_path, 'w') as f:
+                    json.dump(paths, f)
+                os.replace(tmp_path, cache_path)
+        _chromedriver_paths[version] = path
+        return path
+
+
+def _get_blocked_resources(settings):
+    resources = settings.get('SELENIUM_BLOCKED_RESOURCES')
+    if resources is None:
+        resources = list(LEAN_RENDERING_URL_PATTERNS)
+    return resources
+
+
+def get_blocked_url_patterns(settings=None):
+    """Get URL patterns that are blocked in lean rendering.
+
+    Resource types are read from ``SELENIUM_BLOCKED_RESOURCES`` and
+    domains from ``SELENIUM_BLOCKED_DOMAINS`` Scrapy settings, which
+    default to all of ``LEAN_RENDERING_URL_PATTERNS`` and
+    ``LEAN_RENDERING_BLOCKED_DOMAINS``, respectively.
+
+    Args:
+        settings (scrapy.settings.Settings, optional): Scrapy settings.
+            Defaults to None.
+
+    Returns:
+        list of str: Patterns for DevTools ``Network.setBlockedURLs``.
+    """
+    settings = settings or {}
+    domains = settings.get('SELENIUM_BLOCKED_DOMAINS')
+    if domains is None:
+        domains = LEAN_RENDERING_BLOCKED_DOMAINS
+
+    patterns = []
+    for resource in _get_blocked_resources(settings):
+        if resource not in LEAN_RENDERING_URL_PATTERNS:
+            raise ValueError(f'Resource type "{resource}" not in '
+                             f'{list(LEAN_RENDERING_URL_PATTERNS)}')
+        patterns.extend(LEAN_RENDERING_URL_PATTERNS[resource])
+    for domain in domains:
+        patterns.extend([f'*://{domain}/*', f'*.{domain}/*'])
+    return patterns
+
+
 def get_chromedriver(options=None, settings=None):
     """Get chromedriver automatically.
 
+    Lean rendering can be enabled via ``SELENIUM_LEAN_RENDERING`` Scrapy
+    setting, which blocks the resource types and domains given by
+    ``get_blocked_url_patterns``. Page load strategy ("normal", "eager" or
+    "none") can be set via ``SELENIUM_PAGE_LOAD_STRATEGY`` Scrapy setting.
+
     Args:
         options (selenium.webdriver.chrome.options.Options, optional):
             Options to start chromedriver with. If None, will use default
@@ -102,21 +297,40 @@ def get_chromedriver(options=None, settings=None):
         Selenium webdriver for Chrome (selenium.webdriver.Chrome).
     """
     settings = settings or {}
+    lean_rendering = settings.get('SELENIUM_LEAN_RENDERING', False)
+    blocked_url_patterns = (get_blocked_url_patterns(settings)
+                            if lean_rendering else [])
     if options is None:
         options = Options()
         options.add_argument('--no-sandbox')
         options.add_argument("--disable-extensions")
         options.add_argument("--disable-gpu")
         options.add_argument('--disable-dev-shm-usage')
-        options.add_experimental_option(
-            'prefs', {'intl.accept_languages': 'fi,fi_FI'})
+        prefs = {'intl.accept_languages': 'fi,fi_FI'}
+        if lean_rendering and 'image' in _get_blocked_resources(settings):
+            prefs['profile.managed_default_content_settings.images'] = 2
+        options.add_experimental_option('prefs', prefs)
         if not settings.get('DISABLE_HEADLESS', False):
             options.add_argument("--headless")
         if settings.get('PROGRESS_BAR_ENABLED', True):
             options.add_argument('--disable-logging')
+    page_load_strategy = settings.get('SELENIUM_PAGE_LOAD_STRATEGY')
+    if page_load_strategy:
+        options.page_load_strategy = page_load_strategy
 
-    service = ChromeService(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=options)
+    try:
+        service = ChromeService(get_chromedriver_path(settings))
+        driver = webdriver.Chrome(service=service, options=options)
+    except SessionNotCreatedException:
+        if settings.get('CHROMEDRIVER_PATH'):
+            raise
+        # Chrome has been updated since the driver was cached
+        service = ChromeService(get_chromedriver_path(settings, refresh=True))
+        driver = webdriver.Chrome(service=service, options=options)
+    if blocked_url_patterns:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs',
+                               {'urls': blocked_url_patterns})
     if settings.get('MINIMIZE_WINDOW', False):
         try:
             driver.minimize_window()
@@ -124,3 +338,74 @@ def get_chromedriver(options=None, settings=None):
             pass
 
     return driver
+
+
+class ChromeDriverPool:
+    """Pool of Chrome webdrivers that are started on demand.
+
+    Args:
+        size (int): Maximum number of drivers.
+        settings (scrapy.settings.Settings, optional): Scrapy settings to
+            start drivers with. Defaults to None.
+    """
+
+    def __init__(self, size, settings=None):
+        if size < 1:
+            raise ValueError('Pool size should be at least 1')
+        self.size = size
+        self.settings = settings
+        self._free = queue.Queue()
+        self._drivers = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Get a free driver, starting a new one if none is free.
+
+        Blocks until a driver is released when ``size`` drivers are in use.
+
+        Returns:
+            Selenium webdriver for Chrome (selenium.webdriver.Chrome).
+        """
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            start_new = len(self._drivers) < self.size
+            if start_new:
+                self._drivers.append(None)  # Reserve a place in the pool
+        if not start_new:
+            return self._free.get()
+        try:
+            driver = get_chromedriver(settings=self.settings)
+        except BaseException:
+            with self._lock:
+                self._drivers.remove(None)
+            raise
+        with self._lock:
+            self._drivers[self._drivers.index(None)] = driver
+        return driver
+
+    def release(self, driver):
+        """Return a driver into the pool."""
+        self._free.put(driver)
+
+    @contextmanager
+    def driver(self):
+        """Context manager for acquiring and releasing a driver."""
+        driver = self.acquire()
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def close(self):
+        """Quit all drivers of the pool."""
+        with self._lock:
+            drivers, self._drivers = self._drivers, []
+        for driver in drivers:
+            if driver is not None:
+                try:
+                    driver.quit()
+                except WebDriverException:
+                    pass
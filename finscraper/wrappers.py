@@ -1,41 +1,59 @@
 """Module for wrapping Scrapy spiders."""
 
 
+import atexit
 import json
 import logging
 import multiprocessing as mp
 import pickle
 import platform
+import queue
 import shutil
 import tempfile
+import threading
+import time
 import uuid
 import weakref
 
+from contextlib import ExitStack, closing, contextmanager
+from datetime import datetime
 from logging.handlers import QueueListener
 from pathlib import Path
 
 import pandas as pd
 
-from scrapy.crawler import CrawlerRunner
+from scrapy import signals
+from scrapy.crawler import Crawler, CrawlerRunner
+from scrapy.extensions.postprocessing import PostProcessingManager
 from scrapy.settings import Settings
 from scrapy.utils.log import configure_logging
+from scrapy.utils.misc import load_object
+from scrapy.utils.serialize import ScrapyJSONEncoder
 
 from twisted.internet import reactor
+from twisted.python.failure import Failure
 
+from finscraper.middlewares import ShardContext, ShardMiddleware
+from finscraper.readers import iter_chunks, iter_jsonlines, iter_parquet, \
+    iter_parquet_items, read_jsonlines, read_parquet
 from finscraper.utils import QueueHandler
 
 
 if platform.system() == 'Darwin':
     mp = mp.get_context('spawn')
 
+# Forked reactors would share the epoll instance of the parent process,
+# which breaks when several of them run at the same time
+spawn_mp = mp.get_context('spawn')
 
-def _run_as_process(func, spider_cls, spider_params, settings):
+
+@contextmanager
+def _forward_logging(settings, log_queue=None, context=mp):
     # Setup logging / progress bar
     # (queuehandler --> listener --> root logger --> streamhandler)
     progress_bar_enabled = settings['PROGRESS_BAR_ENABLED']
     log_enabled = settings['LOG_ENABLED']
     logger = None
-    log_queue = None
     log_queue_listener = None
     if log_enabled or progress_bar_enabled:
         stream_handler = logging.StreamHandler()
@@ -47,7 +65,8 @@ def _run_as_process(func, spider_cls, spider_params, settings):
                 logging.Formatter(settings.get('LOG_FORMAT')))
 
         # Contains log messages or progress bar status
-        log_queue = mp.Queue(-1)
+        if log_queue is None:
+            log_queue = context.Queue(-1)
 
         # Forward log messages / progress bar from queue into stream handler
         log_queue_listener = QueueListener(log_queue, stream_handler)
@@ -58,65 +77,176 @@ def _run_as_process(func, spider_cls, spider_params, settings):
         logger.setLevel(settings.get('LOG_LEVEL'))
         logger.addHandler(stream_handler)
 
-    # Start function as a separate process
-    results_queue = mp.Queue()
-    args = (results_queue, log_queue, spider_cls, spider_params, settings)
-    process = mp.Process(target=func, args=args)
-    process.start()
-    result = results_queue.get()
-    process.join()
-    process.terminate()
+    try:
+        yield log_queue
+    finally:
+        if log_queue_listener is not None:
+            log_queue_listener.stop()
 
-    if log_queue_listener is not None:
-        log_queue_listener.stop()
+        if logger is not None:
+            logger.removeHandler(stream_handler)
 
-    if logger is not None:
-        logger.removeHandler(stream_handler)
+
+def _run_as_process(func, crawls, settings):
+    with _forward_logging(settings) as log_queue:
+        # Start function as a separate process
+        results_queue = mp.Queue()
+        args = (results_queue, log_queue, crawls, settings)
+        process = mp.Process(target=func, args=args)
+        process.start()
+        result = results_queue.get()
+        process.join()
+        process.terminate()
 
     if isinstance(result, BaseException):
         raise result
 
 
-def _run_spider_func(results_queue, log_queue, spider_cls, spider_params,
-                     settings):
-    try:
-        # Setup Scrapy logging
-        configure_logging(settings, install_root_handler=False)
-
-        # Disable logging if progress bar is enabled.
-        # This needs to be done before starting spiders. Opening a spider
-        # might propagate other loggers, which is why the same operation is
-        # performed in the ProgressBar -extension.
-        disabled_loggers = []
-        if settings['PROGRESS_BAR_ENABLED']:
-            for existing_logger in logging.Logger.manager.loggerDict.values():
-                if not isinstance(existing_logger, logging.PlaceHolder):
-                    if existing_logger.propagate:
-                        existing_logger.propagate = False
-                        disabled_loggers.append(existing_logger)
-
-        # Setup logging (worker --> queuehandler --> root logger)
-        queue_handler = None
-        if log_queue is not None:
-            # Handler that forwards log messages / progress bar from logger
-            # into log queue
-            queue_handler = QueueHandler(log_queue)
-            queue_handler.setLevel(settings.get('LOG_LEVEL'))
-            queue_handler.setFormatter(
-                logging.Formatter(settings.get('LOG_FORMAT')))
+def _iter_as_process(func, crawls, settings, stop_timeout=30):
+    with _forward_logging(settings) as log_queue:
+        # Start function as a separate process, which sends scraped items
+        # into items queue as JSON lines, and None when done
+        results_queue = mp.Queue()
+        items_queue = mp.Queue()
+        stop_event = mp.Event()
+        args = (results_queue, log_queue, crawls, settings, items_queue,
+                stop_event)
+        process = mp.Process(target=func, args=args)
+        process.start()
+        result = None
+        try:
+            while True:
+                try:
+                    line = items_queue.get(timeout=0.1)
+                except queue.Empty:
+                    if process.is_alive():
+                        continue
+                    break  # Process died without finishing properly
+                if line is None:
+                    break
+                yield json.loads(line)
+
+            try:
+                result = results_queue.get(timeout=1)
+            except queue.Empty:
+                pass
+        finally:
+            # Stop scraping also when the consumer stops iterating early.
+            # Spiders are closed gracefully, and terminated only if they do
+            # not close in time.
+            if process.is_alive():
+                stop_event.set()
+                deadline = time.monotonic() + stop_timeout
+                while process.is_alive() and time.monotonic() < deadline:
+                    try:  # Items are discarded, but the queue is emptied
+                        if items_queue.get(timeout=0.1) is None:
+                            break
+                    except queue.Empty:
+                        pass
+                process.join(timeout=max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                process.terminate()
+            process.join()
 
-            logger = logging.getLogger()
-            logger.setLevel(settings.get('LOG_LEVEL'))
-            logger.addHandler(queue_handler)
+    if isinstance(result, BaseException):
+        raise result
 
-        # Start crawling
-        runner = CrawlerRunner(settings)
-        deferred = runner.crawl(spider_cls, **spider_params)
-        deferred.addBoth(lambda _: reactor.stop())
-        reactor.run()
-        results_queue.put(None)
-    except Exception as e:
-        results_queue.put(e)
+
+class _FeedWriter:
+    """Export items into feeds in this process, similarly to Scrapy.
+
+    Files are opened when the first item is exported.
+
+    Args:
+        feeds (dict): Feeds as in setting ``FEEDS``, with local paths.
+        settings (scrapy.settings.Settings): Settings with
+            ``FEED_EXPORTERS``.
+    """
+
+    def __init__(self, feeds, settings):
+        self.feeds = feeds
+        self.exporters = settings.getwithbase('FEED_EXPORTERS')
+        self._slots = None
+
+    def _open(self):
+        now = datetime.utcnow()
+        params = {
+            'time': now.replace(microsecond=0).isoformat().replace(':', '-'),
+            'batch_time': now.isoformat().replace(':', '-'),
+            'batch_id': 1
+        }
+        self._slots = []
+        for uri, options in self.feeds.items():
+            path = Path(uri % params)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            f = open(path, 'ab')
+            if 'postprocessing' in options:
+                f = PostProcessingManager(
+                    options['postprocessing'], f, options)
+            exporter = load_object(self.exporters[options['format']])(
+                f, fields_to_export=options.get('fields'),
+                encoding=options.get('encoding'),
+                indent=options.get('indent'),
+                **options.get('item_export_kwargs', {}))
+            exporter.start_exporting()
+            self._slots.append((f, exporter))
+
+    def export_item(self, item):
+        if self._slots is None:
+            self._open()
+        for _, exporter in self._slots:
+            exporter.export_item(item)
+
+    def close(self):
+        for f, exporter in self._slots or []:
+            exporter.finish_exporting()
+            f.close()
+        self._slots = None
+
+
+def _forward_items(crawler, items_queue):
+    encoder = ScrapyJSONEncoder()
+
+    def item_scraped(item):
+        items_queue.put(encoder.encode(item))
+
+    crawler.signals.connect(item_scraped, signal=signals.item_scraped,
+                            weak=False)
+
+
+@contextmanager
+def _child_logging(settings, log_queue):
+    # Setup Scrapy logging
+    configure_logging(settings, install_root_handler=False)
+
+    # Disable logging if progress bar is enabled.
+    # This needs to be done before starting spiders. Opening a spider
+    # might propagate other loggers, which is why the same operation is
+    # performed in the ProgressBar -extension.
+    disabled_loggers = []
+    if settings['PROGRESS_BAR_ENABLED']:
+        for existing_logger in logging.Logger.manager.loggerDict.values():
+            if not isinstance(existing_logger, logging.PlaceHolder):
+                if existing_logger.propagate:
+                    existing_logger.propagate = False
+                    disabled_loggers.append(existing_logger)
+
+    # Setup logging (worker --> queuehandler --> root logger)
+    queue_handler = None
+    if log_queue is not None:
+        # Handler that forwards log messages / progress bar from logger
+        # into log queue
+        queue_handler = QueueHandler(log_queue)
+        queue_handler.setLevel(settings.get('LOG_LEVEL'))
+        queue_handler.setFormatter(
+            logging.Formatter(settings.get('LOG_FORMAT')))
+
+        logger = logging.getLogger()
+        logger.setLevel(settings.get('LOG_LEVEL'))
+        logger.addHandler(queue_handler)
+
+    try:
+        yield
     finally:
         if queue_handler is not None:
             logger.removeHandler(queue_handler)
@@ -126,6 +256,207 @@ def _run_spider_func(results_queue, log_queue, spider_cls, spider_params,
                 disabled_logger.propagate = True
 
 
+def _stop_on_event(runner, stop_event):
+    def wait():
+        stop_event.wait()
+        reactor.callFromThread(runner.stop)
+
+    # Not in the thread pool of the reactor, which is joined when stopping
+    threading.Thread(target=wait, daemon=True).start()
+
+
+def _run_spiders_func(results_queue, log_queue, crawls, settings,
+                      items_queue=None, stop_event=None):
+    try:
+        with _child_logging(settings, log_queue):
+            # Start crawling, all crawls concurrently within the same runner
+            runner = CrawlerRunner(settings)
+            for spider_cls, spider_params, crawler_settings in crawls:
+                crawler = Crawler(spider_cls, crawler_settings)
+                if items_queue is not None:
+                    _forward_items(crawler, items_queue)
+                runner.crawl(crawler, **spider_params)
+            if stop_event is not None:
+                _stop_on_event(runner, stop_event)
+            deferred = runner.join()
+            deferred.addBoth(lambda _: reactor.stop())
+            reactor.run()
+        results_queue.put(None)
+    except Exception as e:
+        results_queue.put(e)
+    finally:
+        if items_queue is not None:
+            items_queue.put(None)
+
+
+def _run_shard_func(results_queue, log_queue, crawls, settings, shard):
+    ShardMiddleware.context = shard
+    _run_spiders_func(results_queue, log_queue, crawls, settings)
+
+
+def _run_as_shards(func, crawls, settings, shards, on_exit=None):
+    # Whether all shards exited cleanly is passed into ``on_exit``
+    with _forward_logging(settings, context=spawn_mp) as log_queue:
+        # Start one process per shard
+        results_queue = spawn_mp.Queue()
+        processes = []
+        for crawl, shard in zip(crawls, shards):
+            args = (results_queue, log_queue, [crawl], crawl[2], shard)
+            process = spawn_mp.Process(target=func, args=args)
+            process.start()
+            processes.append(process)
+
+        results = []
+        try:
+            while len(results) < len(processes):
+                try:
+                    results.append(results_queue.get(timeout=1))
+                except queue.Empty:
+                    if not any(process.is_alive() for process in processes):
+                        break  # Processes died without finishing properly
+        finally:
+            for process in processes:
+                process.join(timeout=10)
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+            exitcodes = [process.exitcode for process in processes]
+            if on_exit is not None:
+                on_exit(all(exitcode == 0 for exitcode in exitcodes))
+
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    if any(exitcode != 0 for exitcode in exitcodes):
+        raise RuntimeError(f'Shard processes exited with codes {exitcodes}')
+
+
+def _picklable_result(result):
+    # Results that cannot be unpickled would never reach the parent
+    try:
+        pickle.loads(pickle.dumps(result))
+        return result
+    except Exception:
+        return RuntimeError(f'Crawl failed with {result!r}')
+
+
+def _crawl_worker_func(jobs_queue, results_queue, log_queue):
+    def run_job(spider_cls, spider_params, settings):
+        log_enabled = (settings['LOG_ENABLED'] or
+                       settings['PROGRESS_BAR_ENABLED'])
+        stack = ExitStack()
+        try:
+            stack.enter_context(
+                _child_logging(settings, log_queue if log_enabled else None))
+            runner = CrawlerRunner(settings)
+            deferred = runner.crawl(spider_cls, **spider_params)
+        except Exception as e:
+            stack.close()
+            results_queue.put(_picklable_result(e))
+            return
+
+        def finish(result):
+            stack.close()
+            if isinstance(result, Failure):
+                result = result.value
+            results_queue.put(_picklable_result(result))
+
+        deferred.addBoth(finish)
+
+    def receive_jobs():
+        # Jobs are received in a thread and run in the reactor thread
+        while True:
+            job = jobs_queue.get()
+            if job is None:
+                reactor.callFromThread(reactor.stop)
+                break
+            reactor.callFromThread(run_job, *job)
+
+    reactor.callInThread(receive_jobs)
+    reactor.run()
+
+
+class _CrawlWorker:
+    """Long-lived process that runs crawls one at a time in one reactor.
+
+    A crawl is waited for ``CLOSESPIDER_TIMEOUT`` and ``close_timeout``
+    seconds at most. The process is stopped if the crawl does not finish
+    by then, or if waiting is interrupted, so that results of abandoned
+    crawls are never received by later ones.
+    """
+    close_timeout = 60
+
+    def __init__(self):
+        # Spawned, since its reactor runs alongside crawls in forked processes
+        self.jobs_queue = spawn_mp.Queue()
+        self.results_queue = spawn_mp.Queue()
+        self.log_queue = spawn_mp.Queue(-1)
+        self.process = spawn_mp.Process(
+            target=_crawl_worker_func,
+            args=(self.jobs_queue, self.results_queue, self.log_queue),
+            daemon=True
+        )
+        self.process.start()
+        self._lock = threading.Lock()
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    def run(self, spider_cls, spider_params, settings):
+        timeout = settings.getfloat('CLOSESPIDER_TIMEOUT', 0)
+        deadline = None
+        if timeout > 0:
+            deadline = time.monotonic() + timeout + self.close_timeout
+        with self._lock, _forward_logging(settings, self.log_queue):
+            self.jobs_queue.put((spider_cls, spider_params, settings))
+            try:
+                result = self._wait(deadline)
+            except BaseException:
+                self.stop()
+                raise
+
+        if isinstance(result, BaseException):
+            raise result
+
+    def _wait(self, deadline):
+        while True:
+            try:
+                return self.results_queue.get(timeout=1)
+            except queue.Empty:
+                if not self.is_alive():
+                    raise RuntimeError('Crawl worker process died')
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError('Crawl worker did not finish the '
+                                       'crawl in time')
+
+    def stop(self):
+        if self.is_alive():
+            self.jobs_queue.put(None)
+            self.process.join(timeout=10)
+        if self.is_alive():
+            self.process.terminate()
+            self.process.join()
+
+
+_worker = None
+
+
+def _get_worker():
+    global _worker
+    if _worker is None or not _worker.is_alive():
+        _worker = _CrawlWorker()
+    return _worker
+
+
+@atexit.register
+def stop_worker():
+    """Stop the persistent crawl worker process, if it is running."""
+    global _worker
+    if _worker is not None:
+        _worker.stop()
+        _worker = None
+
+
 class _SpiderWrapper:
     """Provide common methods and attributes for all spiders."""
     _log_levels = {
@@ -135,11 +466,15 @@ class _SpiderWrapper:
         'error': logging.ERROR,
         'critical': logging.CRITICAL
     }
+    _items_formats = ['jsonlines', 'jsonlines.gz', 'jsonlines.zst',
+                      'parquet']
 
     def __init__(self, spider_cls, spider_params, jobdir=None,
-                 progress_bar=True, log_level=None):
+                 progress_bar=True, log_level=None, items_format='jsonlines',
+                 item_cls=None):
         self.spider_cls = spider_cls
         self.spider_params = spider_params
+        self.item_cls = item_cls
 
         if jobdir is None:
             self._jobdir = Path(tempfile.gettempdir()) / str(uuid.uuid4())
@@ -151,8 +486,14 @@ class _SpiderWrapper:
 
         self.log_level = log_level
         self.progress_bar = progress_bar and self.log_level is None
-
-        self._items_save_path = self._jobdir / 'items.jl'
+        self.items_format = items_format
+
+        self._items_save_paths = {
+            'jsonlines': self._jobdir / 'items.jl',
+            'jsonlines.gz': self._jobdir / 'items.jl.gz',
+            'jsonlines.zst': self._jobdir / 'items.jl.zst',
+            'parquet': self._jobdir / 'items.parquet'
+        }
         self._spider_save_path = self._jobdir / 'spider.pkl'
 
         self._finalizer = weakref.finalize(
@@ -204,13 +545,32 @@ class _SpiderWrapper:
         else:
             raise ValueError(f'Progress bar "{progress_bar}" not boolean')
 
+    @property
+    def items_format(self):
+        """Format to save the scraped items in.
+
+        Should be in ['jsonlines', 'jsonlines.gz', 'jsonlines.zst',
+        'parquet']. Items saved in any of the formats are returned by
+        ``get``. Can be changed after initialization of a spider.
+        """
+        return self._items_format
+
+    @items_format.setter
+    def items_format(self, items_format):
+        if items_format in self._items_formats:
+            self._items_format = items_format
+        else:
+            raise ValueError(
+                f'Items format should be in {self._items_formats}')
+
     @property
     def items_save_path(self):
         """Save of path of the scraped items.
 
-        Cannot be changed after initialization of a spider.
+        Depends on ``items_format``. With Parquet, the path is a directory
+        that contains one file per scraping run.
         """
-        return str(self._items_save_path)
+        return str(self._items_save_paths[self.items_format])
 
     @property
     def spider_save_path(self):
@@ -220,13 +580,12 @@ class _SpiderWrapper:
         """
         return str(self._spider_save_path)
 
-    def _run_spider(self, itemcount=10, timeout=60, pagecount=0, errorcount=0,
-                    settings=None):
+    def _get_settings(self, itemcount=10, timeout=60, pagecount=0,
+                      errorcount=0, settings=None):
         _settings = Settings()
         _settings.setmodule('finscraper.settings', priority='project')
 
         _settings['JOBDIR'] = self.jobdir
-        _settings['FEEDS'] = {self.items_save_path: {'format': 'jsonlines'}}
 
         _settings['CLOSESPIDER_ITEMCOUNT'] = itemcount
         _settings['CLOSESPIDER_TIMEOUT'] = timeout
@@ -244,18 +603,133 @@ class _SpiderWrapper:
         # Will always be prioritized --> conflicts are possible
         if settings is not None:
             _settings.update(settings)
+        if settings is None or 'FEEDS' not in settings:
+            _settings['FEEDS'] = self._get_feeds(_settings)
 
-        try:
-            _run_as_process(
-                func=_run_spider_func,
-                spider_cls=self.spider_cls,
-                spider_params=self.spider_params,
-                settings=_settings
+        return _settings
+
+    def _get_shard_dir(self, shard):
+        return self._jobdir / 'shards' / str(shard)
+
+    def _get_feeds(self, settings, shard=None):
+        if self.items_format == 'parquet':
+            suffix = '' if shard is None else f'-{shard}'
+            feed_uri = str(self._items_save_paths['parquet'] /
+                           f'part-%(batch_time)s{suffix}.parquet')
+            return {feed_uri: {'format': 'parquet'}}
+
+        save_path = Path(self.items_save_path)
+        if shard is None:
+            feed_uri = str(save_path)
+        else:
+            feed_uri = str(self._get_shard_dir(shard) / save_path.name)
+        feed_options = {'format': 'jsonlines'}
+        if self.items_format == 'jsonlines.gz':
+            feed_options['postprocessing'] = [
+                'scrapy.extensions.postprocessing.GzipPlugin']
+        elif self.items_format == 'jsonlines.zst':
+            # Dictionary is shared by the shards
+            feed_options['postprocessing'] = [
+                'finscraper.postprocessing.ZstdPlugin']
+            feed_options['zstd_level'] = settings.getint(
+                'FEED_ZSTD_LEVEL', 3)
+            feed_options['zstd_dict_items'] = settings.getint(
+                'FEED_ZSTD_DICT_ITEMS', 0)
+            feed_options['zstd_dict_path'] = f'{save_path}.dict'
+        return {feed_uri: feed_options}
+
+    def _get_shard_crawls(self, workers, settings):
+        # Shards have their own jobdir, and items are counted in all shards
+        crawls = []
+        for shard in range(workers):
+            shard_settings = settings.copy()
+            shard_settings['JOBDIR'] = str(self._get_shard_dir(shard))
+            shard_settings['FEEDS'] = self._get_feeds(settings, shard)
+            shard_settings['CLOSESPIDER_ITEMCOUNT'] = 0
+            shard_settings['PROGRESS_BAR_ENABLED'] = False
+            crawls.append((self.spider_cls, self.spider_params,
+                           shard_settings))
+
+        inboxes = [spawn_mp.Queue() for _ in range(workers)]
+        lock = spawn_mp.Lock()
+        pending = spawn_mp.RawValue('i', 0)
+        states = spawn_mp.RawArray('b', workers)
+        itemcount = spawn_mp.RawValue('i', 0)
+        shards = [
+            ShardContext(
+                index=shard,
+                count=workers,
+                inboxes=inboxes,
+                lock=lock,
+                pending=pending,
+                states=states,
+                itemcount=itemcount,
+                max_itemcount=settings['CLOSESPIDER_ITEMCOUNT']
             )
+            for shard in range(workers)
+        ]
+        return crawls, shards
+
+    def _merge_shard_items(self, workers, clean=True):
+        if self.items_format == 'parquet':  # Written directly into jobdir
+            return
+        # Compressed streams can be concatenated as well
+        save_path = Path(self.items_save_path)
+        shard_items_paths = [self._get_shard_dir(shard) / save_path.name
+                             for shard in range(workers)]
+        shard_items_paths = [path for path in shard_items_paths
+                             if path.exists()]
+        if not clean:
+            # Files of stopped shards may end with a partial line or frame
+            for path in shard_items_paths:
+                path.rename(path.with_name(
+                    f'{path.name}.{uuid.uuid4().hex}.incomplete'))
+            return
+        with open(save_path, 'ab') as f:
+            for path in shard_items_paths:
+                with open(path, 'rb') as shard_f:
+                    shutil.copyfileobj(shard_f, f)
+                path.unlink()
+
+    def _run_spider(self, itemcount=10, timeout=60, pagecount=0, errorcount=0,
+                    settings=None, persistent=False, workers=1):
+        _settings = self._get_settings(
+            itemcount=itemcount,
+            timeout=timeout,
+            pagecount=pagecount,
+            errorcount=errorcount,
+            settings=settings
+        )
+        if persistent and workers > 1:
+            raise ValueError('Persistent worker supports only one worker')
+        try:
+            if workers > 1:
+                crawls, shards = self._get_shard_crawls(workers, _settings)
+                _run_as_shards(
+                    func=_run_shard_func,
+                    crawls=crawls,
+                    settings=_settings,
+                    shards=shards,
+                    on_exit=lambda clean: self._merge_shard_items(
+                        workers, clean)
+                )
+            elif persistent:
+                _get_worker().run(
+                    spider_cls=self.spider_cls,
+                    spider_params=self.spider_params,
+                    settings=_settings
+                )
+            else:
+                _run_as_process(
+                    func=_run_spiders_func,
+                    crawls=[(self.spider_cls, self.spider_params, _settings)],
+                    settings=_settings
+                )
         except KeyboardInterrupt:
             pass
 
-    def scrape(self, n=10, timeout=60, settings=None):
+    def scrape(self, n=10, timeout=60, settings=None, persistent=False,
+               workers=1):
         """Scrape given number of items.
 
         Args:
@@ -267,38 +741,159 @@ class _SpiderWrapper:
                 Defaults to None, which correspond to default settings.
                 See list of available settings at:
                 https://docs.scrapy.org/en/latest/topics/settings.html.
+            persistent (bool, optional): Whether to run the spider in a
+                long-lived worker process, which is shared by all spiders
+                within the Python interpreter. Only the first call starts
+                the process, which makes subsequent calls start faster.
+                The process is spawned, so scripts need an
+                ``if __name__ == '__main__':`` guard, as with ``workers``.
+                Defaults to False.
+            workers (int, optional): Number of processes to scrape with.
+                Requests are partitioned between the processes based on their
+                URL, and ``n`` is the number of items to scrape in total.
+                Use the same number of workers when continuing scraping in
+                the same ``jobdir``. Items of shards that were stopped are
+                not added into the items of the spider, but kept in files
+                with suffix ``.incomplete`` under ``jobdir / 'shards'``.
+                Cannot be used together with ``persistent``. Defaults to 1.
 
         Returns:
             self
         """
-        self._run_spider(itemcount=n, timeout=timeout, settings=settings)
+        self._run_spider(itemcount=n, timeout=timeout, settings=settings,
+                         persistent=persistent, workers=workers)
         return self
 
-    def get(self, fmt='df'):
+    def iter_scrape(self, n=10, timeout=60, settings=None):
+        """Scrape given number of items and yield them while scraping.
+
+        Items are yielded as soon as the spider has scraped them, and they
+        are saved into ``jobdir`` similarly to ``scrape``. Stopping the
+        iteration early closes the spider gracefully, and the items that
+        were yielded are saved. Feeds given in ``settings`` are saved by the
+        spider instead, and may contain items that were not yielded yet.
+
+        Args:
+            n (int, optional): Number of items to attempt to scrape. Zero
+                corresponds to no limit. Defaults to 10.
+            timeout (int, optional): Timeout in seconds to wait before stopping
+                the spider. Zero corresponds to no limit. Defaults to 60.
+            settings (dict or None, optional): Scrapy spider settings to use.
+                Defaults to None, which correspond to default settings.
+                See list of available settings at:
+                https://docs.scrapy.org/en/latest/topics/settings.html.
+
+        Yields:
+            dict: Scraped item.
+        """
+        _settings = self._get_settings(
+            itemcount=n, timeout=timeout, settings=settings)
+        # Items are saved here as they are yielded, so that the same items
+        # are saved when the consumer stops early
+        feeds = {}
+        if settings is None or 'FEEDS' not in settings:
+            feeds, _settings['FEEDS'] = _settings['FEEDS'], {}
+        feed_writer = _FeedWriter(feeds, _settings)
+        items = _iter_as_process(
+            func=_run_spiders_func,
+            crawls=[(self.spider_cls, self.spider_params, _settings)],
+            settings=_settings
+        )
+        try:
+            with closing(feed_writer), closing(items):
+                for item in items:
+                    feed_writer.export_item(item)
+                    yield item
+        except KeyboardInterrupt:
+            pass
+
+    def _iter_jsonlines_paths(self):
+        for items_format in ('jsonlines', 'jsonlines.gz', 'jsonlines.zst'):
+            path = self._items_save_paths[items_format]
+            if path.exists():
+                yield path
+
+    def _iter_items(self, columns=None):
+        parquet_path = self._items_save_paths['parquet']
+        for jsonlines_path in self._iter_jsonlines_paths():
+            yield from iter_jsonlines(jsonlines_path, columns=columns)
+        if parquet_path.exists():
+            yield from iter_parquet_items(parquet_path, columns=columns)
+
+    def _iter_dfs(self, chunksize, columns=None):
+        parquet_path = self._items_save_paths['parquet']
+        for jsonlines_path in self._iter_jsonlines_paths():
+            items = iter_jsonlines(jsonlines_path, columns=columns)
+            for chunk in iter_chunks(items, chunksize):
+                yield pd.DataFrame(chunk, columns=columns)
+        if parquet_path.exists():
+            yield from iter_parquet(
+                parquet_path, columns=columns, chunksize=chunksize)
+
+    def _read_df(self, columns=None, n_jobs=1):
+        parquet_path = self._items_save_paths['parquet']
+        dfs = []
+        for jsonlines_path in self._iter_jsonlines_paths():
+            fields = self.item_cls.fields if self.item_cls else None
+            dfs.append(read_jsonlines(
+                jsonlines_path, fields=fields, columns=columns, n_jobs=n_jobs))
+        if parquet_path.exists():
+            dfs.append(read_parquet(parquet_path, columns=columns))
+        if len(dfs) == 0:
+            return pd.DataFrame(columns=columns)
+        elif len(dfs) == 1:
+            return dfs[0]
+        return pd.concat(dfs, ignore_index=True)
+
+    def get(self, fmt='df', chunksize=None, lazy=False, columns=None,
+            n_jobs=1):
         """Return scraped data as DataFrame or list.
 
         Args:
             fmt (str, optional): Format to return parsed items as. Should be
                 in ['df', 'list']. Defaults to 'df'.
+            chunksize (int or None, optional): If given, return a generator
+                of DataFrames or lists with at most ``chunksize`` items each,
+                so that all items are never loaded into memory at once.
+                Defaults to None.
+            lazy (bool, optional): Whether to return a generator of items
+                instead of a list, when ``fmt = 'list'``. Defaults to False.
+            columns (list of str or None, optional): Fields to return. Other
+                fields are dropped as soon as an item is read. Defaults to
+                None, which returns all fields. With Parquet, only these
+                columns are read from disk.
+            n_jobs (int, optional): Number of processes to decode JSON lines
+                with, when ``fmt = 'df'`` and ``chunksize`` is not given.
+                Defaults to 1.
 
         Returns:
             If ``fmt = 'df'``, DataFrame of scraped items.
             If ``fmt = 'list'``, list of dict of scraped items.
+            If ``lazy = True``, generator of dict of scraped items.
+            If ``chunksize`` is given, generator of the above.
 
         Raises:
-            ValueError: If ``fmt`` not in allowed values.
+            ValueError: If ``fmt`` not in allowed values, or ``lazy`` is used
+                together with ``fmt = 'df'`` or ``chunksize``.
         """
         if fmt not in ['df', 'list']:
-            ValueError(f'Format {fmt} should be in ["df", "list"]')
-        jsonlines = []
-        if self._items_save_path.exists():
-            with open(self.items_save_path, 'r') as f:
-                for line in f:
-                    jsonlines.append(json.loads(line))
-        if fmt == 'list':
-            return jsonlines
-        elif fmt == 'df':
-            return pd.DataFrame(jsonlines)
+            raise ValueError(f'Format {fmt} should be in ["df", "list"]')
+        if lazy and (fmt == 'df' or chunksize is not None):
+            raise ValueError(
+                'Lazy loading is supported only with fmt="list" and without '
+                'chunksize')
+
+        if fmt == 'df':
+            if chunksize is not None:
+                return self._iter_dfs(chunksize, columns=columns)
+            return self._read_df(columns=columns, n_jobs=n_jobs)
+
+        items = self._iter_items(columns=columns)
+        if chunksize is not None:
+            return iter_chunks(items, chunksize)
+        elif lazy:
+            return items
+        return list(items)
 
     def save(self):
         """Save spider in ``jobdir`` for later use.
@@ -306,7 +901,8 @@ class _SpiderWrapper:
         Returns:
             str: Path to job directory.
         """
-        save_tuple = (self.spider_cls, self.spider_params, self.jobdir)
+        save_tuple = (self.spider_cls, self.spider_params, self.jobdir,
+                      self.items_format)
         with open(self.spider_save_path, 'wb') as f:
             pickle.dump(save_tuple, f)
         self._finalizer.detach()
@@ -324,11 +920,58 @@ class _SpiderWrapper:
         """
         expected_path = Path(jobdir) / 'spider.pkl'
         with open(expected_path, 'rb') as f:
-            (spider_cls, spider_params, jobdir) = pickle.load(f)
-        return cls(jobdir=jobdir, **spider_params)
+            save_tuple = pickle.load(f)
+        (spider_cls, spider_params, jobdir) = save_tuple[:3]
+        # Spiders saved by earlier versions do not have items format
+        items_format = save_tuple[3] if len(save_tuple) > 3 else 'jsonlines'
+        return cls(jobdir=jobdir, items_format=items_format, **spider_params)
 
     def clear(self):
         """Clear contents of ``jobdir``."""
         if self._jobdir.exists():
             shutil.rmtree(self._jobdir)
         self._jobdir.mkdir(parents=True, exist_ok=True)
+
+
+def run_many(spiders, n=10, timeout=60, settings=None):
+    """Scrape items with many spiders concurrently.
+
+    All spiders are run within one process and one Scrapy crawler runner,
+    so that independent websites are downloaded in parallel. Items of each
+    spider are saved into its own ``jobdir``. Progress bars are not
+    displayed, and logging follows the ``log_level`` of the first spider.
+
+    Args:
+        spiders (list): Spiders to run, e.g.
+            ``[ISArticle(), ILArticle(), YLEArticle()]``.
+        n (int, optional): Number of items to attempt to scrape per spider.
+            Zero corresponds to no limit. Defaults to 10.
+        timeout (int, optional): Timeout in seconds to wait before stopping
+            the spiders. Zero corresponds to no limit. Defaults to 60.
+        settings (dict or None, optional): Scrapy spider settings to use for
+            all the spiders. Defaults to None, which correspond to default
+            settings. See list of available settings at:
+            https://docs.scrapy.org/en/latest/topics/settings.html.
+
+    Returns:
+        list: Given spiders.
+    """
+    if len(spiders) == 0:
+        return spiders
+
+    crawls = []
+    for spider in spiders:
+        _settings = spider._get_settings(
+            itemcount=n, timeout=timeout, settings=settings)
+        _settings['PROGRESS_BAR_ENABLED'] = False
+        crawls.append((spider.spider_cls, spider.spider_params, _settings))
+
+    try:
+        _run_as_process(
+            func=_run_spiders_func,
+            crawls=crawls,
+            settings=crawls[0][2]
+        )
+    except KeyboardInterrupt:
+        pass
+    return spiders
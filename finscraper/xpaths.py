@@ -0,0 +1,173 @@
+"""Module for XPath expressions compiled once per spider."""
+
+
+import logging
+
+from types import SimpleNamespace
+
+from lxml import etree
+from parsel import Selector, SelectorList
+from scrapy.loader import ItemLoader as _ItemLoader
+
+
+logger = logging.getLogger(__name__)
+
+NAMESPACES = {
+    're': 'http://exslt.org/regular-expressions',
+    'set': 'http://exslt.org/sets'
+}
+
+
+def _to_string(result):
+    if isinstance(result, str):
+        return result
+    if isinstance(result, bool):
+        return '1' if result else '0'
+    if isinstance(result, float):
+        return str(result)
+    return etree.tostring(result, method='html', encoding='unicode',
+                          with_tail=False)
+
+
+def _get_roots(selector):
+    if isinstance(selector, etree._Element):
+        return [selector]
+    if isinstance(selector, SelectorList):
+        return [sel.root for sel in selector]
+    if isinstance(selector, Selector):
+        return [selector.root]
+    return [selector.selector.root]  # Response
+
+
+class CompiledXPath:
+    """XPath expression compiled into ``lxml.etree.XPath``.
+
+    Evaluates the expression directly on the lxml tree of a selector,
+    without parsing the expression again. Results are the same as with
+    ``Selector.xpath``.
+
+    Args:
+        expression (str): XPath expression.
+    """
+
+    def __init__(self, expression):
+        self.expression = expression
+        self._xpath = etree.XPath(expression, namespaces=NAMESPACES,
+                                  smart_strings=False)
+
+    def __call__(self, selector):
+        """Evaluate into a list of lxml elements, strings or numbers.
+
+        Args:
+            selector (parsel.Selector, parsel.SelectorList,
+                scrapy.http.TextResponse or lxml.etree._Element): Context
+                to evaluate in.
+
+        Returns:
+            list
+        """
+        results = []
+        for root in _get_roots(selector):
+            if not isinstance(root, etree._Element):
+                continue  # Text results, as with ``Selector.xpath``
+            try:
+                result = self._xpath(root)
+            except TypeError as e:
+                logger.debug(f'Skipped {root!r} in {self!r}: {e}')
+                continue
+            if isinstance(result, list):
+                results.extend(result)
+            else:
+                results.append(result)
+        return results
+
+    def getall(self, selector):
+        """Evaluate into a list of strings, as ``SelectorList.getall``."""
+        return [_to_string(result) for result in self(selector)]
+
+    def get(self, selector, default=None):
+        """Evaluate into the first string, as ``SelectorList.get``."""
+        results = self(selector)
+        return _to_string(results[0]) if results else default
+
+    def select(self, selector):
+        """Evaluate into selectors, as ``Selector.xpath``."""
+        return SelectorList(
+            Selector(root=result, type='html')
+            for result in self(selector))
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.expression!r})'
+
+    def __str__(self):
+        return self.expression
+
+
+def compile_xpaths(**expressions):
+    """Compile XPath expressions of a spider.
+
+    Meant to be called at class definition time, so that every expression
+    is compiled only once.
+
+    Args:
+        **expressions: Names and XPath expressions.
+
+    Returns:
+        types.SimpleNamespace: ``CompiledXPath`` by name.
+    """
+    return SimpleNamespace(**{name: CompiledXPath(expression)
+                              for name, expression in expressions.items()})
+
+
+def extract_texts(xpath, selector):
+    """Extract text content of elements, including their descendants.
+
+    Same as joining ``.//text()`` of each element, but without serializing
+    and parsing the elements again.
+
+    Args:
+        xpath (CompiledXPath): Expression of the elements, e.g. paragraphs.
+        selector: Context to evaluate ``xpath`` in.
+
+    Returns:
+        list of str: Text by element.
+    """
+    return [''.join(element.itertext()) for element in xpath(selector)]
+
+
+def extract_metadata(xpath, selector, **fields):
+    """Extract fields of elements into dictionaries.
+
+    Args:
+        xpath (CompiledXPath): Expression of the elements, e.g. images.
+        selector: Context to evaluate ``xpath`` in.
+        **fields (callable): Functions that take an element and return the
+            value of a field, such as ``CompiledXPath.get`` of a relative
+            expression.
+
+    Returns:
+        list of dict: Fields by element.
+
+    Example:
+        >>> extract_metadata(xpaths.images, response,
+        ...                  src=xpaths.image_src.get,
+        ...                  caption=xpaths.image_caption.getall)
+    """
+    return [{name: func(element) for name, func in fields.items()}
+            for element in xpath(selector)]
+
+
+class ItemLoader(_ItemLoader):
+    """Item loader that accepts ``CompiledXPath`` in place of XPaths."""
+
+    def _get_xpathvalues(self, xpaths, **kw):
+        if isinstance(xpaths, CompiledXPath):
+            self._check_selector_method()
+            return xpaths.getall(self.selector)
+        return super(ItemLoader, self)._get_xpathvalues(xpaths, **kw)
+
+    def nested_xpath(self, xpath, **context):
+        if isinstance(xpath, CompiledXPath):
+            context.update(selector=xpath.select(self.selector))
+            return self.__class__(item=self.item, parent=self, **context)
+        return super(ItemLoader, self).nested_xpath(xpath, **context)
@@ -0,0 +1,12 @@
+"""Module for fixtures shared by the tests."""
+
+
+import pytest
+
+from tests.utils import PageHandler, serve
+
+
+@pytest.fixture
+def pages_server():
+    with serve(PageHandler) as url:
+        yield url
@@ -0,0 +1,136 @@
+"""Module for testing filtering of duplicate requests."""
+
+
+import tracemalloc
+
+import pytest
+
+from scrapy import Request, Spider
+from scrapy.dupefilters import RFPDupeFilter
+from scrapy.utils.test import get_crawler
+
+from finscraper.dupefilters import BloomDupeFilter, ScalableBloomFilter, \
+    URLHashSet
+
+
+def get_dupefilter(tmp_path, dupefilter_cls=RFPDupeFilter, **settings):
+    crawler = get_crawler(Spider, {'JOBDIR': str(tmp_path), **settings})
+    crawler.spider = crawler._create_spider('test')
+    return dupefilter_cls.from_crawler(crawler), crawler.spider
+
+
+def test_url_hash_set():
+    url_hashes = URLHashSet(max_size=4)
+    for i in range(3):
+        url_hashes.add(f'https://example.fi/{i}')
+    assert all(f'https://example.fi/{i}' in url_hashes for i in range(3))
+    assert len(url_hashes) == 3
+
+    # Older half is forgotten when full
+    url_hashes.add('https://example.fi/3')
+    assert 'https://example.fi/0' not in url_hashes
+    assert 'https://example.fi/1' not in url_hashes
+    assert 'https://example.fi/3' in url_hashes
+    assert len(url_hashes) == 2
+
+    url_hashes = URLHashSet(max_size=0)
+    url_hashes.add('https://example.fi/')
+    assert 'https://example.fi/' not in url_hashes
+
+
+def test_url_hash_set_canonical():
+    url_hashes = URLHashSet()
+    url_hashes.add('https://example.fi/?b=1&a=2')
+    assert 'https://example.fi/?a=2&b=1' in url_hashes
+    assert 'https://example.fi/?a=2' not in url_hashes
+    assert len(url_hashes) == 1
+
+
+def test_url_hash_set_memory():
+    url_hashes = URLHashSet(max_size=1000)
+    size = url_hashes._hashes.buffer_info()[1] * 2
+    for i in range(10000):
+        url_hashes.add(f'https://example.fi/{i}')
+        assert len(url_hashes) <= 1000
+    assert f'https://example.fi/{i}' in url_hashes
+    assert url_hashes._hashes.buffer_info()[1] * 2 == size == 2048
+
+
+def test_scalable_bloom_filter(tmp_path):
+    path = str(tmp_path / 'requests.bloom')
+    bloom = ScalableBloomFilter(path, capacity=1000, error_rate=0.01)
+    keys = [str(i).encode() for i in range(5000)]
+    n_false = sum(bloom.add(key) for key in keys)
+    assert len(bloom.filters) == 3  # 1000 + 2000 + 4000 keys
+    assert len(bloom) == len(keys) - n_false
+    assert n_false <= 50
+    assert all(key in bloom for key in keys)
+    bloom.close()
+
+    # Filters are opened from the files as they are
+    bloom = ScalableBloomFilter(path, capacity=1000, error_rate=0.01)
+    assert len(bloom.filters) == 3
+    assert len(bloom) == len(keys) - n_false
+    assert all(bloom.add(key) for key in keys)
+    n_false = sum(str(i).encode() in bloom for i in range(5000, 25000))
+    assert n_false <= 200
+    bloom.close()
+
+    with pytest.raises(ValueError):
+        ScalableBloomFilter(error_rate=1)
+
+
+def test_bloom_dupefilter(tmp_path):
+    dupefilter, spider = get_dupefilter(
+        tmp_path, BloomDupeFilter, DUPEFILTER_BLOOM_CAPACITY=10)
+    for url in ['https://example.fi/a', 'https://example.fi/?b=1&a=2']:
+        assert not dupefilter.request_seen(Request(url))
+    assert dupefilter.request_seen(Request('https://example.fi/?a=2&b=1'))
+    assert not dupefilter.request_seen(
+        Request('https://example.fi/a', method='POST', body='a'))
+    assert dupefilter.bloom.filters[0].capacity == 10
+    dupefilter.close('finished')
+    assert not (tmp_path / 'requests.seen').exists()
+    assert not dupefilter.fingerprints
+
+    # Resumed from the filter in jobdir
+    dupefilter, spider = get_dupefilter(tmp_path, BloomDupeFilter)
+    assert dupefilter.request_seen(Request('https://example.fi/a'))
+    assert dupefilter.request_seen(
+        Request('https://example.fi/a', method='POST', body='a'))
+    assert not dupefilter.request_seen(Request('https://example.fi/c'))
+    dupefilter.close('finished')
+
+
+def test_bloom_dupefilter_requests_seen(tmp_path):
+    dupefilter, spider = get_dupefilter(tmp_path)
+    dupefilter.request_seen(Request('https://example.fi/a'))
+    dupefilter.close('finished')
+
+    # Fingerprints of an existing job are kept
+    dupefilter, spider = get_dupefilter(tmp_path, BloomDupeFilter)
+    assert dupefilter.request_seen(Request('https://example.fi/a'))
+    dupefilter.close('finished')
+
+    dupefilter = BloomDupeFilter()
+    assert not dupefilter.request_seen(Request('https://example.fi/a'))
+    assert dupefilter.request_seen(Request('https://example.fi/a'))
+    dupefilter.close('finished')
+
+
+def test_bloom_dupefilter_memory(tmp_path):
+    dupefilter, spider = get_dupefilter(
+        tmp_path, BloomDupeFilter, DUPEFILTER_BLOOM_CAPACITY=200000)
+    dupefilter.request_seen(Request('https://example.fi/'))
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        for i in range(20000):
+            dupefilter.request_seen(Request(f'https://example.fi/{i}'))
+        end, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        dupefilter.close('finished')
+
+    # Nothing is kept in memory per request
+    assert end - start < 256 * 1024
@@ -0,0 +1,122 @@
+"""Module for testing the shared crawl frontier."""
+
+
+import time
+
+from types import SimpleNamespace
+
+from scrapy import Request, Spider
+from scrapy.http import HtmlResponse
+
+from finscraper.frontier import FrontierMiddleware, SQLiteDupeFilter, \
+    SQLiteRequestQueue, connect
+
+
+def get_queue(path, spider, lease_timeout=600):
+    return SQLiteRequestQueue(connect(path), spider,
+                              lease_timeout=lease_timeout)
+
+
+def test_sqlite_request_queue(tmp_path):
+    path = str(tmp_path / 'frontier.sqlite')
+    spider = Spider('test')
+    queue1 = get_queue(path, spider)
+    queue2 = get_queue(path, spider)
+    for i, priority in enumerate([0, 10, 0]):
+        queue1.push(Request(f'https://example.fi/{i}', priority=priority))
+    assert len(queue1) == len(queue2) == 3
+
+    # Requests are claimed once, in the order of priority
+    request = queue2.pop()
+    assert request.url == 'https://example.fi/1'
+    assert queue1.pop().url == 'https://example.fi/0'
+    assert len(queue1) == len(queue2) == 1
+    assert queue1.claimed_by_others() == 1
+    assert queue2.claimed_by_others() == 1
+
+    # Downloaded requests are removed, others are released when closing
+    queue2.done(request.meta[SQLiteRequestQueue.meta_key])
+    assert queue1.claimed_by_others() == 0
+    queue1.close()
+    assert len(queue2) == 2
+    requests = [queue2.pop(), queue2.pop()]
+    assert [request.url for request in requests] == [
+        'https://example.fi/0', 'https://example.fi/2']
+    assert queue2.pop() is None
+
+    # Retried requests replace their claimed rows
+    queue2.push(requests[0].replace(dont_filter=True))
+    assert len(queue2) == 1
+    assert queue2.conn.execute(
+        'SELECT COUNT(*) FROM requests').fetchone()[0] == 2
+    queue2.close()
+
+
+def test_sqlite_request_queue_lease(tmp_path):
+    path = str(tmp_path / 'frontier.sqlite')
+    spider = Spider('test')
+    queue1 = get_queue(path, spider)
+    queue1.push(Request('https://example.fi/'))
+    assert queue1.pop() is not None
+
+    # Claims of a process that died are released after the lease
+    queue2 = get_queue(path, spider, lease_timeout=600)
+    assert len(queue2) == 0
+    assert queue2.pop() is None
+    assert queue2.claimed_by_others() == 1
+    queue1.conn.execute('UPDATE requests SET claimed_at = ?',
+                        (time.time() - 10,))
+    queue3 = get_queue(path, spider, lease_timeout=5)
+    assert queue3.claimed_by_others() == 0
+    assert queue3.pop().url == 'https://example.fi/'
+    for queue in (queue1, queue2, queue3):
+        queue.conn.close()
+
+
+def test_frontier_middleware(tmp_path):
+    spider = Spider('test')
+    queue = get_queue(str(tmp_path / 'frontier.sqlite'), spider)
+    queue.push(Request('https://example.fi/'))
+    request = queue.pop()
+    response = HtmlResponse(request.url, body=b'<html></html>',
+                            request=request)
+    scheduler = SimpleNamespace(done=queue.done)
+    crawler = SimpleNamespace(
+        engine=SimpleNamespace(slot=SimpleNamespace(scheduler=scheduler)))
+    middleware = FrontierMiddleware(crawler)
+
+    def count():
+        return queue.conn.execute(
+            'SELECT COUNT(*) FROM requests').fetchone()[0]
+
+    # Requests that copy the meta of their response get rows of their own
+    middleware.process_spider_input(response, spider)
+    child = Request('https://example.fi/child', meta=response.meta)
+    assert SQLiteRequestQueue.meta_key not in child.meta
+    queue.push(child)
+    assert count() == 2
+
+    # Row of the response is removed once the spider has processed it
+    list(middleware.process_spider_output(response, [child], spider))
+    assert count() == 1
+    assert queue.pop().url == 'https://example.fi/child'
+    queue.close()
+
+
+def test_sqlite_dupefilter(tmp_path):
+    path = str(tmp_path / 'frontier.sqlite')
+    dupefilter1 = SQLiteDupeFilter(path)
+    dupefilter2 = SQLiteDupeFilter(path)
+
+    # Requests are seen by all connections to the database
+    assert not dupefilter1.request_seen(Request('https://example.fi/a'))
+    assert dupefilter2.request_seen(Request('https://example.fi/a'))
+    assert dupefilter1.request_seen(Request('https://example.fi/a'))
+    assert not dupefilter2.request_seen(Request('https://example.fi/b'))
+    assert dupefilter1.request_seen(Request('https://example.fi/b'))
+    dupefilter1.close('finished')
+    dupefilter2.close('finished')
+
+    dupefilter = SQLiteDupeFilter(path)
+    assert dupefilter.request_seen(Request('https://example.fi/b'))
+    dupefilter.close('finished')
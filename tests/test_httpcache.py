@@ -0,0 +1,100 @@
+"""Module for testing caching of HTTP responses."""
+
+
+import gzip
+import os
+
+import pytest
+
+from scrapy import Spider
+from scrapy.downloadermiddlewares.httpcache import HttpCacheMiddleware
+from scrapy.http import HtmlResponse, Request
+from scrapy.utils.test import get_crawler
+
+
+@pytest.fixture
+def get_middleware(tmp_path):
+    def _get_middleware(**settings):
+        crawler = get_crawler(Spider, {
+            'HTTPCACHE_ENABLED': True,
+            'HTTPCACHE_POLICY': 'finscraper.httpcache.ConditionalPolicy',
+            'HTTPCACHE_STORAGE': 'finscraper.httpcache.LRUCacheStorage',
+            'JOBDIR': str(tmp_path),
+            **settings
+        })
+        spider = crawler._create_spider('test')
+        middleware = HttpCacheMiddleware.from_crawler(crawler)
+        middleware.spider_opened(spider)
+        return middleware, spider
+    return _get_middleware
+
+
+def fetch(middleware, spider, url, status=200, body=b'', headers=None):
+    request = Request(url)
+    response = middleware.process_request(request, spider)
+    if response is not None:
+        return request, response
+    response = HtmlResponse(url, status=status, body=body, headers=headers,
+                            request=request)
+    return request, middleware.process_response(request, response, spider)
+
+
+def test_conditional_policy(get_middleware, tmp_path):
+    middleware, spider = get_middleware()
+    stats = spider.crawler.stats
+    url = 'https://example.fi/'
+
+    # Response with a validator is stored compressed into the jobdir
+    _, response = fetch(middleware, spider, url, body=b'<p>Uutiset</p>',
+                        headers={'ETag': '"v1"'})
+    assert stats.get_value('httpcache/store') == 1
+    cachedir = tmp_path / 'httpcache' / 'test'
+    (body_path,) = cachedir.glob('*/*/response_body')
+    assert gzip.decompress(body_path.read_bytes()) == b'<p>Uutiset</p>'
+
+    # Cached response is validated, and used if it has not been modified
+    request, response = fetch(middleware, spider, url, status=304)
+    assert request.headers['If-None-Match'] == b'"v1"'
+    assert response.status == 200
+    assert response.body == b'<p>Uutiset</p>'
+    assert stats.get_value('httpcache/revalidate') == 1
+
+    # Modified response replaces the cached one
+    _, response = fetch(middleware, spider, url, body=b'<p>Uudet</p>',
+                        headers={'ETag': '"v2"'})
+    assert response.body == b'<p>Uudet</p>'
+    request, _ = fetch(middleware, spider, url, status=304)
+    assert request.headers['If-None-Match'] == b'"v2"'
+
+    # Responses that cannot be validated are not stored
+    fetch(middleware, spider, 'https://example.fi/other', body=b'<p></p>')
+    assert stats.get_value('httpcache/uncacheable') == 1
+
+
+def test_lru_cache_storage(get_middleware):
+    body = os.urandom(10000)  # Does not compress
+    middleware, spider = get_middleware(HTTPCACHE_MAX_SIZE=25000)
+    headers = {'Last-Modified': 'Tue, 18 Oct 2022 09:15:00 GMT'}
+    for page in ('a', 'b'):
+        fetch(middleware, spider, f'https://example.fi/{page}', body=body,
+              headers=headers)
+
+    # Least recently used response is removed when the cache is full
+    fetch(middleware, spider, 'https://example.fi/a', status=304)
+    fetch(middleware, spider, 'https://example.fi/c', body=body,
+          headers=headers)
+    assert spider.crawler.stats.get_value('httpcache/evict') == 1
+    storage = middleware.storage
+    assert storage.retrieve_response(
+        spider, Request('https://example.fi/b')) is None
+    for page in ('a', 'c'):
+        assert storage.retrieve_response(
+            spider, Request(f'https://example.fi/{page}')) is not None
+
+    # Cache is tracked between runs
+    middleware.spider_closed(spider)
+    middleware, spider = get_middleware(HTTPCACHE_MAX_SIZE=25000)
+    assert middleware.storage._size > 20000
+    fetch(middleware, spider, 'https://example.fi/d', body=body,
+          headers=headers)
+    assert spider.crawler.stats.get_value('httpcache/evict') == 1
@@ -0,0 +1,31 @@
+"""Module for testing Scrapy middlewares."""
+
+
+import json
+
+from tests.utils import Pages, StandInDriver
+
+
+def test_selenium_callback_middleware_pool(pages_server, tmp_path,
+                                           monkeypatch):
+    monkeypatch.setattr('finscraper.utils.get_chromedriver', StandInDriver)
+    monkeypatch.setattr(StandInDriver, 'log_path', str(tmp_path / 'log'))
+    settings = {
+        'PAGES_URL': pages_server,
+        'DOWNLOADER_MIDDLEWARES': {
+            'finscraper.middlewares.SeleniumCallbackMiddleware': 800
+        },
+        'SELENIUM_POOL_SIZE': 2
+    }
+    spider = Pages(selenium=True).scrape(20, settings=settings)
+    items = spider.get('list')
+    assert len(items) == 20
+    assert len({item['url'] for item in items}) == 20
+
+    # Drivers render in parallel, and quit outside the reactor thread
+    with open(tmp_path / 'log') as f:
+        drivers = [json.loads(line) for line in f]
+    assert len(drivers) == 2
+    assert sum(driver['n_pages'] for driver in drivers) >= 20
+    assert all(driver['max_active'] == 2 for driver in drivers)
+    assert not any(driver['in_io_thread'] for driver in drivers)
@@ -0,0 +1,217 @@
+"""Module for testing Scrapy spider mixins."""
+
+
+import pytest
+
+from scrapy import Request, Spider
+from scrapy.exceptions import DontCloseSpider
+from scrapy.http import HtmlResponse
+from scrapy.linkextractors import LinkExtractor
+from scrapy.utils.test import get_crawler
+
+from finscraper.scrapy_spiders.mixins import FollowAndParseItemMixin, \
+    URLIDScorer
+
+
+class _Engine:
+
+    def __init__(self):
+        self.requests = []
+
+    def crawl(self, request):
+        self.requests.append(request)
+
+
+class _TestSpider(FollowAndParseItemMixin, Spider):
+    name = 'test'
+    start_urls = ['https://example.fi/']
+    item_link_extractor = LinkExtractor(allow=r'/item/')
+    follow_link_extractor = LinkExtractor(allow=r'/page/')
+
+    def __init__(self, *args, **kwargs):
+        super(_TestSpider, self).__init__()
+
+    def _parse_item(self, resp):
+        return {'url': resp.url}
+
+
+def get_spider(spider_cls=_TestSpider, **settings):
+    crawler = get_crawler(spider_cls, settings)
+    spider = spider_cls.from_crawler(crawler)
+    crawler.engine = _Engine()
+    return spider
+
+
+class _ScoredSpider(_TestSpider):
+    url_scorer = URLIDScorer(r'/item/([0-9]+)')
+    url_score_levels = 4
+
+
+def get_response(url, n_items=5, n_pages=5, to_parse=False, item_ids=None):
+    item_ids = range(n_items) if item_ids is None else item_ids
+    links = ''.join(
+        [f'<a href="/item/{i}">Item</a>' for i in item_ids] +
+        [f'<a href="/page/{i}">Page</a>' for i in range(n_pages)])
+    request = Request(url, cb_kwargs={'to_parse': to_parse})
+    return HtmlResponse(url, body=f'<html>{links}</html>'.encode('utf-8'),
+                        encoding='utf-8', request=request)
+
+
+def parse(spider, response):
+    to_parse = response.request.cb_kwargs['to_parse']
+    output = list(spider.parse(response, to_parse=to_parse))
+    return [request for request in output if isinstance(request, Request)]
+
+
+def test_item_budget():
+    spider = get_spider(CLOSESPIDER_ITEMCOUNT=3)
+    requests = parse(spider, get_response('https://example.fi/'))
+
+    # Only enough item requests are scheduled, and no follow requests
+    assert [request.url for request in requests] == [
+        'https://example.fi/item/0', 'https://example.fi/item/1',
+        'https://example.fi/item/2']
+    assert all(request.errback is not None for request in requests)
+
+    # Item that was parsed does not open the budget again
+    parse(spider, get_response('https://example.fi/item/0', to_parse=True))
+    assert spider.itemcount == 1
+    assert spider._get_item_budget() == 0
+
+    # Failed items are replaced by deferred ones when idle
+    requests[1].errback(None)
+    with pytest.raises(DontCloseSpider):
+        spider._release_deferred(spider)
+    engine = spider.crawler.engine
+    assert [request.url for request in engine.requests] == [
+        'https://example.fi/item/3', 'https://example.fi/item/4']
+
+
+def test_item_budget_follow():
+    spider = get_spider(CLOSESPIDER_ITEMCOUNT=10)
+    requests = parse(spider, get_response('https://example.fi/', n_items=2))
+    assert len(requests) == 7  # Follow links while items are needed
+
+    # Deferred pages are followed when items run out
+    spider = get_spider(CLOSESPIDER_ITEMCOUNT=2)
+    parse(spider, get_response('https://example.fi/', n_items=2))
+    spider.itemcount = 1  # The other item was not found
+    with pytest.raises(DontCloseSpider):
+        spider._release_deferred(spider)
+    assert [request.url for request in spider.crawler.engine.requests] == [
+        'https://example.fi/page/0']
+
+
+def test_item_budget_unlimited():
+    spider = get_spider(CLOSESPIDER_ITEMCOUNT=0)
+    assert len(parse(spider, get_response('https://example.fi/'))) == 10
+    spider._release_deferred(spider)
+
+
+def test_item_budget_state():
+    spider = get_spider(CLOSESPIDER_ITEMCOUNT=1)
+    spider.state = {}
+    parse(spider, get_response('https://example.fi/', n_items=2, n_pages=1))
+    assert spider.state['deferred_urls'] == {
+        'https://example.fi/item/1': True,
+        'https://example.fi/page/0': False
+    }
+
+    # Deferred requests are requested when scraping continues
+    spider = get_spider(CLOSESPIDER_ITEMCOUNT=5)
+    spider.state = {'deferred_urls': {'https://example.fi/item/1': True,
+                                      'https://example.fi/page/0': False}}
+    requests = list(spider.start_requests())
+    assert [(request.url, request.cb_kwargs.get('to_parse'))
+            for request in requests] == [
+        ('https://example.fi/', None),
+        ('https://example.fi/item/1', True),
+        ('https://example.fi/page/0', False)]
+    assert spider.state == {}
+
+
+def test_item_budget_deferred_bounded():
+    spider = get_spider(_ScoredSpider, CLOSESPIDER_ITEMCOUNT=1)
+    spider.state = {}
+    spider.deferred_factor = 2
+    parse(spider, get_response('https://example.fi/', n_items=0, n_pages=1,
+                               item_ids=[1, 30, 28, 3, 29, 2]))
+
+    # Only the items with the highest priority are kept deferred
+    items, _ = spider._deferred[0]
+    assert sorted(items) == [
+        'https://example.fi/item/28', 'https://example.fi/item/29']
+    assert spider.state['deferred_urls'] == {
+        'https://example.fi/item/28': True,
+        'https://example.fi/item/29': True,
+        'https://example.fi/page/0': False
+    }
+
+    # Only the scheduled links are remembered, dropped ones can be requested
+    assert 'https://example.fi/item/30' in spider.url_hashes
+    assert 'https://example.fi/item/28' not in spider.url_hashes
+    assert 'https://example.fi/item/1' not in spider.url_hashes
+
+    spider.itemcount = 0
+    spider._pending_itemcount = 0
+    with pytest.raises(DontCloseSpider):
+        spider._release_deferred(spider)
+    assert [request.url for request in spider.crawler.engine.requests] == [
+        'https://example.fi/item/29']
+    assert spider.state['deferred_urls'] == {
+        'https://example.fi/item/28': True,
+        'https://example.fi/page/0': False
+    }
+
+
+def test_requested_links():
+    spider = get_spider()
+    for url in ['https://example.fi/item/1', 'https://example.fi/page/0']:
+        spider.url_hashes.add(url)
+    requests = parse(spider, get_response(
+        'https://example.fi/', n_items=2, n_pages=2))
+
+    # Requested links are skipped before creating requests
+    assert [request.url for request in requests] == [
+        'https://example.fi/item/0', 'https://example.fi/page/1']
+    assert spider.crawler.stats.get_value(
+        'dupefilter/url_hashes_skipped') == 2
+
+    # Links are remembered once requested
+    assert parse(spider, get_response(
+        'https://example.fi/page/1', n_items=2, n_pages=2)) == []
+
+    spider = get_spider(DUPEFILTER_URL_HASHES_MAX_SIZE=0)
+    parse(spider, get_response('https://example.fi/'))
+    assert len(parse(spider, get_response('https://example.fi/'))) == 10
+
+
+def test_url_scorer():
+    spider = get_spider(_ScoredSpider, CLOSESPIDER_ITEMCOUNT=2)
+    requests = parse(spider, get_response(
+        'https://example.fi/', item_ids=[1, 30, 28, 3, 29]))
+
+    # Freshest items are requested first and with a higher priority
+    assert [(request.url, request.priority) for request in requests] == [
+        ('https://example.fi/item/30', 24), ('https://example.fi/item/29', 23)]
+
+    # Deferred items are released in the order of their priority
+    spider.itemcount = 1
+    with pytest.raises(DontCloseSpider):
+        spider._release_deferred(spider)
+    assert [request.url for request in spider.crawler.engine.requests] == [
+        'https://example.fi/item/28']
+    assert spider._get_request('https://example.fi/item/1', True).priority \
+        == 20
+
+
+def test_url_scorer_called_once():
+    spider = get_spider(_ScoredSpider)
+    scored = []
+    scorer = spider.url_scorer
+    spider.url_scorer = lambda url: scored.append(url) or scorer(url)
+    parse(spider, get_response('https://example.fi/', item_ids=[1, 30, 28]))
+
+    # Each item link is scored once
+    assert sorted(scored) == [f'https://example.fi/item/{i}'
+                              for i in [1, 28, 30]]
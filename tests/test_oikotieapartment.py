@@ -0,0 +1,103 @@
+"""Module for testing OikotieApartment against a local stand-in server."""
+
+
+from pathlib import Path
+
+import pytest
+
+from scrapy.http import HtmlResponse, Request
+
+from finscraper.scrapy_spiders.oikotieapartment import \
+    _OikotieApartmentSpider
+from finscraper.spiders import OikotieApartment
+from tests.utils import OikotieHandler, StandInCrawler, serve
+
+
+DATA_DIR = Path(__file__).parent / 'data' / 'oikotie'
+
+
+@pytest.fixture
+def spider():
+    spider = _OikotieApartmentSpider()
+    spider.crawler = StandInCrawler()
+    return spider
+
+
+@pytest.fixture
+def oikotie_server():
+    with serve(OikotieHandler) as url:
+        yield url
+
+
+def test_api_discovery(oikotie_server):
+    settings = {'OIKOTIE_BASE_URL': oikotie_server}
+    spider = OikotieApartment(progress_bar=False).scrape(
+        30, timeout=30, settings=settings)
+    df = spider.get()
+    assert len(df) == 30
+    assert df['url'].str.startswith(oikotie_server).all()
+    assert df['url'].is_unique
+    assert (df['city'] == 'Helsinki').all()
+    assert (df['price_no_tax'] == '249 000 €').all()
+
+
+def test_seen_items(oikotie_server, tmp_path):
+    settings = {'OIKOTIE_BASE_URL': oikotie_server,
+                'SEEN_INDEX_PATH': str(tmp_path / 'seen.sqlite')}
+    df = OikotieApartment(progress_bar=False).scrape(
+        10, timeout=30, settings=settings).get()
+    assert len(df) >= 10
+
+    # Listings scraped in the first run are skipped
+    df2 = OikotieApartment(progress_bar=False).scrape(
+        0, timeout=30, settings=settings).get()
+    assert len(df) + len(df2) == 30
+    assert set(df['url']).isdisjoint(df2['url'])
+
+
+def test_item_budget(oikotie_server, monkeypatch):
+    monkeypatch.setattr(OikotieHandler, 'paths', [])
+    monkeypatch.setattr(OikotieHandler, 'failing_listings',
+                        ('17000001', '17000003'))
+    settings = {'OIKOTIE_BASE_URL': oikotie_server}
+    df = OikotieApartment(progress_bar=False).scrape(
+        5, timeout=30, settings=settings).get()
+    assert len(df) == 5
+
+    # Only enough listings are requested, and failed ones are replaced
+    listing_paths = [path for path in OikotieHandler.paths
+                     if path.startswith('/myytavat-asunnot/')]
+    assert len(listing_paths) == 7
+    assert OikotieHandler.paths.count('/api/cards') == 1
+
+
+def test_api_fallback_to_selenium(spider, monkeypatch):
+    fallback = Request('https://asunnot.oikotie.fi/myytavat-asunnot')
+    monkeypatch.setattr(spider, '_selenium_start_requests',
+                        lambda: iter([fallback]))
+
+    # Search page without API tokens
+    resp = HtmlResponse(fallback.url, body=b'<html></html>',
+                        encoding='utf-8', request=fallback)
+    assert list(spider._parse_api_tokens(resp)) == [fallback]
+
+    # Unexpected response from the API
+    request = Request(f'{fallback.url}/api/cards', meta={'offset': 0})
+    resp = HtmlResponse(request.url, body=b'<html></html>',
+                        encoding='utf-8', request=request)
+    assert list(spider._parse_api_cards(resp)) == [fallback]
+
+
+def test_parse_item_tables(spider):
+    url = 'https://asunnot.oikotie.fi/myytavat-asunnot/helsinki/17000000'
+    resp = HtmlResponse(url, body=(DATA_DIR / 'listing.html').read_bytes(),
+                        encoding='utf-8', request=Request(url))
+    item = spider._parse_item(resp)
+    assert item['location'] == 'Meriportti 1, 00980 Helsinki'
+    assert item['district'] == 'Vuosaari'
+    assert item['life_sq'] == '54 m²'
+    assert item['build_year'] == '1993'
+
+    # Titles without a field are reported
+    assert spider._unknown_titles == {'Latauspiste'}
+    assert spider.crawler.stats.values['oikotie/unknown_title_count'] == 1
@@ -0,0 +1,136 @@
+"""Module for testing parsing of spiders against saved pages."""
+
+
+import time
+
+from pathlib import Path
+
+import pytest
+
+from scrapy.http import HtmlResponse, Request
+
+from finscraper.scrapy_spiders.ilarticle import _ILArticleSpider
+from finscraper.scrapy_spiders.isarticle import _ISArticleSpider
+from finscraper.scrapy_spiders.mnetpage import _MNetPageSpider
+from finscraper.scrapy_spiders.oikotieapartment import \
+    _OikotieApartmentSpider
+from finscraper.scrapy_spiders.suomi24page import _Suomi24PageSpider
+from finscraper.scrapy_spiders.torideal import _ToriDealSpider
+from finscraper.scrapy_spiders.vauvapage import _VauvaPageSpider
+from finscraper.scrapy_spiders.ylearticle import _YLEArticleSpider
+from finscraper.xpaths import CompiledXPath
+from tests.utils import StandInCrawler
+
+
+DATA_DIR = Path(__file__).parent / 'data'
+
+# Saved page and a field that must be parsed from it, per spider
+pages = [
+    (_ISArticleSpider, 'pages/isarticle.html', 'content'),
+    (_ILArticleSpider, 'pages/ilarticle.html', 'content'),
+    (_YLEArticleSpider, 'pages/ylearticle.html', 'content'),
+    (_ToriDealSpider, 'pages/torideal.html', 'price'),
+    (_Suomi24PageSpider, 'pages/suomi24page.html', 'comments'),
+    (_VauvaPageSpider, 'pages/vauvapage.html', 'comments'),
+    (_MNetPageSpider, 'pages/mnetpage.html', 'messages'),
+    (_OikotieApartmentSpider, 'oikotie/listing.html', 'life_sq'),
+]
+
+page_cases = [
+    pytest.param(spider_cls, path, field, id=spider_cls.name)
+    for spider_cls, path, field in pages
+]
+
+
+def get_response(path):
+    url = f'https://example.fi/{Path(path).stem}'
+    return HtmlResponse(url, body=(DATA_DIR / path).read_bytes(),
+                        encoding='utf-8', request=Request(url))
+
+
+def get_spider(spider_cls):
+    spider = spider_cls()
+    spider.crawler = StandInCrawler()
+    return spider
+
+
+@pytest.mark.parametrize('spider_cls, path, field', page_cases)
+def test_parse_item(spider_cls, path, field):
+    item = get_spider(spider_cls)._parse_item(get_response(path))
+    assert item['url'].endswith(Path(path).stem)
+    assert item[field]
+
+
+def test_parse_comments():
+    # Fields of comments are taken from the comment only
+    suomi24 = get_spider(_Suomi24PageSpider)._parse_item(
+        get_response('pages/suomi24page.html'))
+    assert [c['author'] for c in suomi24['comments']] == \
+        ['kommentoija1', 'kommentoija2']
+    assert [r['author'] for r in suomi24['comments'][0]['responses']] == \
+        ['vastaaja1', 'vastaaja2']
+    assert 'responses' not in suomi24['comments'][1]
+
+    vauva = get_spider(_VauvaPageSpider)._parse_item(
+        get_response('pages/vauvapage.html'))
+    assert [(c['author'], c['upvotes'], c['downvotes'])
+            for c in vauva['comments']] == [('Äiti1', 5, 1), ('Isä2', 2, 0)]
+
+    mnet = get_spider(_MNetPageSpider)._parse_item(
+        get_response('pages/mnetpage.html'))
+    assert [m.get('quotes') for m in mnet['messages']] == \
+        [None, ['Mikä vahvistin kannattaa?']]
+
+
+def test_parse_articles():
+    # Paragraphs and images are taken from the elements they are in
+    il = get_spider(_ILArticleSpider)._parse_item(
+        get_response('pages/ilarticle.html'))
+    assert il['content'].split('\n\n') == [
+        'Säästöt koskevat kaikkia kouluja.', 'Päätös tehtiin äänin 30-21.',
+        'Säästöt alkavat ensi vuonna.']
+    assert il['images'] == [
+        {'src': 'https://img.il.fi/1.jpg', 'alt': 'Koulu',
+         'caption': ['Koulu ', 'Espoossa', '.']},
+        {'src': 'https://img.il.fi/2.jpg', 'alt': 'Valtuusto',
+         'caption': ['Valtuusto kokoontui.']}
+    ]
+
+    tori = get_spider(_ToriDealSpider)._parse_item(
+        get_response('pages/torideal.html'))
+    assert [image['title'] for image in tori['images']] == \
+        ['Kuva 1', 'Kuva 2']
+
+
+@pytest.mark.parametrize('spider_cls, path, field', page_cases)
+def test_compiled_xpaths(spider_cls, path, field):
+    resp = get_response(path)
+    for xpath in vars(spider_cls.xpaths).values():
+        assert isinstance(xpath, CompiledXPath)
+        if not xpath.expression.startswith(('/', '(')):
+            continue  # Relative to another expression
+        assert xpath.getall(resp) == resp.xpath(xpath.expression).getall()
+
+
+def test_compiled_xpath_text_results():
+    resp = get_response('pages/isarticle.html')
+    texts = resp.xpath('//h1//text()')
+    assert texts
+    assert CompiledXPath('.').getall(texts) == texts.xpath('.').getall() \
+        == []
+    assert CompiledXPath('.').getall(resp.xpath('//h1')) == \
+        resp.xpath('//h1').xpath('.').getall()
+
+
+@pytest.mark.parametrize('spider_cls, path, field', page_cases)
+@pytest.mark.xfail(reason='Benchmark')
+def test_benchmark_parse_100_items(spider_cls, path, field, capsys):
+    spider = get_spider(spider_cls)
+    resp = get_response(path)
+    start = time.perf_counter()
+    for _ in range(100):
+        spider._parse_item(resp)
+    elapsed_time = (time.perf_counter() - start) * 10
+    with capsys.disabled():
+        print(f'-- {elapsed_time:.2f} ms per item')
+    assert elapsed_time < 1
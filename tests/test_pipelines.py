@@ -0,0 +1,112 @@
+"""Module for testing Scrapy pipelines."""
+
+
+import pytest
+
+from scrapy import Field, Item, Spider
+from scrapy.exceptions import DropItem
+from scrapy.utils.test import get_crawler
+
+from finscraper.minhash import MinHashIndex, jaccard, minhash
+from finscraper.pipelines import NearDuplicatePipeline
+from finscraper.scrapy_spiders.isarticle import _ISArticleItem
+
+
+ARTICLE = (
+    'Helsingin kaupunginvaltuusto päätti keskiviikkona leikata koulujen '
+    'määrärahoja ensi vuonna. Päätös syntyi äänin 45-40 pitkän keskustelun '
+    'jälkeen. Säästöt koskevat erityisesti perusopetusta ja '
+    'varhaiskasvatusta. Opetuslautakunnan puheenjohtajan mukaan luokkakoot '
+    'kasvavat, mutta lähikouluja ei lakkauteta. Opettajien ammattijärjestö '
+    'arvosteli päätöstä jyrkästi ja vaati valtuustoa perumaan leikkaukset. '
+    'Kaupunginjohtajan mukaan talouden tasapainottaminen on välttämätöntä, '
+    'koska verotulot ovat jääneet arvioitua pienemmiksi. Leikkausten '
+    'vaikutuksia seurataan puolivuosittain, ja niistä raportoidaan '
+    'valtuustolle ensi keväänä.'
+)
+EDITED = ARTICLE.replace('keskiviikkona', 'eilen').replace(
+    'jyrkästi', 'voimakkaasti') + ' Asiasta kertoi STT.'
+OTHER = (
+    'Jalkapallon maailmanmestaruuskisat alkavat Qatarissa marraskuussa. '
+    'Suomi ei ole mukana turnauksessa tälläkään kertaa, mutta '
+    'Huuhkajat pelaavat kaksi harjoitusottelua samaan aikaan.'
+)
+
+
+class _TextItem(Item):
+    url = Field()
+    content = Field()
+
+
+def get_pipeline(tmp_path, **settings):
+    crawler = get_crawler(Spider, {
+        'NEAR_DUPLICATE_ENABLED': True,
+        'NEAR_DUPLICATE_PATH': str(tmp_path / 'near_duplicates.sqlite'),
+        **settings
+    })
+    spider = crawler._create_spider('test')
+    pipeline = NearDuplicatePipeline.from_crawler(crawler)
+    pipeline.open_spider(spider)
+    return pipeline, spider
+
+
+def test_minhash_index(tmp_path):
+    signature = minhash(ARTICLE)
+    assert jaccard(signature, minhash(EDITED)) > 0.5
+    assert jaccard(signature, minhash(OTHER)) < 0.1
+    assert minhash(' - ') is None
+
+    index = MinHashIndex(str(tmp_path / 'index.sqlite'))
+    assert index.query(signature) is None
+    signature_id = index.add(signature, 'https://example.fi/a')
+    index.add(minhash(OTHER), 'https://example.fi/b')
+    assert index.query(minhash(EDITED))[:2] == \
+        (signature_id, 'https://example.fi/a')
+    index.close()
+
+    with pytest.raises(ValueError):
+        MinHashIndex(str(tmp_path / 'index.sqlite'), num_perm=64)
+
+
+def test_near_duplicate_pipeline_tag(tmp_path):
+    pipeline, spider = get_pipeline(tmp_path)
+    items = [
+        _ISArticleItem(url='https://is.fi/a', content=ARTICLE),
+        {'url': 'https://il.fi/b', 'content': EDITED},
+        _ISArticleItem(url='https://is.fi/c', content=OTHER),
+        _ISArticleItem(url='https://is.fi/d', content=None)
+    ]
+    items = [pipeline.process_item(item, spider) for item in items]
+    assert [item['cluster_id'] for item in items] == [1, 1, 2, None]
+    assert items[0]['url'] == 'https://is.fi/a'
+    assert spider.crawler.stats.get_value('near_duplicate/count') == 1
+    pipeline.close_spider(spider)
+
+    # Index persists between runs
+    pipeline, spider = get_pipeline(tmp_path)
+    item = {'url': 'https://yle.fi/e', 'content': EDITED}
+    assert pipeline.process_item(item, spider)['cluster_id'] == 1
+
+    # Items are not near-duplicates of themselves when scraped again
+    item = _ISArticleItem(url='https://is.fi/c?', content=OTHER + ' Päivitys')
+    assert pipeline.process_item(item, spider)['cluster_id'] == 2
+    assert spider.crawler.stats.get_value('near_duplicate/count') == 1
+
+    # Items without the field are not tagged
+    item = _TextItem(url='https://is.fi/f', content=ARTICLE)
+    assert pipeline.process_item(item, spider) is item
+    assert dict(item) == {'url': 'https://is.fi/f', 'content': ARTICLE}
+
+
+def test_near_duplicate_pipeline_drop(tmp_path):
+    pipeline, spider = get_pipeline(tmp_path, NEAR_DUPLICATE_ACTION='drop')
+    item = _ISArticleItem(url='https://is.fi/a', content=ARTICLE)
+    assert pipeline.process_item(item, spider) is item
+    with pytest.raises(DropItem):
+        pipeline.process_item(
+            {'url': 'https://il.fi/b', 'content': EDITED}, spider)
+    assert 'cluster_id' not in item
+
+    # Item scraped again is not dropped
+    item = {'url': 'https://is.fi/a', 'content': ARTICLE}
+    assert pipeline.process_item(item, spider) is item
@@ -0,0 +1,31 @@
+"""Module for testing the index of scraped items."""
+
+
+import time
+
+from finscraper.seen import SeenItemIndex
+
+
+def test_seen_item_index(tmp_path):
+    path = str(tmp_path / 'seen.sqlite')
+    index = SeenItemIndex(path, expiry=3600)
+    index.add('https://example.fi/b?y=2&x=1', 'https://example.fi/a')
+    index.add('https://example.fi/old', scraped_at=time.time() - 7200)
+    assert len(index) == 3
+
+    # URLs are canonicalized
+    assert 'https://example.fi/b?x=1&y=2' in index
+    assert 'https://example.fi/a' in index
+    assert 'https://example.fi/c' not in index
+
+    # Expired items are scraped again
+    assert 'https://example.fi/old' not in index
+    index.add('https://example.fi/old')
+    assert 'https://example.fi/old' in index
+    index.close()
+
+    # Items are seen forever by default
+    index = SeenItemIndex(path)
+    assert len(index) == 3
+    assert 'https://example.fi/b?x=1&y=2' in index
+    index.close()
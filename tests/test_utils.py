@@ -0,0 +1,94 @@
+"""Module for testing utility functions."""
+
+
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from finscraper import utils
+from finscraper.utils import file_lock, get_chromedriver_path
+
+
+def test_file_lock_stale(tmp_path):
+    path = tmp_path / 'test.lock'
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+
+    # Lock file of a process that has died is locked again
+    path.write_text(str(process.pid))
+    with file_lock(path, poll_interval=0.01):
+        assert path.read_text() == str(os.getpid())
+
+
+def test_file_lock_running(tmp_path):
+    path = tmp_path / 'test.lock'
+    code = ('import sys, time; from finscraper.utils import file_lock\n'
+            'with file_lock(sys.argv[1]):\n'
+            '    print(flush=True); time.sleep(0.5)')
+    process = subprocess.Popen([sys.executable, '-c', code, str(path)],
+                               stdout=subprocess.PIPE)
+    process.stdout.readline()
+    start = time.monotonic()
+
+    # Lock of a running process is waited for
+    with pytest.raises(TimeoutError):
+        with file_lock(path, timeout=0.1, poll_interval=0.01):
+            pass
+    with file_lock(path, poll_interval=0.01):
+        assert time.monotonic() - start >= 0.4
+    process.wait()
+
+
+def test_file_lock_exclusive(tmp_path):
+    path = tmp_path / 'test.lock'
+    active = []
+    max_active = []
+
+    def hold():
+        for _ in range(5):
+            with file_lock(path, poll_interval=0.001):
+                active.append(True)
+                max_active.append(len(active))
+                time.sleep(0.005)
+                active.pop()
+
+    # Only one holder at a time, and the file is never removed under them
+    threads = [threading.Thread(target=hold) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(max_active) == 1
+    assert len(max_active) == 20
+
+
+def test_get_chromedriver_path(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(utils, '_chrome_version', None)
+    monkeypatch.setattr(utils, '_chromedriver_paths', {})
+    monkeypatch.setattr(utils, 'get_chrome_version',
+                        lambda: calls.append('version') or '100.0')
+
+    class _Manager:
+
+        def install(self):
+            calls.append('install')
+            path = tmp_path / 'chromedriver'
+            path.touch()
+            return str(path)
+
+    monkeypatch.setattr(utils, 'ChromeDriverManager', _Manager)
+    settings = {'CHROMEDRIVER_CACHE_DIR': str(tmp_path)}
+
+    # Version and driver are looked up once per process
+    for _ in range(3):
+        path = get_chromedriver_path(settings)
+    assert path == str(tmp_path / 'chromedriver')
+    assert calls == ['version', 'install']
+
+    get_chromedriver_path(settings, refresh=True)
+    assert calls == ['version', 'install', 'version', 'install']
@@ -1,11 +1,29 @@
 """Module for testing spider wrapper functionalities."""
 
 
+import json
 import logging
+import time
 
 from pathlib import Path
 
-from finscraper.spiders import ISArticle, ILArticle
+import pandas as pd
+import pytest
+
+from scrapy import Field, Item
+from scrapy.exporters import JsonLinesItemExporter
+from scrapy.extensions.postprocessing import PostProcessingManager
+
+from finscraper import run_many
+from finscraper.exporters import ParquetItemExporter, import_pyarrow
+from finscraper.pipelines import DefaultValueNonePipeline
+from finscraper.readers import read_jsonlines
+from finscraper.spiders import ISArticle, ILArticle, Suomi24Page, \
+    YLEArticle
+from finscraper.scrapy_spiders.isarticle import _ISArticleItem
+from finscraper.wrappers import _CrawlWorker, _get_worker, _run_as_shards, \
+    stop_worker
+from tests.utils import Failing, PageHandler, Pages, exit_shard
 
 
 def test_spider_save_load_with_jobdir():
@@ -31,6 +49,13 @@ def test_spider_save_load_without_jobdir():
     assert (str(spider.jobdir) == save_jobdir == str(loaded_spider.jobdir))
 
 
+def test_spider_save_load_items_format():
+    spider = ISArticle(items_format='parquet')
+    loaded_spider = ISArticle.load(spider.save())
+    assert loaded_spider.items_format == 'parquet'
+    assert loaded_spider.items_save_path == spider.items_save_path
+
+
 def test_spider_clear():
     # Directory removed not saved and deleted
     spider = ISArticle()
@@ -103,3 +128,490 @@ def test_spider_progress_bar():
     assert len(spider.get()) > 0
 
     # TODO: Test the output
+
+
+def test_spider_iter_scrape():
+    spider = ISArticle()
+    items = list(spider.iter_scrape(2))
+    assert len(items) >= 2
+    assert all(isinstance(item, dict) for item in items)
+    assert len(spider.get('list')) == len(items)
+
+    # Stopping iteration early stops the spider
+    spider = ISArticle()
+    for item in spider.iter_scrape(10):
+        break
+    assert len(spider.get()) < 10
+
+
+@pytest.mark.parametrize('items_format',
+                         ['jsonlines', 'jsonlines.gz', 'parquet'])
+def test_spider_iter_scrape_stop(pages_server, items_format):
+    spider = Pages(items_format=items_format)
+    items = []
+    for item in spider.iter_scrape(0, settings={'PAGES_URL': pages_server}):
+        items.append(item)
+        if len(items) == 5:
+            break
+
+    # Yielded items are saved, and the spider is closed gracefully
+    assert spider.get('list') == items
+    assert (Path(spider.jobdir) / 'spider.state').exists()
+
+    items = list(spider.iter_scrape(10, settings={'PAGES_URL': pages_server}))
+    assert len(items) == 10
+    assert len(spider.get()) == 15
+
+
+def test_spider_scrape_persistent():
+    spider = ISArticle().scrape(1, persistent=True)
+    assert len(spider.get()) >= 1
+
+    # Worker process is reused between spiders
+    spider = ILArticle().scrape(1, persistent=True)
+    assert len(spider.get()) >= 1
+    spider = ILArticle().scrape(1, persistent=True)
+    assert len(spider.get()) >= 1
+
+
+def test_spider_scrape_persistent_offline(pages_server):
+    settings = {'PAGES_URL': pages_server}
+    try:
+        spider = Pages().scrape(5, settings=settings, persistent=True)
+        pid = _get_worker().process.pid
+        assert len(spider.get()) == 5
+
+        # Worker process is reused, also when continuing scraping
+        spider.scrape(5, settings=settings, persistent=True)
+        assert len(spider.get()) == 10
+        other = Pages().scrape(3, settings=settings, persistent=True)
+        assert len(other.get()) == 3
+        assert _get_worker().process.pid == pid
+
+        # Regular crawls run in their own processes alongside the worker
+        items = spider.scrape(5, settings=settings).get('list')
+        assert len(items) == 15
+        assert len({item['url'] for item in items}) == 15
+        assert _get_worker().process.pid == pid
+    finally:
+        stop_worker()
+
+
+def test_spider_scrape_persistent_errors(pages_server, monkeypatch):
+    settings = {'PAGES_URL': pages_server}
+    monkeypatch.setattr(_CrawlWorker, 'close_timeout', 0)
+    try:
+        # Errors that cannot be sent between processes are wrapped
+        with pytest.raises(RuntimeError, match='_UnpicklableError'):
+            Failing().scrape(1, persistent=True)
+        worker = _get_worker()
+
+        # Worker is restarted when a crawl does not finish in time
+        with pytest.raises(TimeoutError):
+            Failing(sleep=3).scrape(1, timeout=1, persistent=True)
+        assert not worker.is_alive()
+        spider = Pages().scrape(5, settings=settings, persistent=True)
+        assert len(spider.get()) == 5
+        worker = _get_worker()
+
+        # ... and when waiting is interrupted
+        def interrupt(self, deadline):
+            raise KeyboardInterrupt
+
+        monkeypatch.setattr(_CrawlWorker, '_wait', interrupt)
+        spider.scrape(5, settings=settings, persistent=True)
+        assert not worker.is_alive()
+    finally:
+        stop_worker()
+
+
+def test_spider_scrape_persistent_then_fork(pages_server, monkeypatch):
+    monkeypatch.setattr(PageHandler, 'n_items', 10000)
+    settings = {'PAGES_URL': pages_server}
+    n_before = len(Pages().scrape(0, timeout=4, settings=settings).get())
+    try:
+        spider = Pages().scrape(5, settings=settings, persistent=True)
+        assert len(spider.get()) == 5
+
+        # Forked crawls do not share the epoll instance of the worker
+        n_alive = len(Pages().scrape(0, timeout=4, settings=settings).get())
+        assert n_alive >= 0.9 * n_before
+    finally:
+        stop_worker()
+
+
+def test_spider_scrape_workers():
+    spider = ISArticle().scrape(4, workers=2)
+    df = spider.get()
+    assert len(df) >= 4
+    assert df['url'].is_unique
+
+    # Continue with the same number of workers
+    spider.scrape(2, workers=2)
+    assert len(spider.get()) >= 6
+
+    with pytest.raises(ValueError):
+        spider.scrape(1, workers=2, persistent=True)
+
+
+def test_spider_scrape_workers_offline(pages_server, monkeypatch):
+    monkeypatch.setattr(PageHandler, 'n_items', 1000)
+    PageHandler.paths.clear()
+    settings = {'PAGES_URL': pages_server}
+    spider = Pages().scrape(30, workers=3, settings=settings)
+    items = spider.get('list')
+
+    # Shards fetch disjoint pages, and scrape the given number of items
+    paths = [path for path in PageHandler.paths if path != '/robots.txt']
+    assert len(paths) == len(set(paths))
+    assert 30 <= len(items) <= 30 + 3 * 16
+    assert len({item['url'] for item in items}) == len(items)
+    assert not any(list(spider._get_shard_dir(shard).glob('items.*'))
+                   for shard in range(3))
+
+    # Continue with the same number of workers
+    n_items = len(items)
+    items = spider.scrape(10, workers=3, settings=settings).get('list')
+    assert len(items) >= n_items + 10
+    assert len({item['url'] for item in items}) == len(items)
+
+
+def test_spider_scrape_workers_stopped(tmp_path):
+    spider = Pages(jobdir=str(tmp_path))
+    settings = spider._get_settings(itemcount=10)
+    crawls, shards = spider._get_shard_crawls(2, settings)
+    for shard, line in enumerate([b'{"url": "a"}\n', b'{"url": "b"']):
+        spider._get_shard_dir(shard).mkdir(parents=True)
+        (spider._get_shard_dir(shard) / 'items.jl').write_bytes(line)
+
+    # Files of stopped shards may be truncated, and are not merged
+    with pytest.raises(RuntimeError):
+        _run_as_shards(exit_shard, crawls, settings, shards,
+                       on_exit=lambda clean: spider._merge_shard_items(
+                           2, clean))
+    assert spider.get('list') == []
+    assert [len(list(spider._get_shard_dir(shard).glob('*.incomplete')))
+            for shard in range(2)] == [1, 1]
+
+    (spider._get_shard_dir(0) / 'items.jl').write_bytes(b'{"url": "a"}\n')
+    spider._merge_shard_items(2)
+    assert spider.get('list') == [{'url': 'a'}]
+
+
+def test_spider_shared_frontier_offline(pages_server, tmp_path,
+                                        monkeypatch):
+    monkeypatch.setattr(PageHandler, 'n_items', 200)
+    PageHandler.paths.clear()
+    settings = {
+        'PAGES_URL': pages_server,
+        'CONCURRENT_REQUESTS': 4,
+        'SCHEDULER': 'finscraper.frontier.SQLiteScheduler',
+        'DUPEFILTER_CLASS': 'finscraper.frontier.SQLiteDupeFilter',
+        'FRONTIER_SQLITE_PATH': str(tmp_path / 'frontier.sqlite'),
+        'FRONTIER_IDLE_WAIT': 1
+    }
+    spiders = [Pages().scrape(5, settings=settings) for _ in range(2)]
+
+    # Later processes continue from the requests left by earlier ones
+    urls = [{item['url'] for item in spider.get('list')}
+            for spider in spiders]
+    assert len(urls[0]) >= 5
+    assert len(urls[1]) >= 5
+    assert len(urls[0] & urls[1]) == 0
+
+    # Concurrent processes share the rest, and no page is fetched twice
+    monkeypatch.setattr(PageHandler, 'delay', 0.1)
+    PageHandler.paths.clear()
+    spiders = run_many([Pages(), Pages()], n=0, timeout=0,
+                       settings=settings)
+    urls.extend({item['url'] for item in spider.get('list')}
+                for spider in spiders)
+    assert all(len(spider_urls) > 0 for spider_urls in urls)
+    assert sum(len(spider_urls) for spider_urls in urls) == \
+        PageHandler.n_items
+    assert len(set().union(*urls)) == PageHandler.n_items
+    paths = [path for path in PageHandler.paths if path != '/robots.txt']
+    assert len(paths) == len(set(paths))
+
+
+def test_spider_shared_frontier(tmp_path):
+    settings = {
+        'SCHEDULER': 'finscraper.frontier.SQLiteScheduler',
+        'DUPEFILTER_CLASS': 'finscraper.frontier.SQLiteDupeFilter',
+        'FRONTIER_SQLITE_PATH': str(tmp_path / 'frontier.sqlite')
+    }
+    spider1 = Suomi24Page().scrape(5, settings=settings)
+    spider2 = Suomi24Page().scrape(5, settings=settings)
+    items1 = spider1.get('list')
+    items2 = spider2.get('list')
+    assert len(items1) >= 5, 'First process scraped too few items'
+    assert len(items2) >= 5, 'Second process scraped too few items'
+    urls1 = {item['url'] for item in items1}
+    urls2 = {item['url'] for item in items2}
+    assert len(urls1 & urls2) == 0
+
+
+def test_run_many():
+    spiders = run_many([ISArticle(), ILArticle(), YLEArticle()], n=2)
+    assert len(set(spider.jobdir for spider in spiders)) == 3
+    for spider in spiders:
+        assert len(spider.get()) >= 2
+
+
+def test_run_many_offline(pages_server):
+    settings = {'PAGES_URL': pages_server}
+    spiders = run_many([Pages(), Pages(items_format='jsonlines.gz')], n=3,
+                       settings=settings)
+    assert len(set(spider.jobdir for spider in spiders)) == 2
+    for spider in spiders:
+        assert len(spider.get()) == 3
+
+
+def test_spider_get_chunks():
+    spider = ISArticle()
+    items = [{'url': f'https://www.is.fi/{i}', 'title': str(i), 'time': i}
+             for i in range(5)]
+    with open(spider.items_save_path, 'w') as f:
+        for item in items:
+            f.write(json.dumps(item) + '\n')
+
+    assert spider.get('list') == items
+    assert list(spider.get('list', lazy=True)) == items
+    assert spider.get('list', columns=['title']) == [
+        {'title': item['title']} for item in items]
+
+    chunks = list(spider.get('list', chunksize=2))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+
+    dfs = list(spider.get(chunksize=2, columns=['url', 'time']))
+    assert [len(df) for df in dfs] == [2, 2, 1]
+    assert all(list(df.columns) == ['url', 'time'] for df in dfs)
+    pd.testing.assert_frame_equal(
+        pd.concat(dfs, ignore_index=True), spider.get()[['url', 'time']])
+
+    try:
+        spider.get('df', lazy=True)
+        assert False
+    except ValueError:
+        assert True
+
+
+def test_spider_get_parquet():
+    spider = ISArticle(items_format='parquet')
+    items = [{'url': f'https://www.is.fi/{i}', 'time': i, 'title': None,
+              'images': [{'src': str(i)}] * i} for i in range(5)]
+    Path(spider.items_save_path).mkdir()
+    file_path = Path(spider.items_save_path) / 'part-0.parquet'
+    with open(file_path, 'wb') as f:
+        exporter = ParquetItemExporter(f, row_group_size=2)
+        exporter.start_exporting()
+        for item in items:
+            exporter.export_item(item)
+        exporter.finish_exporting()
+
+    assert spider.get('list') == items
+    df = spider.get()
+    assert list(df.columns) == ['url', 'time', 'title', 'images']
+    assert df['images'].tolist() == [item['images'] for item in items]
+    dfs = list(spider.get(chunksize=2, columns=['time', 'missing']))
+    assert [len(df) for df in dfs] == [2, 2, 1]
+    assert list(dfs[0].columns) == ['time', 'missing']
+    assert dfs[0]['missing'].isna().all()
+
+
+def test_spider_get_parquet_mixed_types():
+    spider = ISArticle(items_format='parquet')
+    # Types of values change between row groups
+    items = [{'url': f'https://www.is.fi/{i}',
+              'rooms': i if i < 2 else f'{i} kpl',
+              'images': None if i < 2 else [{'src': str(i)}],
+              'price': [1.5, 'ääni', True, {'a': 1}, 0][i]}
+             for i in range(5)]
+    Path(spider.items_save_path).mkdir()
+    file_path = Path(spider.items_save_path) / 'part-0.parquet'
+    with open(file_path, 'wb') as f:
+        exporter = ParquetItemExporter(f, row_group_size=2)
+        exporter.start_exporting()
+        for item in items:
+            exporter.export_item(item)
+        exporter.finish_exporting()
+
+    assert spider.get('list') == items
+    assert spider.get()['rooms'].tolist() == [0, 1, '2 kpl', '3 kpl', '4 kpl']
+
+
+class _TypedItem(Item):
+    url = Field(dtype='string')
+    time = Field(dtype='int64')
+    tags = Field(dtype='list<string>')
+    images = Field()
+
+
+def test_spider_get_parquet_typed(caplog):
+    spider = ISArticle(items_format='parquet')
+    items = [{'url': f'https://www.is.fi/{i}', 'time': i,
+              'tags': [str(i)] * i, 'images': [{'src': str(i)}]}
+             for i in range(3)]
+    Path(spider.items_save_path).mkdir()
+    file_path = Path(spider.items_save_path) / 'part-0.parquet'
+    with open(file_path, 'wb') as f:
+        exporter = ParquetItemExporter(f, row_group_size=2)
+        exporter.start_exporting()
+        for item in items:
+            exporter.export_item(_TypedItem(item))
+        exporter.export_item(_TypedItem(url=1, time='3', tags=['3']))
+        exporter.finish_exporting()
+
+    # Declared fields have typed columns, others are JSON-encoded
+    _, pq = import_pyarrow()
+    schema = pq.read_schema(file_path)
+    assert [str(schema.field(name).type) for name in schema.names] == [
+        'string', 'int64', 'list<element: string>', 'string']
+    assert json.loads(schema.metadata[b'finscraper.json_columns']) == [
+        'images']
+    assert 'not of type int64' in caplog.text
+
+    items.append({'url': None, 'time': None, 'tags': ['3'],
+                  'images': None})
+    assert spider.get('list') == items
+    df = spider.get()
+    assert df['tags'].tolist() == [item['tags'] for item in items]
+    assert df['images'].tolist() == [item['images'] for item in items]
+    assert df['time'].tolist()[:3] == [0, 1, 2]
+
+
+def _export_items(spider, items, settings=None):
+    # Append items into the jobdir similarly to the feed exports of a run
+    settings = spider._get_settings(settings=settings)
+    ((uri, feed_options),) = settings['FEEDS'].items()
+    f = PostProcessingManager(feed_options['postprocessing'],
+                              open(uri, 'ab'), feed_options)
+    exporter = JsonLinesItemExporter(f)
+    exporter.start_exporting()
+    for item in items:
+        exporter.export_item(item)
+    exporter.finish_exporting()
+    f.close()
+
+
+def test_spider_get_gzip():
+    spider = ISArticle(items_format='jsonlines.gz')
+    items = [{'url': f'https://www.is.fi/{i}', 'time': i,
+              'content': 'Uutinen ' * i} for i in range(50)]
+    _export_items(spider, items[:20])
+    _export_items(spider, items[20:])
+
+    assert spider.items_save_path.endswith('items.jl.gz')
+    assert spider.get('list') == items
+    assert spider.get()['content'].tolist() == [
+        item['content'] for item in items]
+    assert spider.get(n_jobs=2)['time'].tolist() == list(range(50))
+
+
+def test_spider_get_zstd():
+    pytest.importorskip('zstandard')
+    spider = ISArticle(items_format='jsonlines.zst')
+    items = [{'url': f'https://www.is.fi/{i}', 'time': i,
+              'content': f'Uutinen {i} ' * 20} for i in range(600)]
+    settings = {'FEED_ZSTD_DICT_ITEMS': 500}
+    _export_items(spider, items[:10], settings)  # Too few for training
+    assert not Path(f'{spider.items_save_path}.dict').exists()
+    _export_items(spider, items[10:], settings)
+    assert Path(f'{spider.items_save_path}.dict').exists()
+
+    assert spider.get('list') == items
+    assert spider.get()['time'].tolist() == list(range(600))
+
+
+def _write_suomi24_items(spider, n_items):
+    with open(spider.items_save_path, 'w') as f:
+        for i in range(n_items):
+            comments = [{'author': f'user{j}', 'date': '1.1.2020',
+                         'quotes': [], 'responses': [],
+                         'content': 'Kommentti ' * 20} for j in range(i % 5)]
+            item = {'url': f'https://keskustelu.suomi24.fi/t/{i}/ketju',
+                    'time': i, 'title': f'Ketju {i}',
+                    'content': 'Viesti ' * 50, 'comments': comments,
+                    'published': '1.1.2020', 'author': 'user',
+                    'n_comments': len(comments), 'views': str(i)}
+            f.write(json.dumps(item) + '\n')
+
+
+def test_spider_get_columnar():
+    spider = Suomi24Page()
+    _write_suomi24_items(spider, 101)
+    with open(spider.items_save_path) as f:
+        expected = pd.DataFrame([json.loads(line) for line in f])
+
+    pd.testing.assert_frame_equal(spider.get(), expected)
+    pd.testing.assert_frame_equal(spider.get(n_jobs=3), expected)
+    pd.testing.assert_frame_equal(
+        spider.get(columns=['views', 'url']), expected[['views', 'url']])
+
+
+def test_spider_get_columnar_dtypes(tmp_path):
+    path = tmp_path / 'items.jl'
+    with open(path, 'w') as f:
+        for i in range(3):
+            item = {'time': i, 'n_comments': i or None,
+                    'price': [1.9, '12', 3][i], 'views': i}
+            f.write(json.dumps(item) + '\n')
+
+    # Columns are typed by the fields, unless values do not fit the type
+    fields = {'time': Field(dtype='int64'), 'n_comments': Field(dtype='int64'),
+              'price': Field(dtype='int64'), 'views': Field()}
+    df = read_jsonlines(path, fields=fields, n_jobs=2)
+    assert df.dtypes.to_dict() == {
+        'time': 'int64', 'n_comments': 'float64', 'price': 'object',
+        'views': 'int64'}
+    assert df['n_comments'].isna().sum() == 1
+    assert df['price'].tolist() == [1.9, '12', 3]
+
+
+def test_spider_get_optional_fields():
+    spider = ISArticle()
+    pipeline = DefaultValueNonePipeline()
+    items = [pipeline.process_item(_ISArticleItem(url=f'https://is.fi/{i}'),
+                                   spider) for i in range(3)]
+    with open(spider.items_save_path, 'w') as f:
+        for item in items:
+            f.write(json.dumps(dict(item)) + '\n')
+
+    # Optional fields are columns only when items have them
+    assert 'cluster_id' not in spider.get().columns
+    items[1]['cluster_id'] = 1
+    with open(spider.items_save_path, 'a') as f:
+        f.write(json.dumps(dict(items[1])) + '\n')
+    assert spider.get()['cluster_id'].isna().tolist() == [True] * 3 + [False]
+
+    spider = ISArticle(items_format='parquet')
+    Path(spider.items_save_path).mkdir()
+    with open(Path(spider.items_save_path) / 'part-0.parquet', 'wb') as f:
+        exporter = ParquetItemExporter(f)
+        exporter.start_exporting()
+        exporter.export_item(items[0])
+        exporter.finish_exporting()
+    assert 'cluster_id' not in spider.get().columns
+
+
+@pytest.mark.xfail(reason="Benchmark")
+def test_benchmark_get(capsys, n_items=100000):
+    spider = Suomi24Page()
+    _write_suomi24_items(spider, n_items)
+
+    start = time.perf_counter()
+    with open(spider.items_save_path) as f:
+        pd.DataFrame([json.loads(line) for line in f])
+    rows_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    spider.get()
+    columns_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    spider.get(n_jobs=4)
+    parallel_time = time.perf_counter() - start
+    with capsys.disabled():
+        print(f"-- rows: {rows_time:.2f} s, columns: {columns_time:.2f} s, "
+              f"columns with 4 processes: {parallel_time:.2f} s")
+    assert columns_time < rows_time
@@ -1,9 +1,30 @@
 """Module for testing utility functions."""
 
 
+import json
+import os
+import threading
+import time
+import urllib.request
+
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
 import numpy as np
 import pandas as pd
 
+from scrapy import Field, Item, Request, Spider
+from scrapy.linkextractors import LinkExtractor
+from twisted.python.threadable import isInIOThread
+
+from finscraper.scrapy_spiders.mixins import FollowAndParseItemMixin
+from finscraper.wrappers import _SpiderWrapper
+
+
+DATA_DIR = Path(__file__).parent / 'data'
+
 
 def is_empty(value, empty_values=None):
     """Whether an object is empty or not from scraping point of view."""
@@ -43,3 +64,244 @@ def calc_field_emptiness(df, empty_values=None):
         })
     stats_df = pd.DataFrame(stats).sort_values('empty_pct', ascending=False)
     return stats_df
+
+
+class OikotieHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the search page, API and listings of Oikotie."""
+    api_enabled = True
+    failing_listings = ()
+    paths = []
+
+    def _send(self, body, content_type, status=200):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.end_headers()
+        self.wfile.write(body.encode('utf-8'))
+
+    def do_GET(self):
+        data_dir = DATA_DIR / 'oikotie'
+        url = urlparse(self.path)
+        base_url = f'http://{self.headers["Host"]}'
+        self.paths.append(url.path)
+        if url.path == '/myytavat-asunnot':
+            self._send((data_dir / 'search.html').read_text('utf-8'),
+                       'text/html; charset=utf-8')
+        elif url.path == '/api/cards':
+            tokens = [self.headers.get(f'OTA-{name}')
+                      for name in ('token', 'loaded', 'cuid')]
+            if not self.api_enabled or not all(tokens):
+                self._send('{"error": "unauthorized"}', 'application/json',
+                           status=401)
+                return
+            params = parse_qs(url.query)
+            offset = int(params['offset'][0])
+            limit = int(params['limit'][0])
+            data = json.loads((data_dir / 'cards.json').read_text('utf-8'))
+            data['cards'] = data['cards'][offset:offset + limit]
+            self._send(json.dumps(data).replace(
+                'https://asunnot.oikotie.fi', base_url), 'application/json')
+        elif url.path.rsplit('/', 1)[-1] in self.failing_listings:
+            self._send('', 'text/html', status=404)
+        elif url.path.startswith('/myytavat-asunnot/'):
+            self._send((data_dir / 'listing.html').read_text('utf-8'),
+                       'text/html; charset=utf-8')
+        else:
+            self._send('', 'text/html', status=404)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    """Local stand-in for a site of listing pages that link to items.
+
+    Listing page ``/list/<i>`` links to ten items and the next listing
+    page, and every item links back to the first listing page. Pages are
+    sent after ``delay`` seconds.
+    """
+    n_items = 100
+    delay = 0
+    paths = []
+
+    def _send(self, body, status=200):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.end_headers()
+        self.wfile.write(f'<html><body>{body}</body></html>'.encode('utf-8'))
+
+    def do_GET(self):
+        self.paths.append(self.path)
+        time.sleep(self.delay)
+        kind, _, index = self.path.strip('/').partition('/')
+        if not index.isdigit():
+            self._send('', status=404)
+        elif kind == 'list' and int(index) * 10 < self.n_items:
+            start = int(index) * 10
+            links = [f'<a href="/item/{i}">Item {i}</a>'
+                     for i in range(start, min(start + 10, self.n_items))]
+            links.append(f'<a href="/list/{int(index) + 1}">Next</a>')
+            self._send(''.join(links))
+        elif kind == 'item' and int(index) < self.n_items:
+            self._send(f'<h1>Item {index}</h1><a href="/list/0">Front</a>')
+        else:
+            self._send('', status=404)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInDriver:
+    """Stand-in for a Chrome webdriver that fetches pages with urllib.
+
+    Each driver appends its summary into the JSON lines file ``log_path``
+    when it quits.
+    """
+    log_path = None
+    delay = 0.05
+    _active = 0
+    _max_active = 0
+    _lock = threading.Lock()
+
+    def __init__(self, options=None, settings=None):
+        self.current_url = None
+        self.page_source = None
+        self.n_pages = 0
+
+    def get(self, url):
+        cls = type(self)
+        with cls._lock:
+            cls._active += 1
+            cls._max_active = max(cls._max_active, cls._active)
+        try:
+            time.sleep(self.delay)
+            with urllib.request.urlopen(url) as f:
+                self.page_source = f.read().decode('utf-8')
+                self.current_url = f.geturl()
+            self.n_pages += 1
+        finally:
+            with cls._lock:
+                cls._active -= 1
+
+    def quit(self):
+        with open(self.log_path, 'a') as f:
+            f.write(json.dumps({
+                'n_pages': self.n_pages,
+                'max_active': type(self)._max_active,
+                'in_io_thread': isInIOThread()
+            }) + '\n')
+
+
+class StandInStats:
+    """Stand-in for the stats collector of a crawler that counts values."""
+
+    def __init__(self):
+        self.values = {}
+
+    def inc_value(self, key, count=1):
+        self.values[key] = self.values.get(key, 0) + count
+
+
+class StandInCrawler:
+    """Stand-in for a crawler of spiders that are tested without one."""
+
+    def __init__(self):
+        self.stats = StandInStats()
+
+
+class _PageItem(Item):
+    """
+    Returned fields:
+        * url (str): URL of the item.
+        * title (str): Title of the item.
+    """
+    url = Field()
+    title = Field()
+
+
+class _PageSpider(FollowAndParseItemMixin, Spider):
+    name = 'pages'
+    item_link_extractor = LinkExtractor(allow=r'/item/[0-9]+$')
+    follow_link_extractor = LinkExtractor(allow=r'/list/[0-9]+$')
+
+    def __init__(self, selenium=False, *args, **kwargs):
+        """Fetch items from ``PAGES_URL`` of a ``PageHandler``.
+
+        Args:
+            selenium (bool, optional): Whether to fetch items with Selenium.
+                Defaults to False.
+        """
+        super(_PageSpider, self).__init__(
+            items_selenium_callback=None if selenium else False)
+
+    def start_requests(self):
+        url = f'{self.settings["PAGES_URL"]}/list/0'
+        yield Request(url, callback=self.parse, meta=self.follow_meta)
+        yield from self._restore_deferred()
+
+    def _parse_item(self, resp):
+        return _PageItem(url=resp.url, title=resp.xpath('//h1/text()').get())
+
+
+class Pages(_SpiderWrapper):
+    """Spider wrapper of ``_PageSpider``."""
+
+    def __init__(self, selenium=False, jobdir=None, progress_bar=False,
+                 log_level=None, items_format='jsonlines'):
+        super(Pages, self).__init__(
+            spider_cls=_PageSpider,
+            spider_params=dict(selenium=selenium),
+            item_cls=_PageItem,
+            jobdir=jobdir,
+            progress_bar=progress_bar,
+            log_level=log_level,
+            items_format=items_format,
+        )
+
+
+class _UnpicklableError(Exception):
+    """Exception that cannot be sent into another process."""
+
+    def __init__(self):
+        super(_UnpicklableError, self).__init__(threading.Lock())
+
+
+class _FailingSpider(Spider):
+    name = 'failing'
+
+    def __init__(self, sleep=0, *args, **kwargs):
+        """Block the reactor for ``sleep`` seconds, and fail.
+
+        Args:
+            sleep (float, optional): Seconds to block. Defaults to 0.
+        """
+        time.sleep(sleep)
+        raise _UnpicklableError()
+
+
+class Failing(_SpiderWrapper):
+    """Spider wrapper of ``_FailingSpider``."""
+
+    def __init__(self, sleep=0):
+        super(Failing, self).__init__(
+            spider_cls=_FailingSpider,
+            spider_params=dict(sleep=sleep),
+            item_cls=_PageItem
+        )
+
+
+def exit_shard(results_queue, log_queue, crawls, settings, shard):
+    """Stand-in for a shard process that dies without finishing."""
+    os._exit(1)
+
+
+@contextmanager
+def serve(handler_cls):
+    """Serve a local stand-in website in a thread, and yield its URL."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler_cls)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_address[1]}'
+    finally:
+        server.shutdown()
+        server.server_close()